@@ -20,6 +20,17 @@ CFG_ENGINE = load_yaml("config/engine.yaml")
 
 ENV = environ["ENV"]
 DEBUG = False
+# Background log writer: off | thread | process
+LOG_QUEUE = environ.get("LOG_QUEUE", "off")
+# Timer, T: log | stats | both
+TIMER_MODE = environ.get("TIMER_MODE", "log")
+# Memory of Timer, T and D: off | rss | trace
+TIMER_MEMORY = environ.get("TIMER_MEMORY", "off")
+# D, chosen at decoration: on | off | sample (1 in DEPTH_SAMPLE_RATE calls)
+DEPTH_MODE = environ.get("DEPTH_MODE", "on")
+DEPTH_SAMPLE_RATE = int(environ.get("DEPTH_SAMPLE_RATE", "100"))
+# Chrome trace output of Timer, T and D (off if unset)
+TRACE_DIR = environ.get("TRACE_DIR")
 
 
 if __name__ == "__main__":
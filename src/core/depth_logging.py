@@ -1,43 +1,216 @@
 """DepthLogger class.
 
 Log depth of code.
+
+The call tree is kept in context variables, so every thread and asyncio task numbers its own calls;
+calls outside the main thread are tagged with their thread (and task) name.
+
+The mode of `D` is chosen when a function is decorated (`DEPTH_MODE` environment variable):
+
+- on: log every call and its elapsed time (with `TIMER_MODE=stats`, only aggregate the times
+  per function in `STATS`)
+- off: return the function itself (no overhead)
+- sample: time 1 in `DEPTH_SAMPLE_RATE` calls into `SAMPLER`, which writes collapsed stacks
+  for flamegraph tools (`flamegraph.pl`, speedscope)
 """
 
+import asyncio
+import atexit
 import contextlib
+import inspect
+import os
+import threading
 from collections import defaultdict
+from contextvars import ContextVar
 from functools import wraps
+from time import perf_counter
 
+from config import DEPTH_MODE, DEPTH_SAMPLE_RATE
 from src.core.timer import Timer
 from src.core.logger import log_info
 
+DEPTH_MODES = ("on", "off", "sample")
+
+_path = ContextVar("depth_path", default=())  # numbers of the enclosing calls
+_count = ContextVar("depth_count", default=0)  # calls made so far at the current depth
+# names of the enclosing calls (sample mode)
+_stack = ContextVar("depth_stack", default=())
+
+
+def worker_id() -> str:
+    """Name of the current thread and asyncio task (empty on the main thread outside tasks)."""
+    names = []
+    thread = threading.current_thread()
+    if thread is not threading.main_thread():
+        names.append(thread.name)
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # no running event loop
+        task = None
+    if task is not None:
+        names.append(task.get_name())
+    return "/".join(names)
+
 
 class DepthManager(contextlib.ContextDecorator):
     """Code Depth Manager.
 
+    Entering numbers a new call after its previous siblings and makes it the current parent.
+
     Attributes:
-        depth (int): Current depth of code
-        depths (dict): Depths of codes
+        path (tuple[int, ...]): Numbers of the call on entering (e.g. (1, 2) for call 1.2)
     """
 
-    depth = 1
-    depths = defaultdict(lambda: 1)
-
-    @classmethod
-    def __enter__(cls):
-        cls.depth += 1
-        return cls
+    def __enter__(self):
+        n = _count.get() + 1
+        _count.set(n)
+        self.path = _path.get() + (n,)
+        self._tokens = _path.set(self.path), _count.set(0)
+        return self
 
-    @classmethod
-    def __exit__(cls, *exc):
-        cls.depths[cls.depth] = 1  # reset
-        cls.depth -= 1
-        cls.depths[cls.depth] += 1
+    def __exit__(self, *exc):
+        path_token, count_token = self._tokens
+        _count.reset(count_token)
+        _path.reset(path_token)
         return False
 
+    @staticmethod
+    def depth() -> int:
+        """Depth of the next call in the current context."""
+        return len(_path.get()) + 1
+
+    @staticmethod
+    def next_name() -> str:
+        """Dotted number of the next call in the current context."""
+        return ".".join(map(str, _path.get() + (_count.get() + 1,)))
+
+
+##################################################
+# Sampling
+##################################################
+class StackSampler:
+    """Sampled time of call stacks.
+
+    Calls are counted per stack and 1 in `rate` of them is timed (the first one always is),
+    so the inclusive time of a stack is estimated as its mean sampled time times its call count;
+    self times are derived when the stacks are collapsed.
+    """
+
+    def __init__(self):
+        self.calls = defaultdict(int)  # stack -> calls
+        self.totals = defaultdict(float)  # stack -> sampled seconds
+        self.samples = defaultdict(int)  # stack -> sampled calls
+        self._lock = threading.Lock()
+
+    def count(self, stack: tuple) -> int:
+        """Count a call of `stack`.
+
+        Returns:
+            int: Number of calls of `stack` so far, including this one
+        """
+        with self._lock:
+            self.calls[stack] += 1
+            return self.calls[stack]
+
+    def record(self, stack: tuple, elapsed: float) -> None:
+        """Record the elapsed time of a sampled call of `stack`."""
+        with self._lock:
+            self.totals[stack] += elapsed
+            self.samples[stack] += 1
+
+    def inclusive(self) -> dict[tuple, float]:
+        """Estimated inclusive seconds of every sampled stack."""
+        with self._lock:
+            return {
+                stack: total / self.samples[stack] * self.calls[stack]
+                for stack, total in self.totals.items()
+            }
+
+    def collapsed(self) -> list[str]:
+        """Collapsed stacks (`a;b;c <self time in microseconds>`), one line per stack."""
+        inclusive = self.inclusive()
+        self_times = dict(inclusive)
+        for stack, total in inclusive.items():
+            if stack[:-1] in self_times:
+                self_times[stack[:-1]] -= total
+        return [
+            f"{';'.join(stack)} {round(max(t, 0) * 1e6)}"
+            for stack, t in sorted(self_times.items())
+        ]
+
+    def write(self, path: str) -> None:
+        """Write the collapsed stacks to a file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        log_info(f"Sampled stacks: {path}", dump=False)
 
-def D(fn):
+    def reset(self) -> None:
+        """Drop all samples."""
+        with self._lock:
+            self.calls.clear()
+            self.totals.clear()
+            self.samples.clear()
+
+
+SAMPLER = StackSampler()
+atexit.register(
+    lambda: SAMPLER.totals and SAMPLER.write(f"logs/stacks-{os.getpid()}.folded")
+)
+
+
+def _sampled(fn, rate: int) -> callable:
+    """Wrap `fn` to keep the call stack and time 1 in `rate` calls of each stack."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    if inspect.iscoroutinefunction(fn):
+
+        @wraps(fn)
+        async def _sample_async(*args, **kwargs):
+            stack = _stack.get() + (name,)
+            token = _stack.set(stack)
+            try:
+                if (SAMPLER.count(stack) - 1) % rate:
+                    return await fn(*args, **kwargs)
+                tic = perf_counter()
+                rst = await fn(*args, **kwargs)
+                SAMPLER.record(stack, perf_counter() - tic)
+                return rst
+            finally:
+                _stack.reset(token)
+
+        return _sample_async
+
+    @wraps(fn)
+    def _sample(*args, **kwargs):
+        stack = _stack.get() + (name,)
+        token = _stack.set(stack)
+        try:
+            if (SAMPLER.count(stack) - 1) % rate:
+                return fn(*args, **kwargs)
+            tic = perf_counter()
+            rst = fn(*args, **kwargs)
+            SAMPLER.record(stack, perf_counter() - tic)
+            return rst
+        finally:
+            _stack.reset(token)
+
+    return _sample
+
+
+##################################################
+# Decorator
+##################################################
+def D(fn: callable = None, *, mode: str | None = None, sample_rate: int | None = None):
     """Depth logging decorator.
 
+    Works on functions and coroutine functions; each thread and asyncio task has its own call tree.
+
+    Args:
+        fn (callable): Function to instrument
+        mode (str, optional): on | off | sample. Defaults to `DEPTH_MODE`.
+        sample_rate (int, optional): Time 1 in N calls in sample mode. Defaults to `DEPTH_SAMPLE_RATE`.
+
     Example:
         >>> @D
         >>> def f():
@@ -47,7 +220,18 @@ def D(fn):
         >>> def g():
         ...     # Depth: 2
         ...     # do something
+        >>> @D(mode="sample", sample_rate=1000)  # hot path
+        >>> def h():
+        ...     pass
     """
+    if fn is None:
+        return lambda fn: D(fn, mode=mode, sample_rate=sample_rate)
+    mode = mode or DEPTH_MODE
+    assert mode in DEPTH_MODES, f"Invalid depth logging mode: {mode}"
+    if mode == "off":
+        return fn
+    if mode == "sample":
+        return _sampled(fn, sample_rate or DEPTH_SAMPLE_RATE)
 
     def _print_fn(name, args, fn):
         """Print depth of code.
@@ -64,15 +248,39 @@ def D(fn):
             logs = f"{logs}{fn.__module__.split('.')[-1]}."
         log_info(f"{logs}{fn.__name__}()")
 
+    def _name():
+        name = DepthManager.next_name()
+        worker = worker_id()
+        return f"{name} [{worker}]" if worker else name
+
+    span = f"{fn.__qualname__}()"
+
+    if inspect.iscoroutinefunction(fn):
+
+        @wraps(fn)
+        async def _log_async(*args, **kwargs):
+            name = _name()
+            timer = Timer(name, span=span, stat=span)
+            if timer.log:
+                _print_fn(name, args, fn)
+
+            with DepthManager():
+                with timer:
+                    rst = await fn(*args, **kwargs)
+
+            return rst
+
+        return _log_async
+
     @wraps(fn)
     def _log(*args, **kwargs):
-        name = ".".join(
-            [str(DepthManager.depths[d]) for d in range(1, DepthManager.depth + 1)]
-        )
-        _print_fn(name, args, fn)
+        name = _name()
+        timer = Timer(name, span=span, stat=span)
+        if timer.log:
+            _print_fn(name, args, fn)
 
         with DepthManager():
-            with Timer(name):
+            with timer:
                 rst = fn(*args, **kwargs)
 
         return rst
@@ -1,14 +1,29 @@
-"""Logging module."""
-
+"""Logging module.
+
+With `log_queue` ("thread" | "process"), callers only enqueue records, and one background
+listener thread formats them and writes them to the console and file handlers in batches.
+In "process" mode the queue is a multiprocessing queue shared with worker processes
+(see `worker_log_initializer`), so one process owns the rotated log files.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
 import re
 import json
 from datetime import datetime
 from pathlib import Path
 import logging
-from logging.handlers import TimedRotatingFileHandler
-
-from config import ENV
+from logging.handlers import (
+    BaseRotatingHandler,
+    QueueHandler,
+    QueueListener,
+    TimedRotatingFileHandler,
+)
+from multiprocessing.util import Finalize, register_after_fork
 
+from config import ENV, LOG_QUEUE
 
 # https://pkg.go.dev/github.com/shafiqaimanx/pastax/colors
 STYLES = {
@@ -42,10 +57,187 @@ LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(message)s"
 LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
+ANSI_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
+LOG_QUEUES = ("off", "thread", "process")
+
+
 class ANSIColorRemovingFormatter(logging.Formatter):
     def format(self, record):
         formatted = super().format(record)
-        return re.sub(r"\x1b\[[0-9;]*m", "", formatted)
+        return ANSI_PATTERN.sub("", formatted)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that enqueues records as they are (formatting is left to the listener).
+
+    Only for in-process queues: records are not pickled, so their arguments must not be mutated
+    after logging.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class ProcessQueueHandler(QueueHandler):
+    """Queue handler for multiprocessing queues.
+
+    Records are reduced to their formatted text to be pickled; structured messages
+    (`LazyMessage` of a non-str object) are also kept as `record.data` for `JSONLinesFormatter`.
+    """
+
+    def prepare(self, record):
+        data = record.msg.msg if isinstance(record.msg, LazyMessage) else None
+        record = super().prepare(record)
+        if data is not None and not isinstance(data, str):
+            record.data = json.loads(json.dumps(data, default=str))  # picklable
+        return record
+
+
+class BatchQueueListener(QueueListener):
+    """Queue listener that handles the pending records in batches.
+
+    Stream and file handlers get one write and one flush per batch instead of per record.
+
+    Args:
+        queue: Queue of records
+        *handlers: Handlers of the records
+        batch_size (int): Maximum records per batch
+    """
+
+    def __init__(self, queue, *handlers, batch_size: int = 512):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def _monitor(self):
+        while True:
+            records = [self.dequeue(True)]
+            while records[-1] is not self._sentinel and len(records) < self.batch_size:
+                try:
+                    records.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            stop = records[-1] is self._sentinel
+            if stop:
+                records.pop()
+            if records:
+                self.handle_batch(records)
+            if stop:
+                break
+
+    def handle_batch(self, records: list[logging.LogRecord]) -> None:
+        """Write a batch of records to every handler."""
+        for handler in self.handlers:
+            batch = [
+                r for r in records if r.levelno >= handler.level and handler.filter(r)
+            ]
+            if not batch:
+                continue
+            if not isinstance(handler, logging.StreamHandler):
+                for record in batch:
+                    handler.handle(record)
+                continue
+            with handler.lock:
+                try:
+                    if isinstance(
+                        handler, BaseRotatingHandler
+                    ) and handler.shouldRollover(batch[0]):
+                        handler.doRollover()
+                    # FileHandler(delay=True) or after a rollover
+                    if handler.stream is None:
+                        handler.stream = handler._open()
+                    handler.stream.write(
+                        "".join(handler.format(r) + handler.terminator for r in batch)
+                    )
+                    handler.flush()
+                except Exception:
+                    handler.handleError(batch[0])
+
+
+_listener = None
+_listener_pid = None
+
+
+def get_log_queue():
+    """Multiprocessing queue of the log listener for worker processes (None unless in "process" mode)."""
+    if _listener is None or isinstance(_listener.queue, queue.SimpleQueue):
+        return None
+    return _listener.queue
+
+
+def worker_log_initializer(log_queue, log_level: str = "INFO") -> None:
+    """Send the logs of a worker process to the parent's listener.
+
+    Pass as the `initializer` of process pools started with "spawn"
+    (forked workers inherit the queue handler already).
+
+    Examples:
+        >>> ProcessPoolExecutor(initializer=worker_log_initializer, initargs=(get_log_queue(),))
+    """
+    global logger
+    logger = logging.getLogger()
+    logger.handlers.clear()
+    logger.setLevel(getattr(logging, log_level.upper()))
+    logger.addHandler(ProcessQueueHandler(log_queue))
+
+
+def _start_listener(log_queue, handlers: list[logging.Handler]) -> None:
+    global _listener, _listener_pid
+    _listener, _listener_pid = BatchQueueListener(log_queue, *handlers), os.getpid()
+    _listener.start()
+
+
+def _restart_listener(
+    queue_handler: QueueHandler, handlers: list[logging.Handler]
+) -> None:
+    # records queued before the fork belong to the parent
+    queue_handler.queue = queue.SimpleQueue()
+    _start_listener(queue_handler.queue, handlers)
+
+
+def _acquire_all(handlers: list[logging.Handler]) -> None:
+    for handler in handlers:
+        handler.acquire()
+
+
+def _release_all(handlers: list[logging.Handler]) -> None:
+    for handler in handlers:
+        handler.release()
+
+
+def _stop_listener() -> None:
+    """Write the pending records and stop the listener (only in the process that started it)."""
+    if (
+        _listener is not None
+        and _listener_pid == os.getpid()
+        and _listener._thread is not None
+    ):
+        _listener.stop()
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """Compact JSON object per record: ts, level, and msg (text) or data (structured message)."""
+
+    def format(self, record):
+        entry = dict(
+            ts=datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            level=record.levelname,
+        )
+        msg = record.msg
+        if hasattr(record, "data"):  # structured message from a `ProcessQueueHandler`
+            msg = record.data
+        elif isinstance(msg, LazyMessage):
+            msg = msg.msg
+        elif record.args:
+            msg = record.getMessage()
+        if isinstance(msg, str):
+            entry["msg"] = ANSI_PATTERN.sub("", msg)
+        else:
+            entry["data"] = msg
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
 
 
 def setup_advanced_logger(
@@ -58,6 +250,8 @@ def setup_advanced_logger(
     log_dir: str = "logs",
     file_rotation: str = "midnight",
     file_backup_count: int = 7,
+    log_queue: str = LOG_QUEUE,
+    json_lines: bool = ENV == "prd",
 ) -> logging.Logger:
     """
     Setup an advanced logger with flexible configuration options.
@@ -74,6 +268,9 @@ def setup_advanced_logger(
         log_file_prefix (str): Prefix for log file names.
         file_rotation (str): When to rotate the log file (e.g., 'midnight', 'h' for hourly).
         file_backup_count (int): Number of backup log files to keep.
+        log_queue (str): Write through a background listener thread: "off" | "thread" | "process"
+            (multiprocessing queue, shareable with worker processes).
+        json_lines (bool): Write compact JSON lines (`JSONLinesFormatter`) instead of text.
 
     Returns:
         logging.Logger: Configured logger object.
@@ -83,14 +280,20 @@ def setup_advanced_logger(
     logger.setLevel(getattr(logging, log_level.upper()))
 
     # Create formatters
-    color_formatter = logging.Formatter(log_format, datefmt=date_format)
-    no_color_formatter = ANSIColorRemovingFormatter(log_format, datefmt=date_format)
+    if json_lines:
+        color_formatter = no_color_formatter = JSONLinesFormatter()
+    else:
+        color_formatter = logging.Formatter(log_format, datefmt=date_format)
+        no_color_formatter = ANSIColorRemovingFormatter(log_format, datefmt=date_format)
+
+    assert log_queue in LOG_QUEUES, f"Invalid log queue: {log_queue}"
+    handlers = []
 
     # Console handler (with colors)
     if log_to_console:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(color_formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
     # File handler (without colors)
     if log_to_file:
@@ -107,8 +310,35 @@ def setup_advanced_logger(
             backupCount=file_backup_count,
         )
         file_handler.setFormatter(no_color_formatter)
-        logger.addHandler(file_handler)
-
+        handlers.append(file_handler)
+
+    if log_queue == "off":
+        for handler in handlers:
+            logger.addHandler(handler)
+        return logger
+
+    # Queue handler: the listener thread formats and writes
+    if log_queue == "thread":
+        log_queue = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(log_queue)
+        logger.addHandler(queue_handler)
+        # Fork between batches (no lock or stream buffer held by the listener),
+        # then give the child its own queue and listener thread
+        os.register_at_fork(
+            before=lambda: _acquire_all(handlers),
+            after_in_parent=lambda: _release_all(handlers),
+            after_in_child=lambda: _restart_listener(queue_handler, handlers),
+        )
+        # multiprocessing children exit without atexit
+        register_after_fork(
+            queue_handler, lambda _: Finalize(None, _stop_listener, exitpriority=0)
+        )
+    else:
+        # usable by fork and spawn workers
+        log_queue = multiprocessing.get_context("spawn").Queue()
+        logger.addHandler(ProcessQueueHandler(log_queue))
+    _start_listener(log_queue, handlers)
+    atexit.register(_stop_listener)
     return logger
 
 
@@ -126,47 +356,66 @@ def pretty_dict(s: str) -> str:
     return json_str
 
 
+class LazyMessage:
+    """Log message rendered only when a handler formats the record (once for all handlers).
+
+    Args:
+        msg: The message (any JSON-serializable object, or anything with `str`).
+        style (str): The style of the message (applied in the `local` ENV).
+        dump (bool): Pretty print the message as JSON.
+    """
+
+    __slots__ = ("msg", "style", "dump", "_text")
+
+    def __init__(self, msg, style: str | None = None, dump: bool = True):
+        self.msg = msg
+        self.style = style
+        self.dump = dump
+        self._text = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = self._render()
+        return self._text
+
+    def _render(self) -> str:
+        msg = self.msg
+        if self.dump:
+            try:
+                msg = pretty_dict(msg).strip('"')  # remove redundant quotes
+            except (TypeError, ValueError):  # not JSON-serializable
+                pass
+        if ENV == "local" and self.style:
+            return f"{STYLES[self.style]}{msg}{STYLES['ENDC']}"
+        return str(msg)
+
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+
 def slog(
     msg: str, style: str | None = None, level: str = "info", dump: bool = True
-) -> str:
+) -> None:
     """Stylish log message.
 
+    The message is only serialized if the record is emitted (and by the listener thread in queue mode).
+
     Args:
         msg (str): The message to log.
         style (str): The style of the message.
         level (str): The log level.
         dump (bool): The dump flag.
-
-    Returns:
-        str: The stylish message.
     """
-    try:
-        if dump:
-            msg = pretty_dict(msg)
-            msg = msg.strip('"')  # remove redundant quotes
-    except:
-        pass
-
-    if ENV != "local":
-        stylish_msg = msg
-    elif style:
-        stylish_msg = f"{STYLES[style]}{msg}{STYLES['ENDC']}"
-    else:
-        stylish_msg = msg
-
-    match level:
-        case "info":
-            logger.info(stylish_msg)
-        case "error":
-            logger.error(stylish_msg)
-        case "warning":
-            logger.warning(stylish_msg)
-        case "debug":
-            logger.debug(stylish_msg)
-        case _:
-            print(stylish_msg)
-
-    return stylish_msg
+    levelno = LEVELS.get(level)
+    if levelno is None:
+        print(LazyMessage(msg, style, dump))
+    elif logger.isEnabledFor(levelno):
+        logger.log(levelno, LazyMessage(msg, style, dump))
 
 
 def log_info(msg: str, dump: bool = True) -> None:
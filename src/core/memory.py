@@ -0,0 +1,129 @@
+"""Memory probes.
+
+Measures the memory behavior of a span of code for `Timer`:
+
+- rss: resident set size delta of the process (psutil), which includes native allocations
+  (audio buffers, FluidSynth, numpy)
+- trace: also the peak of Python allocations above the start (tracemalloc)
+  and, for outermost spans, the top allocation sites by size growth
+"""
+
+import linecache
+import os
+import threading
+import tracemalloc
+from contextvars import ContextVar
+
+import psutil
+
+MEMORY_MODES = ("off", "rss", "trace")
+
+_process = None
+_open = set()  # trace mode probes of the open spans, in every thread
+_lock = threading.Lock()
+# open trace probes in this context
+_depth = ContextVar("memory_trace_depth", default=0)
+
+
+def rss() -> int:
+    """Resident set size of the current process in bytes."""
+    global _process
+    if _process is None or _process.pid != os.getpid():
+        _process = psutil.Process()
+    return _process.memory_info().rss
+
+
+class MemoryProbe:
+    """Memory usage of a span.
+
+    A probe measures one span at a time: create one per span (`Timer` does so on every entry).
+    tracemalloc has one global peak, so it is folded into every open probe before each reset;
+    under threads, the peak covers allocations of every thread.
+    Snapshots cost time proportional to the traced allocations, so only the outermost
+    trace probe of a context takes them (and reports allocation sites); nested probes
+    only read the traced size and peak.
+
+    Args:
+        mode (str): rss | trace
+        top (int): Number of allocation sites reported in trace mode
+    """
+
+    def __init__(self, mode: str = "rss", top: int = 3):
+        assert mode in MEMORY_MODES[1:], f"Invalid memory mode: {mode}"
+        self.trace = mode == "trace"
+        self.top = top
+
+    def start(self) -> None:
+        """Start measuring."""
+        if self.trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            depth = _depth.get()
+            self._token = _depth.set(depth + 1)
+            self.snapshot = _snapshot() if depth == 0 else None
+            with _lock:
+                self.traced = self.peak = _fold_peak()
+                _open.add(self)
+        self.rss = rss()
+
+    def stop(self) -> dict:
+        """Stop measuring.
+
+        Returns:
+            dict: rss (delta in bytes), and in trace mode peak (bytes above the start)
+                and, for the outermost probe, top (allocation sites as "file:line +size")
+        """
+        result = dict(rss=rss() - self.rss)
+        if self.trace:
+            with _lock:
+                _fold_peak()
+                _open.discard(self)
+            result["peak"] = max(self.peak - self.traced, 0)
+            _depth.reset(self._token)
+            if self.snapshot is not None:
+                stats = _snapshot().compare_to(self.snapshot, "lineno")
+                result["top"] = [
+                    f"{_site(stat.traceback[0])} {format_size(stat.size_diff)}"
+                    for stat in stats[: self.top]
+                    if stat.size_diff > 0
+                ]
+            del self.snapshot
+        return result
+
+
+def _fold_peak() -> int:
+    """Fold the tracemalloc peak into the open probes and reset it (called under `_lock`).
+
+    Returns:
+        int: Currently traced bytes
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    for probe in _open:
+        probe.peak = max(probe.peak, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+def format_size(n_bytes: int) -> str:
+    """Signed size in KB or MB."""
+    if abs(n_bytes) < 2**20:
+        return f"{n_bytes / 2**10:+.1f}KB"
+    return f"{n_bytes / 2**20:+.1f}MB"
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    """Snapshot of the traced allocations, without those of tracemalloc itself."""
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+
+
+def _site(frame: tracemalloc.Frame) -> str:
+    """Short `file:line` of an allocation site."""
+    path = (
+        os.path.relpath(frame.filename)
+        if frame.filename.startswith(os.getcwd())
+        else frame.filename
+    )
+    line = linecache.getline(frame.filename, frame.lineno).strip()
+    return f"{path}:{frame.lineno} ({line[:40]})" if line else f"{path}:{frame.lineno}"
@@ -1,19 +1,208 @@
-"""Requests module for handling HTTP requests."""
+"""Requests module for handling HTTP requests.
 
-from typing import Any
+`safe_post` goes through a shared `HttpClient`: a pooled keep-alive `requests.Session` with
+connect/read timeouts, retries with exponential backoff and jitter, and a circuit breaker per host.
 
+API logging is bounded by `ApiLogPolicy`: successful requests are sampled, every call site is
+rate limited, payloads are truncated and secrets redacted, and suppressed records are counted.
+
+Besides JSON, bodies can be msgpack, raw binary (NumPy buffers, PCM) or multipart, optionally
+gzip/zstd compressed and streamed from file handles (see `RequestBody`).
+"""
+
+import atexit
+import gzip
+import json as jsonlib
+import random
+import sys
+import threading
+import zlib
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from functools import lru_cache, partial
+from time import monotonic, sleep, time
+from typing import Any, AsyncIterator, BinaryIO, Iterable, Iterator, Mapping
+from urllib.parse import urlsplit
+
+import msgpack
+import numpy as np
 import requests
 from requests import Response, RequestException
+from requests.adapters import HTTPAdapter
+from urllib3 import encode_multipart_formdata
+from urllib3.exceptions import NewConnectionError
 import asyncio
 import aiohttp
 
-from src.core.logger import log_api
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
 
+from src.core.logger import log_api, log_info, log_warning
 
 HEADERS = {
     "accept": "application/json",
     "Content-Type": "application/json",
 }
+MSGPACK_TYPES = (
+    "application/msgpack",
+    "application/x-msgpack",
+    "application/vnd.msgpack",
+)
+COMPRESSIONS = ("gzip", "zstd")
+CHUNK_SIZE = 2**16  # bytes read at a time from streamed file handles
+
+
+##################################################
+# API logging
+##################################################
+@dataclass
+class ApiLogPolicy:
+    """What `safe_post` logs (everything by default; sampling and rate limits are opt-in).
+
+    Attributes:
+        sample_rate (float): Fraction of successful requests logged (errors are not sampled)
+        rate_limit (float): Records per second per call site (0: unlimited)
+        burst (int): Records a call site can log at once before being rate limited
+        max_chars (int): Characters kept of the payload and of the response (0: omitted)
+        redact (tuple[str, ...]): Keys masked in headers and payloads (case-insensitive)
+        reproduction_code (bool): Add a `requests.post` snippet reproducing the request
+    """
+
+    sample_rate: float = 1.0
+    rate_limit: float = 0.0
+    burst: int = 20
+    max_chars: int = 2000
+    redact: tuple[str, ...] = (
+        "authorization",
+        "api_key",
+        "apikey",
+        "password",
+        "secret",
+        "token",
+    )
+    reproduction_code: bool = True
+
+
+class ApiLogLimiter:
+    """Sampling and per-call-site rate limiting (token buckets) of API log records.
+
+    Args:
+        policy (ApiLogPolicy): Logging policy
+    """
+
+    def __init__(self, policy: ApiLogPolicy = ApiLogPolicy()):
+        self.policy = policy
+        # call site -> [tokens, last refill, suppressed since the last record]
+        self.sites = {}
+        self.counts = dict(logged=0, sampled_out=0, rate_limited=0)
+        self._lock = threading.Lock()
+
+    def allow(self, site: str, error: bool = False) -> tuple[bool, int]:
+        """Whether to log a record of `site`.
+
+        Returns:
+            tuple[bool, int]: (log it, records of the site suppressed since its last record)
+        """
+        policy = self.policy
+        with self._lock:
+            state = self.sites.setdefault(site, [policy.burst, monotonic(), 0])
+            if (
+                not error
+                and policy.sample_rate < 1
+                and random.random() >= policy.sample_rate
+            ):
+                self.counts["sampled_out"] += 1
+                state[2] += 1
+                return False, 0
+            if policy.rate_limit > 0:
+                now = monotonic()
+                state[0] = min(
+                    policy.burst, state[0] + (now - state[1]) * policy.rate_limit
+                )
+                state[1] = now
+                if state[0] < 1:
+                    self.counts["rate_limited"] += 1
+                    state[2] += 1
+                    return False, 0
+                state[0] -= 1
+            self.counts["logged"] += 1
+            suppressed, state[2] = state[2], 0
+        return True, suppressed
+
+    def report(self) -> None:
+        """Log the counters if records were suppressed."""
+        if self.counts["sampled_out"] or self.counts["rate_limited"]:
+            log_info(dict(api_log=self.counts))
+
+
+API_LOG = ApiLogLimiter()
+atexit.register(API_LOG.report)
+
+
+def call_site(depth: int = 2) -> str:
+    """`file:line` of the caller `depth` frames up."""
+    frame = sys._getframe(depth)
+    return f"{frame.f_code.co_filename}:{frame.f_lineno}"
+
+
+def redact(obj: Any, keys: tuple[str, ...]) -> Any:
+    """Copy of `obj` with the values of `keys` masked in (nested) dicts and lists."""
+    if isinstance(obj, dict):
+        return {
+            k: "***" if str(k).lower() in keys else redact(v, keys)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        return [redact(v, keys) for v in obj]
+    return obj
+
+
+def _bound(obj: Any, max_chars: int, max_items: int, depth: int) -> Any:
+    """Summary of `obj` small enough to serialize cheaply (like `reprlib`).
+
+    Containers are cut to `max_items` entries and `depth` levels, strings to `max_chars`,
+    and arrays and binary buffers are replaced by their type and shape.
+    """
+    if isinstance(obj, str):
+        return obj if len(obj) <= max_chars else f"{obj[:max_chars]}..."
+    if isinstance(obj, (bool, int, float)) or obj is None:
+        return obj
+    if isinstance(obj, np.ndarray):
+        return f"<ndarray {obj.dtype} {obj.shape}>"
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return f"<{type(obj).__name__} {len(obj)}>"
+    if isinstance(obj, dict):
+        if depth <= 0:
+            return f"{{... {len(obj)} keys}}"
+        items = {
+            str(k): _bound(v, max_chars, max_items, depth - 1)
+            for _, (k, v) in zip(range(max_items), obj.items())
+        }
+        if len(obj) > max_items:
+            items["..."] = f"+{len(obj) - max_items} keys"
+        return items
+    if isinstance(obj, (list, tuple)):
+        if depth <= 0:
+            return f"[... {len(obj)} items]"
+        items = [_bound(v, max_chars, max_items, depth - 1) for v in obj[:max_items]]
+        if len(obj) > max_items:
+            items.append(f"... +{len(obj) - max_items} items")
+        return items
+    return _bound(str(obj), max_chars, max_items, depth)
+
+
+def truncate(obj: Any, max_chars: int, max_items: int = 20, depth: int = 4) -> str:
+    """Compact JSON text of `obj`, cut to `max_chars`.
+
+    `obj` is summarized first (see `_bound`), so large payloads are never serialized in full.
+    """
+    obj = _bound(obj, max_chars, max_items, depth)
+    text = jsonlib.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... (+{len(text) - max_chars} chars)"
 
 
 class APIError(Exception):
@@ -29,23 +218,478 @@ class APIError(Exception):
         str: The API error message.
     """
 
-    def __init__(self, url: str, headers: dict, json: dict, response: Response):
+    def __init__(self, url: str, headers: dict, json: dict, response: Response | None):
         self.url = url
         self.headers = headers
         self.json = json
-        self.response = response
+        self.response = response  # None if no response was received
 
     def __str__(self):
-        return f"""APIError: <Response [{self.response.status_code}]>
+        if self.response is None:
+            status, body = "no response", repr(self.__cause__)
+        else:
+            status = f"<Response [{self.response.status_code}]>"
+            try:
+                body = self.response.json()
+            except ValueError:
+                body = self.response.text[:1000]
+        return f"""APIError: {status}
 requests.post(
     url="{self.url}",
     headers={self.headers},
-    json={self.json}
-) -> {self.response.json()}"""
+    json={truncate(self.json, 1000)}
+) -> {body}"""
+
+
+class CircuitOpenError(APIError):
+    """Request refused without being sent, because its host keeps failing."""
+
+    def __str__(self):
+        return f"CircuitOpenError: {urlsplit(self.url).netloc} is failing, request to {self.url} not sent"
+
+
+##################################################
+# Request bodies
+##################################################
+def pack(obj: Any) -> bytes:
+    """msgpack encoding; NumPy arrays become `{"__ndarray__": True, "dtype", "shape", "data"}` maps."""
+    return msgpack.packb(obj, default=_pack_default)
+
+
+def unpack(content: bytes) -> Any:
+    """msgpack decoding; arrays encoded by `pack` are restored as read-only NumPy arrays."""
+    return msgpack.unpackb(content, object_hook=_unpack_hook)
+
+
+def _pack_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return {
+            "__ndarray__": True,
+            "dtype": obj.dtype.str,
+            "shape": list(obj.shape),
+            "data": np.ascontiguousarray(obj).data.cast("B"),
+        }
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj).__name__} with msgpack")
+
+
+def _unpack_hook(obj: dict) -> Any:
+    if obj.get("__ndarray__") is True:
+        return np.frombuffer(obj["data"], dtype=obj["dtype"]).reshape(obj["shape"])
+    return obj
+
+
+def _zstd():
+    if zstandard is None:
+        raise ImportError(
+            "zstd compression requires the optional zstandard package: "
+            "pip install zstandard (or poetry install -E zstd)"
+        )
+    return zstandard
+
+
+def compress(content: bytes, compression: str) -> bytes:
+    """Compress `content` (gzip | zstd)."""
+    if compression == "gzip":
+        return gzip.compress(content, compresslevel=6)
+    return _zstd().ZstdCompressor().compress(content)
+
+
+def compress_stream(chunks: Iterable[bytes], compression: str) -> Iterator[bytes]:
+    """Compress a stream of chunks (gzip | zstd) without holding it in memory."""
+    if compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    else:
+        compressor = _zstd().ZstdCompressor().compressobj()
+    for chunk in chunks:
+        if out := compressor.compress(chunk):
+            yield out
+    yield compressor.flush()
+
+
+def decode_body(content: bytes, headers: Mapping) -> Any:
+    """Decode a response body by its Content-Type.
+
+    Returns:
+        Any: msgpack and JSON data, NumPy arrays for binary bodies with `X-Array-Dtype` and
+            `X-Array-Shape` headers, bytes for other binary bodies
+    """
+    content_type = headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type in MSGPACK_TYPES:
+        return unpack(content)
+    if content_type == "application/octet-stream" or content_type.startswith("audio/"):
+        if "X-Array-Dtype" in headers:
+            shape = [int(n) for n in headers.get("X-Array-Shape", "-1").split(",") if n]
+            return np.frombuffer(content, dtype=headers["X-Array-Dtype"]).reshape(shape)
+        return content
+    return jsonlib.loads(content)
+
+
+class RequestBody:
+    """Encoded request body of `HttpClient.post`, `safe_post` and `AsyncHttpClient`.
+
+    In-memory content is encoded and compressed once and reused by retries;
+    binary file handles are streamed in `CHUNK_SIZE` chunks (compressed on the fly),
+    rewound for retries when seekable and never retried otherwise.
+    Responses are decompressed by the HTTP clients (gzip, and zstd when zstandard is installed).
+
+    Args:
+        content (bytes | memoryview | BinaryIO): Body, or a binary file handle to stream
+        content_type (str): Content-Type of the body
+        compression (str, optional): gzip | zstd (`Content-Encoding`)
+        headers (dict, optional): Extra request headers
+        preview (Any, optional): Logged (and shown in `APIError`) instead of the content
+
+    Examples:
+        >>> safe_post(url, body=RequestBody.msgpack(dict(notes=notes), compression="gzip"))
+        >>> safe_post(url, body=RequestBody.binary(audio))  # float32 PCM, no copy
+        >>> with open("song.wav", "rb") as f:
+        ...     safe_post(url, body=RequestBody.binary(f, "audio/wav", compression="zstd"))
+    """
+
+    def __init__(
+        self,
+        content: bytes | memoryview | BinaryIO,
+        content_type: str,
+        compression: str | None = None,
+        headers: dict | None = None,
+        preview: Any = None,
+    ):
+        assert compression in (
+            None,
+            *COMPRESSIONS,
+        ), f"Invalid compression: {compression}"
+        self.stream = hasattr(content, "read")
+        self.compression = compression
+        if self.stream:
+            self._start = content.tell() if content.seekable() else None
+            if compression == "zstd":
+                _zstd()
+        else:
+            if isinstance(content, memoryview):
+                content = content.cast("B")  # len() in bytes
+            if compression is not None:
+                content = compress(content, compression)
+        self.content = content
+        self.headers = {"Content-Type": content_type, **(headers or {})}
+        if compression is not None:
+            self.headers["Content-Encoding"] = compression
+        if preview is None:
+            size = "stream" if self.stream else f"{len(content)} bytes"
+            preview = (
+                f"<{content_type} {size}{', ' + compression if compression else ''}>"
+            )
+        self.preview = preview
+
+    @classmethod
+    def json(cls, obj: Any, compression: str | None = None) -> "RequestBody":
+        """JSON body."""
+        content = jsonlib.dumps(obj, separators=(",", ":")).encode()
+        return cls(content, "application/json", compression, preview=obj)
+
+    @classmethod
+    def msgpack(cls, obj: Any, compression: str | None = None) -> "RequestBody":
+        """msgpack body (NumPy arrays as raw buffers, see `pack`); accepts msgpack or JSON back."""
+        headers = {"accept": f"{MSGPACK_TYPES[0]}, application/json"}
+        return cls(pack(obj), MSGPACK_TYPES[0], compression, headers, preview=obj)
+
+    @classmethod
+    def binary(
+        cls,
+        data: bytes | np.ndarray | BinaryIO,
+        content_type: str = "application/octet-stream",
+        compression: str | None = None,
+    ) -> "RequestBody":
+        """Raw body: bytes, a NumPy array (sent without copy, dtype and shape in `X-Array-*` headers)
+        or a binary file handle (streamed)."""
+        headers = None
+        if isinstance(data, np.ndarray):
+            headers = {
+                "X-Array-Dtype": data.dtype.str,
+                "X-Array-Shape": ",".join(map(str, data.shape)),
+            }
+            data = np.ascontiguousarray(data).data
+        return cls(data, content_type, compression, headers)
+
+    @classmethod
+    def multipart(cls, fields: dict) -> "RequestBody":
+        """multipart/form-data body.
+
+        Args:
+            fields (dict): name -> value (str | bytes | np.ndarray) or (filename, value[, content type]);
+                file handles are read into memory, stream large files with `binary` instead
+        """
+
+        def read(value):
+            if hasattr(value, "read"):
+                return value.read()
+            if isinstance(value, np.ndarray):
+                return np.ascontiguousarray(value).tobytes()
+            return value
+
+        encoded = {
+            name: (
+                (value[0], read(value[1]), *value[2:])
+                if isinstance(value, tuple)
+                else read(value)
+            )
+            for name, value in fields.items()
+        }
+        content, content_type = encode_multipart_formdata(encoded)
+        return cls(content, content_type, preview={name: "..." for name in fields})
+
+    @property
+    def replayable(self) -> bool:
+        """Whether the body can be sent again (for retries)."""
+        return not self.stream or self._start is not None
+
+    def payload(self) -> bytes | BinaryIO | Iterator[bytes]:
+        """Content to send with requests (file handles are rewound first)."""
+        if not self.stream:
+            return self.content
+        if self._start is not None:
+            self.content.seek(self._start)
+        if self.compression is None:
+            return self.content
+        return compress_stream(
+            iter(partial(self.content.read, CHUNK_SIZE), b""), self.compression
+        )
+
+    def apayload(self) -> bytes | AsyncIterator[bytes]:
+        """Content to send with aiohttp (file handles are read in a thread)."""
+        if not self.stream:
+            return self.content
+        payload = self.payload()
+        if self.compression is None:
+            payload = iter(partial(payload.read, CHUNK_SIZE), b"")
+        return _aiter_chunks(payload)
+
+
+async def _aiter_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        yield chunk
+
+
+##################################################
+# HTTP client
+##################################################
+class CircuitBreaker:
+    """Circuit breaker of one host.
+
+    After `threshold` consecutive failures the circuit opens and requests fail fast;
+    after `reset_timeout` seconds one trial request is let through (half-open),
+    which closes the circuit on success or opens it again on failure.
+
+    Args:
+        threshold (int): Consecutive failures opening the circuit
+        reset_timeout (float): Seconds before a trial request
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.opened_at = monotonic()  # half-open: one trial per reset timeout
+            return True
+
+    def success(self) -> None:
+        """Record a successful request."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self) -> None:
+        """Record a failed request."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = monotonic()
+
+
+def backoff_delay(
+    attempt: int, backoff: float, backoff_max: float, retry_after: str | None = None
+) -> float:
+    """Seconds to wait before retry `attempt` (0-based): `Retry-After` if given, else full jitter."""
+    if retry_after:
+        try:
+            wait = float(retry_after)
+        except ValueError:  # HTTP date
+            wait = parsedate_to_datetime(retry_after).timestamp() - time()
+        return min(max(wait, 0), backoff_max)
+    return random.uniform(0, min(backoff_max, backoff * 2**attempt))
+
+
+def not_sent(e: RequestException) -> bool:
+    """Whether a request failed before being sent (no connection could be established)."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    if isinstance(e, requests.ConnectionError) and e.args:
+        return isinstance(getattr(e.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+class HttpClient:
+    """Pooled HTTP client with timeouts, retries and circuit breakers.
+
+    Connection errors and connect timeouts (the request was not sent) are always retried;
+    read timeouts and `retry_statuses` responses only for idempotent requests.
+    Retries wait `uniform(0, min(backoff_max, backoff * 2 ** attempt))` seconds (full jitter),
+    or the `Retry-After` of the response.
+
+    Args:
+        pool_size (int): Keep-alive connections kept per host
+        connect_timeout (float): Seconds to establish a connection
+        read_timeout (float): Seconds to wait for the response
+        retries (int): Retries after the first attempt
+        backoff (float): Base of the exponential backoff in seconds
+        backoff_max (float): Maximum backoff in seconds
+        retry_statuses (tuple[int, ...]): Response statuses retried for idempotent requests
+        breaker_threshold (int): Consecutive failures opening the circuit of a host
+        breaker_reset (float): Seconds before a trial request to an open host
+
+    Examples:
+        >>> client = HttpClient(pool_size=32, read_timeout=60)
+        >>> result = client.post(url, json, idempotent=True)
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        backoff_max: float = 10.0,
+        retry_statuses: tuple[int, ...] = (429, 502, 503, 504),
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_statuses = retry_statuses
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers = {}  # host -> CircuitBreaker
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Circuit breaker of the host of `url`."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(
+                    self.breaker_threshold, self.breaker_reset
+                )
+            return self.breakers[host]
+
+    def delay(self, attempt: int, response: Response | None = None) -> float:
+        """Seconds to wait before retry `attempt` (0-based)."""
+        retry_after = None if response is None else response.headers.get("Retry-After")
+        return backoff_delay(attempt, self.backoff, self.backoff_max, retry_after)
+
+    def post(
+        self,
+        url: str,
+        json: Any = None,
+        headers: dict = HEADERS,
+        idempotent: bool = False,
+        site: str | None = None,
+        body: RequestBody | None = None,
+    ) -> Response:
+        """POST with retries.
+
+        Args:
+            url (str): The URL of the API.
+            json (Any): The JSON data of the API.
+            headers (dict): The headers of the API.
+            idempotent (bool): Whether the request can be repeated safely
+                (retries read timeouts and `retry_statuses` responses).
+            site (str, optional): Call site for API logging. Defaults to the caller.
+            body (RequestBody, optional): Encoded body sent instead of `json`
+                (never retried when it streams a non-seekable file).
+
+        Returns:
+            Response: The successful response.
+
+        Raises:
+            CircuitOpenError: The circuit of the host is open.
+            APIError: The request failed (after retries).
+        """
+        site = site or call_site()
+        breaker = self.breaker(url)
+        retries = self.retries
+        if body is not None:
+            headers, json = {**headers, **body.headers}, body.preview
+            retries = retries if body.replayable else 0
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                log_request(site, url, headers, json, None, error=True)
+                raise CircuitOpenError(url, headers, json, None)
+            response = None
+            content = dict(json=json) if body is None else dict(data=body.payload())
+            try:
+                response = self.session.post(
+                    url, headers=headers, timeout=self.timeout, **content
+                )
+                response.raise_for_status()
+                breaker.success()
+                log_request(site, url, headers, json, None, error=False)
+                return response
+            except RequestException as e:
+                status = None if response is None else response.status_code
+                if status is None or status >= 500 or status == 429:
+                    breaker.failure()
+                else:
+                    breaker.success()  # the host is up; the request is wrong
+                retriable = not_sent(e) or (
+                    idempotent and (status is None or status in self.retry_statuses)
+                )
+                if not retriable or attempt == retries:
+                    log_request(site, url, headers, json, response, error=True)
+                    raise APIError(url, headers, json, response) from e
+                wait = self.delay(attempt, response)
+                log_warning(
+                    f"Retry {attempt + 1}/{retries} of {url} in {wait:.2f}s: {e!r}"
+                )
+                sleep(wait)
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> HttpClient:
+    """Shared client of `safe_post`."""
+    return HttpClient()
 
 
 def get_request_log(
-    url: str, headers: dict, json: dict, response: Response | None = None
+    url: str,
+    headers: dict,
+    json: dict,
+    response: Response | None = None,
+    policy: ApiLogPolicy | None = None,
 ) -> dict:
     """Get the request log.
 
@@ -54,87 +698,374 @@ def get_request_log(
         headers (dict): The headers of the API.
         json (dict): The JSON data of the API.
         response (Response): The response of the API.
+        policy (ApiLogPolicy): Truncation and redaction. Defaults to the policy of `API_LOG`.
 
     Returns:
         dict: The request log.
     """
-    log = dict(
-        url=url,
-        headers=headers,
-        json=json,
-        reproduction_code=f"import requests; requests.post(url='{url}', headers={headers}, json={json})",
-    )
+    policy = policy or API_LOG.policy
+    headers = redact(headers, policy.redact)
+    log = dict(url=url, headers=headers)
+    if policy.max_chars > 0:
+        payload = truncate(redact(json, policy.redact), policy.max_chars)
+        log.update(json=payload)
+        if policy.reproduction_code:
+            log.update(
+                reproduction_code=f"import requests; requests.post(url='{url}', headers={headers}, json={payload})"
+            )
 
-    if response:
-        log.update(
-            response=dict(status_code=response.status_code, json=response.json())
-        )
+    if response is not None:
+        log.update(response=dict(status_code=response.status_code))
+        if policy.max_chars > 0:
+            log["response"].update(body=response.text[: policy.max_chars])
 
     return log
 
 
-def safe_post(url: str, json: dict, headers: dict = HEADERS) -> dict:
+def log_request(
+    site: str,
+    url: str,
+    headers: dict,
+    json: dict,
+    response: Response | None,
+    error: bool,
+) -> None:
+    """Log a request of a call site if `API_LOG` allows it."""
+    allowed, suppressed = API_LOG.allow(site, error)
+    if not allowed:
+        return
+    log = get_request_log(url, headers, json, response)
+    if suppressed:
+        log.update(suppressed=suppressed)
+    log_api(log, error=error)
+
+
+def safe_post(
+    url: str,
+    json: dict | None = None,
+    headers: dict = HEADERS,
+    idempotent: bool = False,
+    client: HttpClient | None = None,
+    body: RequestBody | None = None,
+) -> Any:
     """Requests post with validation.
 
     Args:
         url (str): The URL of the API.
         json (dict): The JSON data of the API.
         headers (dict): The headers of the API.
+        idempotent (bool): Whether the request can be retried after it was sent.
+        client (HttpClient, optional): Client to use. Defaults to the shared client.
+        body (RequestBody, optional): msgpack, binary or multipart body sent instead of `json`.
 
     Returns:
-        Response: The response of the API.
+        Any: The response of the API, decoded by its Content-Type (see `decode_body`).
+
+    Raises:
+        APIError: The request failed (after retries) or its host is failing (`CircuitOpenError`).
     """
-    # Check the API communication validness
-    try:
-        response = requests.post(url=url, headers=headers, json=json)
-        response.raise_for_status()
-        log = get_request_log(url, headers, json)
-        log_api(log)
-        return response.json()
-    except RequestException as e:
-        log = get_request_log(url, headers, json)
-        log_api(log, error=True)
-        raise APIError(url, headers, json, response)
+    client = client or get_http_client()
+    response = client.post(
+        url, json, headers, idempotent=idempotent, site=call_site(), body=body
+    )
+    return decode_body(response.content, response.headers)
 
 
-async def post_request(session: aiohttp.ClientSession, url: str, data: dict) -> list | dict:
+async def post_request(
+    session: aiohttp.ClientSession,
+    url: str,
+    data: dict | None = None,
+    body: RequestBody | None = None,
+) -> Any:
     """Post request using aiohttp.
 
     Args:
         session (aiohttp.ClientSession): aiohttp session.
         url (str): URL to post.
         data (dict): Data to post.
+        body (RequestBody, optional): Encoded body sent instead of `data`.
 
     Returns:
-        list | dict: Response data.
+        Any: Response data, decoded by its Content-Type.
     """
+    content = dict(json=data) if body is None else dict(data=body.apayload())
     async with session.post(
         url=url,
-        headers=HEADERS,
-        json=data,
+        headers=HEADERS if body is None else {**HEADERS, **body.headers},
+        **content,
     ) as response:
         response.raise_for_status()
-        return await response.json()
+        return decode_body(await response.read(), response.headers)
+
+
+def _to_response(response: aiohttp.ClientResponse, content: bytes) -> Response:
+    """`requests.Response` with the status, headers and body of an aiohttp response."""
+    result = Response()
+    result.status_code = response.status
+    result.reason = response.reason
+    result.url = str(response.url)
+    result.headers.update(response.headers)
+    result._content = content
+    return result
 
 
-async def async_post(url: str, batch: list[dict]) -> list[Any]:
+class AsyncHttpClient:
+    """Async HTTP client with a long-lived session, bounded concurrency, timeouts and retries.
+
+    Create it once per event loop and reuse it across batches (`async with` or `close`).
+    Retries and circuit breakers follow `HttpClient`.
+
+    Args:
+        concurrency (int): Requests in flight at once (also the connection limit)
+        limit_per_host (int): Connections per host (0: no limit besides `concurrency`)
+        connect_timeout (float): Seconds to establish a connection
+        read_timeout (float): Seconds to wait for each read of the response
+        retries (int): Retries after the first attempt
+        backoff (float): Base of the exponential backoff in seconds
+        backoff_max (float): Maximum backoff in seconds
+        retry_statuses (tuple[int, ...]): Response statuses retried for idempotent requests
+        breaker_threshold (int): Consecutive failures opening the circuit of a host
+        breaker_reset (float): Seconds before a trial request to an open host
+
+    Examples:
+        >>> async with AsyncHttpClient(concurrency=32) as client:
+        ...     async for i, result in client.imap(url, batch):
+        ...         if isinstance(result, APIError):
+        ...             ...
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 64,
+        limit_per_host: int = 0,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        backoff_max: float = 10.0,
+        retry_statuses: tuple[int, ...] = (429, 502, 503, 504),
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+    ):
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_statuses = retry_statuses
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers = {}  # host -> CircuitBreaker
+        self._session = None
+        self._semaphore = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Session of the client (created in the running event loop on first use)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency, limit_per_host=self.limit_per_host
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Circuit breaker of the host of `url`."""
+        host = urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_reset
+            )
+        return self.breakers[host]
+
+    async def post(
+        self,
+        url: str,
+        data: Any = None,
+        headers: dict = HEADERS,
+        idempotent: bool = False,
+        body: RequestBody | None = None,
+    ) -> Any:
+        """POST with retries (at most `concurrency` requests in flight).
+
+        Args:
+            url (str): URL to post.
+            data (Any): JSON data to post.
+            headers (dict): Headers of the request.
+            idempotent (bool): Whether the request can be repeated safely.
+            body (RequestBody, optional): Encoded body sent instead of `data`.
+
+        Returns:
+            Any: Response data, decoded by its Content-Type.
+
+        Raises:
+            CircuitOpenError: The circuit of the host is open.
+            APIError: The request failed (after retries) or its response could not be decoded.
+        """
+        session, breaker = self.session, self.breaker(url)
+        retries = self.retries
+        if body is not None:
+            headers, data = {**headers, **body.headers}, body.preview
+            retries = retries if body.replayable else 0
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(url, headers, data, None)
+            retry_after = error_response = None
+            content = dict(json=data) if body is None else dict(data=body.apayload())
+            try:
+                async with self._semaphore:
+                    async with session.post(
+                        url, headers=headers, **content
+                    ) as response:
+                        retry_after = response.headers.get("Retry-After")
+                        raw = await response.read()
+                        if response.status >= 400:
+                            error_response = _to_response(response, raw)
+                        response.raise_for_status()
+                        try:
+                            result = decode_body(raw, response.headers)
+                        except Exception as e:  # e.g. a truncated msgpack or array body
+                            breaker.success()
+                            raise APIError(
+                                url, headers, data, _to_response(response, raw)
+                            ) from e
+                breaker.success()
+                return result
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                status = getattr(e, "status", None)
+                if status is None or status >= 500 or status == 429:
+                    breaker.failure()
+                else:
+                    breaker.success()  # the host is up; the request is wrong
+                retriable = isinstance(e, aiohttp.ClientConnectorError) or (
+                    idempotent and (status is None or status in self.retry_statuses)
+                )
+                if not retriable or attempt == retries:
+                    raise APIError(url, headers, data, error_response) from e
+                await asyncio.sleep(
+                    backoff_delay(attempt, self.backoff, self.backoff_max, retry_after)
+                )
+
+    async def imap(
+        self,
+        url: str,
+        batch: Iterable,
+        headers: dict = HEADERS,
+        idempotent: bool = False,
+    ) -> AsyncIterator[tuple[int, Any]]:
+        """Post every item of `batch` and yield results as they complete.
+
+        Items are JSON data or `RequestBody`. They are read from `batch` lazily and
+        at most `concurrency` requests are pending, so memory stays constant for huge
+        (or generated) batches.
+
+        Yields:
+            tuple[int, Any]: (index in `batch`, response data or the `APIError` of the item)
+        """
+        items = enumerate(batch)
+        pending = {}  # task -> index
+
+        def schedule() -> bool:
+            for index, data in items:
+                if isinstance(data, RequestBody):
+                    request = self.post(url, None, headers, idempotent, body=data)
+                else:
+                    request = self.post(url, data, headers, idempotent)
+                pending[asyncio.ensure_future(request)] = index
+                return True
+            return False
+
+        try:
+            while len(pending) < self.concurrency and schedule():
+                pass
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index = pending.pop(task)
+                    error = task.exception()
+                    if error is not None and not isinstance(error, APIError):
+                        raise error
+                    yield index, error if error is not None else task.result()
+                    schedule()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def map(
+        self,
+        url: str,
+        batch: Iterable,
+        headers: dict = HEADERS,
+        idempotent: bool = False,
+    ) -> tuple[list[Any], dict[int, APIError]]:
+        """Post every item of `batch`.
+
+        Returns:
+            tuple[list[Any], dict[int, APIError]]: Results in the order of `batch` (None for failed items)
+                and the errors of the failed items by index
+        """
+        results, errors = [], {}
+        async for index, result in self.imap(url, batch, headers, idempotent):
+            results.extend([None] * (index + 1 - len(results)))
+            if isinstance(result, APIError):
+                errors[index] = result
+            else:
+                results[index] = result
+        return results, errors
+
+    async def close(self) -> None:
+        """Close the session."""
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+
+async def async_post(
+    url: str,
+    batch: list[dict],
+    client: AsyncHttpClient | None = None,
+    return_errors: bool = False,
+) -> list[Any] | tuple[list[Any], dict[int, APIError]]:
     """Post requests asynchronously.
 
     Args:
         url (str): URL to post.
         batch (list[dict]): List of data to post.
+        client (AsyncHttpClient, optional): Long-lived client to reuse. Defaults to a client for this batch.
+        return_errors (bool): Return partial results and per-item errors instead of raising
+            the first error.
 
     Returns:
-        list[Any]: List of response data.
-    
+        list[Any] | tuple[list[Any], dict[int, APIError]]: List of response data
+            (and the errors of the failed items by index if `return_errors`).
+
     Examples:
         import asyncio
         asyncio.run(async_post(url, batch))
     """
-    async with aiohttp.ClientSession() as session:
-        futures = [post_request(session, url, data) for data in batch]
-        responses = await asyncio.gather(*futures)
-    return responses
+    if client is None:
+        async with AsyncHttpClient() as client:
+            return await async_post(url, batch, client, return_errors)
+    results, errors = await client.map(url, batch)
+    if return_errors:
+        return results, errors
+    if errors:
+        raise errors[min(errors)]
+    return results
 
 
 if __name__ == "__main__":
@@ -1,51 +1,303 @@
 """Timer class.
 
 Context and decorator form timer.
+
+Timings are either logged on every exit (`log` mode) or recorded into the in-memory `STATS`
+registry (`stats` mode), which keeps per-name aggregates and is summarized on demand or at exit.
+The default mode is set by the `TIMER_MODE` environment variable (log | stats | both).
+When `TRACE_DIR` is set, every timer is also recorded as a trace span (see `src.core.trace`).
+With `TIMER_MEMORY` (rss | trace), timers also measure memory (see `src.core.memory`).
 """
 
+import atexit
 import contextlib
+import copy
+import math
+import threading
+from collections import defaultdict
 from functools import wraps
 from time import perf_counter
 
+from config import TIMER_MEMORY, TIMER_MODE
+from src.core import trace
+from src.core.memory import MEMORY_MODES, MemoryProbe, format_size
 from src.core.logger import log_info
 
+TIMER_MODES = ("log", "stats", "both")
+
+
+##################################################
+# Statistics registry
+##################################################
+class QuantileSketch:
+    """Streaming quantile sketch with bounded relative error (log-spaced buckets, as in DDSketch).
+
+    Memory grows with the dynamic range of the values, not their number:
+    1 ns to 1 hour spans about 1,100 buckets at 1% accuracy.
+
+    Args:
+        alpha (float): Relative accuracy of the quantiles
+    """
+
+    __slots__ = ("gamma", "_log_gamma", "buckets", "zeros")
+
+    def __init__(self, alpha: float = 0.01):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = defaultdict(int)
+        self.zeros = 0
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        if value > 0:
+            self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+        else:
+            self.zeros += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimated `q`-quantile (0 <= q <= 1)."""
+        count = self.zeros + sum(self.buckets.values())
+        rank = q * (count - 1)
+        if count == 0 or rank < self.zeros:
+            return 0.0
+        cumulative = self.zeros
+        for index in sorted(self.buckets):
+            cumulative += self.buckets[index]
+            if cumulative > rank:
+                break
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+
+class TimerStat:
+    """Aggregated timings (and memory) of one name."""
+
+    __slots__ = ("count", "total", "min", "max", "sketch", "rss", "rss_max", "peak_max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.sketch = QuantileSketch()
+        self.rss = self.rss_max = self.peak_max = None
+
+    def add(self, elapsed: float, memory: dict | None = None) -> None:
+        """Record one timing (and the memory measured by `MemoryProbe`)."""
+        self.count += 1
+        self.total += elapsed
+        self.min = min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        self.sketch.add(elapsed)
+        if memory is not None:
+            self.rss = (self.rss or 0) + memory["rss"]
+            self.rss_max = max(self.rss_max or 0, memory["rss"])
+            if "peak" in memory:
+                self.peak_max = max(self.peak_max or 0, memory["peak"])
+
+
+class TimerStats:
+    """Registry of aggregated timings keyed by name.
+
+    Examples:
+        >>> with Timer("step", mode="stats"):
+        ...     step()
+        >>> STATS.report()
+    """
+
+    percentiles = (50, 90, 99)
 
+    def __init__(self):
+        self.stats = defaultdict(TimerStat)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, elapsed: float, memory: dict | None = None) -> None:
+        """Record one timing of `name` (and its memory measurement)."""
+        with self._lock:
+            self.stats[name].add(elapsed, memory)
+
+    def summary(self) -> list[dict]:
+        """Aggregates of every name (seconds, bytes), sorted by total time.
+
+        RSS growth (`rss`: total, `rss_max`: largest of one call) and the largest tracemalloc peak
+        (`peak_max`) are None for names timed without memory measurement.
+        """
+        with self._lock:
+            rows = [
+                dict(
+                    name=name,
+                    count=stat.count,
+                    total=stat.total,
+                    mean=stat.total / stat.count,
+                    min=stat.min,
+                    **{
+                        f"p{p}": stat.sketch.quantile(p / 100) for p in self.percentiles
+                    },
+                    max=stat.max,
+                    rss=stat.rss,
+                    rss_max=stat.rss_max,
+                    peak_max=stat.peak_max,
+                )
+                for name, stat in self.stats.items()
+            ]
+        return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+    def table(self) -> str:
+        """Summary as a text table (times in milliseconds, total in seconds)."""
+        rows = self.summary()
+        width = max([len(row["name"]) for row in rows] + [4])
+        columns = ["mean", "min", *(f"p{p}" for p in self.percentiles), "max"]
+        lines = [f"{'name':{width}} | {'count':>9} | {'total(s)':>10} | "]
+        lines[0] += " | ".join(f"{c + '(ms)':>10}" for c in columns)
+        memory = ["rss", "rss_max", "peak_max"]
+        if any(row["rss"] is not None for row in rows):
+            lines[0] += " | " + " | ".join(f"{c + '(MB)':>12}" for c in memory)
+        for row in rows:
+            line = (
+                f"{row['name']:{width}} | {row['count']:9d} | {row['total']:10.3f} | "
+            )
+            line += " | ".join(f"{row[c] * 1e3:10.4f}" for c in columns)
+            if row["rss"] is not None:
+                line += " | " + " | ".join(_format_mb(row[c], 12) for c in memory)
+            lines.append(line)
+        return "\n".join(lines)
+
+    def report(self) -> None:
+        """Log the summary table."""
+        if self.stats:
+            log_info(f"Timer statistics\n{self.table()}", dump=False)
+
+    def reset(self) -> None:
+        """Drop all recorded timings."""
+        with self._lock:
+            self.stats.clear()
+
+
+def _format_mb(n_bytes: int | None, width: int = 0) -> str:
+    return f"{'-':>{width}}" if n_bytes is None else f"{n_bytes / 2**20:+{width}.1f}"
+
+
+STATS = TimerStats()
+atexit.register(STATS.report)
+
+
+##################################################
+# Timer
+##################################################
 class Timer(contextlib.ContextDecorator):
     """Timer.
 
+    Each decorated call runs on a copy of the timer, so recursive and concurrent calls
+    keep their own start time, span and memory probe.
+
+    Args:
+        name (str): Name of the timed code
+        mode (str, optional): log | stats | both. Defaults to `TIMER_MODE`.
+        span (str, optional): Name of the trace span. Defaults to `name`.
+        memory (str, optional): off | rss | trace. Defaults to `TIMER_MEMORY`.
+        stat (str, optional): Name of the row in `STATS`. Defaults to `name`.
+
     Examples:
         >>> with Timer('Code1'):
         ...     sleep(1)
         * Code1        | 1.00s (0.02m)
+        >>> with Timer('Code2', memory="trace"):
+        ...     x = np.ones(2**24)
+        * Code2        | 0.03s (0.00m) | rss +128.1MB | peak +128.0MB
     """
 
-    def __init__(self, name="Elapsed time"):
+    def __init__(
+        self,
+        name="Elapsed time",
+        mode: str | None = None,
+        span: str | None = None,
+        memory: str | None = None,
+        stat: str | None = None,
+    ):
+        mode = mode or TIMER_MODE
+        memory = memory or TIMER_MEMORY
+        assert mode in TIMER_MODES, f"Invalid timer mode: {mode}"
+        assert memory in MEMORY_MODES, f"Invalid memory mode: {memory}"
         self.name = name
+        self.span = span or name
+        self.stat = stat or name
+        self.log = mode != "stats"
+        self.record = mode != "log"
+        self.memory = memory
+        self.probe = None
+
+    def _recreate_cm(self):
+        return copy.copy(self)
 
     def __enter__(self):
+        if trace.TRACER is not None:
+            self._span = trace.enter_span(self.span)
+        if self.memory != "off":
+            self.probe = MemoryProbe(self.memory)
+            self.probe.start()
         self.start_time = perf_counter()
         return self
 
     def __exit__(self, *exc):
         elapsed_time = perf_counter() - self.start_time
-        log_info(f"{'* ' + self.name:15}| {elapsed_time:.2f}s ({elapsed_time/60:.2f}m)")
+        memory = None if self.probe is None else self.probe.stop()
+        if trace.TRACER is not None:
+            trace.exit_span(
+                self._span[0],
+                self.span,
+                self.start_time,
+                elapsed_time,
+                *self._span[1:],
+                memory,
+            )
+        if self.record:
+            STATS.record(self.stat, elapsed_time, memory)
+        if self.log:
+            msg = f"{'* ' + self.name:15}| {elapsed_time:.2f}s ({elapsed_time/60:.2f}m)"
+            if memory is not None:
+                msg += f" | rss {format_size(memory['rss'])}"
+                if "peak" in memory:
+                    msg += f" | peak {format_size(memory['peak'])}"
+                    msg += "".join(f"\n    {site}" for site in memory.get("top", ()))
+            log_info(msg, dump=False)
         return False
 
 
-def T(fn: callable) -> callable:
+def T(fn: callable = None, *, mode: str | None = None) -> callable:
     """Timer decorator.
 
+    Args:
+        fn (callable): Function to time
+        mode (str, optional): log | stats | both. Defaults to `TIMER_MODE`.
+
     Example:
         >>> @T
         >>> def f():
         ...     sleep(1)
         * f()          | 1.00s (0.02m)
+        >>> @T(mode="stats")  # aggregated in STATS
+        >>> def g():
+        ...     pass
     """
+    if fn is None:
+        return lambda fn: T(fn, mode=mode)
+    name = f"{fn.__name__}()"
 
     @wraps(fn)
     def _log(*args, **kwargs):
-        with Timer(f"{fn.__name__}()"):
+        with Timer(name, mode):
             rst = fn(*args, **kwargs)
         return rst
 
     return _log
+
+
+if __name__ == "__main__":
+
+    @T(mode="stats")
+    def f():
+        sum(range(100))
+
+    tic = perf_counter()
+    for _ in range(100_000):
+        f()
+    print(f"{(perf_counter() - tic) * 10:.2f}us per call")
@@ -0,0 +1,181 @@
+"""Trace spans.
+
+Spans of `Timer`, `T` and `D` (name, start, duration, pid, tid, depth, parent) are buffered in memory
+and appended as Chrome Trace Event JSON to one file per process under `TRACE_DIR`,
+so a whole dataset generation or transcription run can be opened in Perfetto (ui.perfetto.dev)
+or chrome://tracing after merging with `python -m src.core.trace <TRACE_DIR>`.
+"""
+
+import json
+import os
+import threading
+from contextvars import ContextVar
+from glob import glob
+from multiprocessing.util import Finalize, register_after_fork
+from time import perf_counter, time
+
+from config import TRACE_DIR
+
+# (name, depth) of the enclosing span
+_span = ContextVar("trace_span", default=(None, 0))
+_epoch = time() - perf_counter()  # perf_counter -> wall clock, shared by all processes
+
+
+class TraceWriter:
+    """Buffered writer of complete ("X") trace events.
+
+    Recording a span appends a tuple to a list; events are serialized and appended to
+    `<root>/trace-<pid>.json` (JSON array format, no closing bracket needed) every `buffer_size` spans
+    and at exit.
+
+    Args:
+        root (str): Output directory
+        buffer_size (int): Spans kept in memory between writes
+    """
+
+    def __init__(self, root: str, buffer_size: int = 10_000):
+        self.root = root
+        self.buffer_size = buffer_size
+        self.events = []
+        self.threads = {}  # native thread id -> name
+        self._written_threads = set()
+        self._lock = threading.Lock()  # events and threads
+        self._write_lock = threading.Lock()  # trace file
+        os.register_at_fork(after_in_child=self._reset)
+        # Flushed at exit, also in multiprocessing children (which skip atexit)
+        register_after_fork(
+            self, lambda self: Finalize(self, self.flush, exitpriority=10)
+        )
+        Finalize(self, self.flush, exitpriority=10)
+
+    @property
+    def path(self) -> str:
+        """Trace file of the current process."""
+        return os.path.join(self.root, f"trace-{os.getpid()}.json")
+
+    def add(
+        self,
+        name: str,
+        start: float,
+        duration: float,
+        depth: int,
+        parent: str | None,
+        args: dict | None = None,
+    ) -> None:
+        """Record a span (`start` in `perf_counter` seconds, `args`: extra JSON fields)."""
+        tid = threading.get_native_id()
+        with self._lock:
+            if tid not in self.threads:
+                self.threads[tid] = threading.current_thread().name
+            self.events.append((name, start, duration, tid, depth, parent, args))
+            full = len(self.events) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Append the buffered spans to the trace file."""
+        with self._write_lock:
+            with self._lock:
+                events, self.events = self.events, []
+                threads = dict(self.threads)
+            if not events:
+                return
+            pid = os.getpid()
+            lines = [
+                json.dumps(
+                    dict(
+                        name="thread_name",
+                        ph="M",
+                        pid=pid,
+                        tid=tid,
+                        args=dict(name=name),
+                    )
+                )
+                for tid, name in threads.items()
+                if tid not in self._written_threads
+            ]
+            self._written_threads.update(threads)
+            quoted = {}  # JSON strings of the span names, encoded once per flush
+            for name, start, duration, tid, depth, parent, args in events:
+                for key in (name, parent):
+                    if key not in quoted:
+                        quoted[key] = json.dumps(key)
+                extra = "".join(
+                    f",{json.dumps(k)}:{json.dumps(v)}" for k, v in (args or {}).items()
+                )
+                lines.append(
+                    f'{{"name":{quoted[name]},"ph":"X","ts":{(start + _epoch) * 1e6:.1f},'
+                    f'"dur":{duration * 1e6:.1f},"pid":{pid},"tid":{tid},'
+                    f'"args":{{"depth":{depth},"parent":{quoted[parent]}{extra}}}}}'
+                )
+            os.makedirs(self.root, exist_ok=True)
+            new = not os.path.exists(self.path)
+            with open(self.path, "a") as f:
+                f.write(("[\n" if new else "") + ",\n".join(lines) + ",\n")
+
+    def _reset(self) -> None:
+        """Drop the state inherited by a forked child."""
+        self.events = []
+        self.threads = {}
+        self._written_threads = set()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+
+TRACER = TraceWriter(TRACE_DIR) if TRACE_DIR else None
+
+
+def enter_span(name: str) -> tuple:
+    """Make `name` the current span.
+
+    Returns:
+        tuple: (token to restore the enclosing span, depth, parent name)
+    """
+    parent, depth = _span.get()
+    return _span.set((name, depth + 1)), depth + 1, parent
+
+
+def exit_span(
+    token,
+    name: str,
+    start: float,
+    duration: float,
+    depth: int,
+    parent: str | None,
+    args: dict | None = None,
+) -> None:
+    """Restore the enclosing span and record `name`."""
+    _span.reset(token)
+    TRACER.add(name, start, duration, depth, parent, args)
+
+
+def load_trace(path: str) -> list[dict]:
+    """Events of a trace file written by `TraceWriter`."""
+    with open(path) as f:
+        text = f.read().rstrip().rstrip(",")
+    return json.loads(text if text.endswith("]") else text + "]")
+
+
+def merge_traces(root: str, path: str) -> int:
+    """Merge the per-process trace files of `root` into one Chrome trace JSON file.
+
+    Returns:
+        int: Number of events
+    """
+    events = []
+    for file in sorted(glob(os.path.join(root, "trace-*.json"))):
+        events += load_trace(file)
+    with open(path, "w") as f:
+        json.dump(dict(traceEvents=events, displayTimeUnit="ms"), f)
+    return len(events)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Merge per-process trace files")
+    parser.add_argument("root", help="TRACE_DIR of the run")
+    parser.add_argument("-o", "--output", default="trace.json")
+    args = parser.parse_args()
+    n = merge_traces(args.root, args.output)
+    print(f"{n} events -> {args.output} (open in ui.perfetto.dev)")
@@ -1,44 +1,353 @@
 """Utility module.
 
 Commonly used functions and classes are here.
+
+`lmap` maps in chunks on persistent `concurrent.futures` pools, and large NumPy arguments
+reach worker processes through shared memory instead of being pickled.
 """
 
+import atexit
+import math
+import multiprocessing as mp
+import os
+import pickle
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from datetime import datetime
+from functools import partial
+from itertools import islice
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+from typing import Any, Iterable, Iterator
 
-from src.core.logger import log_info
+import numpy as np
 
+try:
+    import cloudpickle
+except ImportError:  # functions sent to processes must then be picklable by reference
+    cloudpickle = None
+
+from src.core.logger import log_info
 
 vars_ = lambda obj: {k: v for k, v in vars(obj).items() if not k.startswith("__")}
 str2dt = lambda s, format="%Y-%m-%d": datetime.strptime(s, format)
 dt2str = lambda dt, format="%Y-%m-%d": dt.strftime(format)
 
 
-def lmap(fn: callable, arr: list, scheduler: str | None = None) -> list:
+##################################################
+# Parallel map
+##################################################
+SCHEDULERS = ("single-threaded", "sync", "synchronous", "threads", "processes")
+# NumPy arguments at least this large go to processes through shared memory
+SHARED_MIN_BYTES = 2**20
+
+_executors = {}  # (scheduler, max_workers, pid) -> persistent pool
+_executors_lock = threading.Lock()
+_attached = {}  # name -> SharedMemory attached by this worker process
+_used = set()  # names attached (or reused) by the task being unpickled
+_worker = threading.local()  # `active` while a thread runs a chunk of `imap`
+
+
+def get_executor(
+    scheduler: str = "threads", max_workers: int | None = None
+) -> Executor:
+    """Persistent pool of `lmap`, created on first use in each process.
+
+    Args:
+        scheduler (str): threads | processes
+        max_workers (int, optional): Number of workers. Defaults to the `concurrent.futures` default.
+
+    Returns:
+        Executor: Thread or process pool (a broken process pool is replaced).
+            Process pools start their workers with "spawn".
+    """
+    assert scheduler in ("threads", "processes"), f"Invalid scheduler: {scheduler}"
+    key = (scheduler, max_workers, os.getpid())
+    with _executors_lock:
+        # a worker died (BrokenProcessPool)
+        if getattr(_executors.get(key), "_broken", False):
+            _executors.pop(key).shutdown(wait=False, cancel_futures=True)
+        if key not in _executors:
+            if scheduler == "threads":
+                _executors[key] = ThreadPoolExecutor(max_workers=max_workers)
+            else:
+                # Workers share the resource tracker of this process, which then sees the
+                # shared memory of `SharedArray` unlinked here instead of leaked by them
+                resource_tracker.ensure_running()
+                # Spawned workers do not inherit locks held by other threads at fork time
+                _executors[key] = ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=mp.get_context("spawn")
+                )
+        return _executors[key]
+
+
+def shutdown_executors() -> None:
+    """Stop the pools of `lmap` created by this process."""
+    with _executors_lock:
+        for key in [key for key in _executors if key[2] == os.getpid()]:
+            _executors.pop(key).shutdown(cancel_futures=True)
+
+
+atexit.register(shutdown_executors)
+
+
+class SharedArray:
+    """Copy of a NumPy array in shared memory, pickled as a reference to the block.
+
+    Unpickling in another process attaches the block and gives a read-only view,
+    so the data is copied once instead of being pickled and sent through a pipe.
+
+    Args:
+        array (np.ndarray): Array to share (not of object dtype)
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.dtype, self.shape = array.dtype.str, array.shape
+        np.ndarray(self.shape, self.dtype, buffer=self.shm.buf)[...] = array
+
+    def __reduce__(self):
+        return _attach_shared, (self.shm.name, self.dtype, self.shape)
+
+    def close(self) -> None:
+        """Release and unlink the block."""
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach_shared(name: str, dtype: str, shape: tuple) -> np.ndarray:
+    if name not in _attached:
+        _attached[name] = SharedMemory(name=name)
+    _used.add(name)
+    view = np.ndarray(shape, dtype, buffer=_attached[name].buf)
+    view.flags.writeable = False
+    return view
+
+
+def _share(obj: Any, blocks: dict, depth: int = 2) -> Any:
+    """`obj` with large NumPy arrays (also in tuples, lists, dicts and partial arguments)
+    replaced by `SharedArray`s, which are added to `blocks` (id of the array -> SharedArray).
+    """
+    if isinstance(obj, np.ndarray):
+        if obj.nbytes < SHARED_MIN_BYTES or obj.dtype.hasobject:
+            return obj
+        if id(obj) not in blocks:
+            blocks[id(obj)] = SharedArray(obj)
+        return blocks[id(obj)]
+    if depth == 0:
+        return obj
+    if type(obj) in (tuple, list):
+        return type(obj)(_share(x, blocks, depth - 1) for x in obj)
+    if type(obj) is dict:
+        return {k: _share(v, blocks, depth - 1) for k, v in obj.items()}
+    if isinstance(obj, partial):
+        args = _share(obj.args, blocks, depth)
+        keywords = _share(obj.keywords, blocks, depth)
+        return partial(obj.func, *args, **keywords)
+    return obj
+
+
+class _ByValue:
+    """Function pickled with cloudpickle (lambdas, closures, functions of `__main__`)
+    and unpickled as the function itself by the workers."""
+
+    def __init__(self, fn: callable):
+        self.payload = cloudpickle.dumps(fn)
+
+    def __reduce__(self):
+        return pickle.loads, (self.payload,)
+
+
+def _picklable(fn: callable) -> callable:
+    """`fn` made sendable to worker processes (once, instead of once per chunk)."""
+    if cloudpickle is not None:
+        return _ByValue(fn)
+    try:
+        pickle.dumps(fn)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise TypeError(
+            f"{fn!r} cannot be sent to worker processes ({e}): use a module-level function, "
+            "or install cloudpickle to send lambdas and closures"
+        ) from e
+    return fn
+
+
+def _run_chunk(fn: callable, chunk: list) -> list:
+    """Apply `fn` to a chunk (in a worker), after releasing blocks of finished tasks."""
+    for name in set(_attached) - _used:
+        try:
+            _attached[name].close()
+        except BufferError:  # views kept alive by `fn`
+            continue
+        del _attached[name]
+    _used.clear()
+    _worker.active = True
+    try:
+        return [fn(item) for item in chunk]
+    finally:
+        _worker.active = False
+
+
+class Progress:
+    """Progress hook of `lmap` logging progress and throughput at most every `interval` seconds.
+
+    Args:
+        name (str): Name in the log
+        interval (float): Seconds between logs (the last one is always logged)
+    """
+
+    def __init__(self, name: str = "lmap", interval: float = 5.0):
+        self.name = name
+        self.interval = interval
+        self._last = -math.inf
+
+    def __call__(self, done: int, total: int, elapsed: float) -> None:
+        now = perf_counter()
+        if done < total and now - self._last < self.interval:
+            return
+        self._last = now
+        log_info(
+            f"{self.name:15}| {done}/{total} ({done / max(total, 1):.0%}) "
+            f"| {done / max(elapsed, 1e-9):.1f} items/s",
+            dump=False,
+        )
+
+
+def imap(
+    fn: callable,
+    arr: Iterable,
+    scheduler: str | Executor | None = None,
+    chunksize: int | None = None,
+    ordered: bool = True,
+    max_workers: int | None = None,
+    progress: callable = None,
+) -> Iterator:
+    """Map streaming the results.
+
+    Items are sent in chunks (one task per chunk, `4 * workers` chunks by default),
+    at most `2 * workers` chunks are in flight, and results are yielded as chunks finish.
+    With processes, large NumPy arrays in the items and in `functools.partial` arguments of `fn`
+    are passed through shared memory (read-only in the workers), and `fn` is sent with cloudpickle
+    when it is installed (else it must be picklable by reference: no lambdas or closures).
+    Inside a task of `imap`, named schedulers run single-threaded: nested maps would otherwise
+    wait on the pool they occupy.
+
+    Args:
+        fn (callable): Function to apply
+        arr (Iterable): Items to apply the function to
+        scheduler (str | Executor, optional): single-threaded | threads | processes, or an executor.
+            Defaults to single-threaded.
+        chunksize (int, optional): Items per task. Defaults to `ceil(len(arr) / (4 * workers))`.
+        ordered (bool): Yield results in the order of `arr` (else in completion order)
+        max_workers (int, optional): Workers of the persistent pool
+        progress (callable, optional): Called as `progress(done, total, elapsed)` after each chunk
+
+    Yields:
+        Any: Results of `fn`
+    """
+    items = arr if hasattr(arr, "__len__") else list(arr)
+    total, tic = len(items), perf_counter()
+    if isinstance(scheduler, str) and getattr(_worker, "active", False):
+        scheduler = None  # nested in a task of the pool
+    if scheduler is None or scheduler in ("single-threaded", "sync", "synchronous"):
+        for done, item in enumerate(items, 1):
+            yield fn(item)
+            if progress is not None:
+                progress(done, total, perf_counter() - tic)
+        return
+
+    if not isinstance(scheduler, Executor):
+        assert scheduler in SCHEDULERS, f"Invalid scheduler: {scheduler}"
+        scheduler = get_executor(scheduler, max_workers)
+    workers = getattr(scheduler, "_max_workers", None) or os.cpu_count() or 1
+    chunksize = chunksize or max(1, math.ceil(total / (4 * workers)))
+    processes = isinstance(scheduler, ProcessPoolExecutor)
+    fn_blocks = {}  # shared arrays of `fn`
+    if processes:
+        fn = _share(fn, fn_blocks)
+
+    iterator = iter(items)
+    chunks = iter(lambda: list(islice(iterator, chunksize)), [])
+    # future -> (chunk size, shared arrays of the chunk), in submission order
+    pending = {}
+
+    def submit(chunk: list) -> None:
+        blocks = {}
+        if processes:
+            chunk = [_share(item, blocks) for item in chunk]
+        pending[scheduler.submit(_run_chunk, fn, chunk)] = (len(chunk), blocks)
+
+    done = 0
+    try:
+        if processes:
+            fn = _picklable(fn)
+        for chunk in islice(chunks, 2 * workers):
+            submit(chunk)
+        while pending:
+            if ordered:
+                finished = [next(iter(pending))]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results = future.result()
+                size, blocks = pending.pop(future)
+                for block in blocks.values():
+                    block.close()
+                done += size
+                if progress is not None:
+                    progress(done, total, perf_counter() - tic)
+                for chunk in islice(chunks, 1):
+                    submit(chunk)
+                yield from results
+    finally:
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        for _, blocks in pending.values():
+            for block in blocks.values():
+                block.close()
+        for block in fn_blocks.values():
+            block.close()
+
+
+def lmap(
+    fn: callable,
+    arr: list,
+    scheduler: str | Executor | None = None,
+    chunksize: int | None = None,
+    max_workers: int | None = None,
+    progress: callable = None,
+) -> list:
     """List map.
 
     Args:
         fn (callable): Function to apply
         arr (list): List to apply function
-        scheduler (str, optional): Dask scheduler. Defaults to None.
+        scheduler (str | Executor, optional): Scheduler. Defaults to None.
             - None | "single-threaded": Single-threaded
-            - "threads": Multi-threaded
-            - "processes": Multi-process
+            - "threads": Multi-threaded (persistent thread pool)
+            - "processes": Multi-process (persistent process pool)
+            - Executor: Any `concurrent.futures` executor
+        chunksize (int, optional): Items per task. Defaults to `ceil(len(arr) / (4 * workers))`.
+        max_workers (int, optional): Workers of the persistent pool
+        progress (callable, optional): Called as `progress(done, total, elapsed)` after each chunk,
+            e.g. `Progress("resample")`
 
     Returns:
         list: List of results
-    """
-    from dask import delayed, compute
 
-    if scheduler is None:
-        return list(map(fn, arr))
-    else:
-        assert scheduler in [
-            "single-threaded",
-            "threads",
-            "processes",
-        ], f"Invalid scheduler: {scheduler}"
-        tasks = (delayed(fn)(e) for e in arr)
-        return list(compute(*tasks, scheduler=scheduler))
+    Examples:
+        >>> lmap(f, range(100_000), "processes", progress=Progress("f"))
+        >>> lmap(partial(g, table=big_array), keys, "processes")  # big_array in shared memory
+    """
+    return list(imap(fn, arr, scheduler, chunksize, True, max_workers, progress))
 
 
 def tprint(dic: dict) -> None:
@@ -0,0 +1,25 @@
+"""Transcription engine.
+
+Exports are imported on first access, so processes that only need one module
+(e.g. inference workers importing `src.engine.model`) don't load pandas and scipy.
+"""
+
+from importlib import import_module
+
+_EXPORTS = {
+    "NOTE_COLUMNS": "src.engine.decoder",
+    "TranscriptionEngine": "src.engine.engine",
+    "get_engine": "src.engine.engine",
+    "FeatureCache": "src.engine.feature_cache",
+    "FeatureParams": "src.engine.features",
+    "get_feature_extractor": "src.engine.features",
+    "StreamingTranscriber": "src.engine.streaming",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
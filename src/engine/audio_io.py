@@ -0,0 +1,151 @@
+"""Audio input.
+
+Incremental decoding of audio files (WAV, FLAC, MP3, ... via soundfile) to float32 mono
+at the engine sample rate, with a streaming polyphase resampler.
+Files are read block by block, so memory stays bounded by the block size.
+"""
+
+from collections.abc import Iterator
+from functools import lru_cache
+from math import gcd
+from typing import BinaryIO
+
+import numpy as np
+from scipy.signal import firwin
+
+
+@lru_cache(maxsize=None)
+def polyphase_filter(up: int, down: int) -> np.ndarray:
+    """Polyphase decomposition of the anti-aliasing filter (same design as `scipy.signal.resample_poly`).
+
+    Args:
+        up (int): Upsampling factor
+        down (int): Downsampling factor
+
+    Returns:
+        np.ndarray: float32 taps of shape (up, n_taps), row `p` is `h[p::up]`
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1 / max_rate, window=("kaiser", 5.0)) * up
+    n_taps = -(-len(h) // up)
+    h = np.pad(h, (0, n_taps * up - len(h)))
+    phases = np.ascontiguousarray(h.reshape(n_taps, up).T, dtype=np.float32)
+    phases.flags.writeable = False
+    return phases
+
+
+class Resampler:
+    """Streaming polyphase resampler.
+
+    Output sample `n` is `sum_j x[j] * h[n * down + half_len - j * up]`,
+    computed for whole blocks of outputs with one gather and one reduction.
+    Feeding a signal in chunks gives the same output as `scipy.signal.resample_poly` on the whole signal.
+
+    Args:
+        orig_sr (int): Input sample rate
+        target_sr (int): Output sample rate
+
+    Examples:
+        >>> resampler = Resampler(44100, 16000)
+        >>> y = np.concatenate([resampler(chunk) for chunk in chunks] + [resampler.flush()])
+    """
+
+    block_size = 8192  # outputs computed at once (bounds the gathered taps)
+
+    def __init__(self, orig_sr: int, target_sr: int):
+        g = gcd(orig_sr, target_sr)
+        self.up, self.down = target_sr // g, orig_sr // g
+        self.half_len = 10 * max(self.up, self.down)
+        self.phases = (
+            None if self.up == self.down else polyphase_filter(self.up, self.down)
+        )
+        self.n_taps = 0 if self.phases is None else self.phases.shape[1]
+        # Input history, with zeros standing for samples before the start
+        self._buffer = np.zeros(self.n_taps, dtype=np.float32)
+        self._base = -self.n_taps  # absolute index of `_buffer[0]`
+        self.n_in = self.n_out = 0
+
+    def _positions(self, n: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Newest input index and filter phase of each output sample."""
+        t = n * self.down + self.half_len
+        return t // self.up, t % self.up
+
+    def _process(self, n_out: int) -> np.ndarray:
+        y = np.empty(n_out, dtype=np.float32)
+        taps = np.arange(self.n_taps)
+        for i in range(0, n_out, self.block_size):
+            n = np.arange(self.n_out + i, self.n_out + min(n_out, i + self.block_size))
+            last, phase = self._positions(n)
+            idx = (last - self._base)[:, None] - taps
+            y[i : i + len(n)] = np.einsum(
+                "ij,ij->i", self._buffer[idx], self.phases[phase]
+            )
+        self.n_out += n_out
+
+        # Drop the input that no later output needs
+        first = self._positions(np.array(self.n_out))[0] - self.n_taps + 1
+        drop = min(max(0, first - self._base), len(self._buffer))
+        self._buffer = self._buffer[drop:]
+        self._base += drop
+        return y
+
+    def __call__(self, chunk: np.ndarray) -> np.ndarray:
+        """Resample a chunk; outputs whose filter support extends past the chunk wait for the next one."""
+        if self.up == self.down:
+            self.n_in += len(chunk)
+            return np.asarray(chunk, dtype=np.float32)
+        self._buffer = np.concatenate(
+            [self._buffer, np.asarray(chunk, dtype=np.float32)]
+        )
+        self.n_in += len(chunk)
+        # Output n is ready once its newest input (n * down + half_len) // up has arrived
+        last = self.n_in * self.up - self.half_len - 1
+        n_ready = last // self.down + 1 if last >= 0 else 0
+        return self._process(max(0, n_ready - self.n_out))
+
+    def flush(self) -> np.ndarray:
+        """Remaining outputs, with zeros after the end of the input."""
+        if self.up == self.down:
+            return np.empty(0, dtype=np.float32)
+        total = -(-self.n_in * self.up // self.down)
+        n_out = total - self.n_out
+        if n_out <= 0:
+            return np.empty(0, dtype=np.float32)
+        last = self._positions(np.array(total - 1))[0]
+        pad = max(0, last - self._base + 1 - len(self._buffer))
+        self._buffer = np.concatenate([self._buffer, np.zeros(pad, dtype=np.float32)])
+        return self._process(n_out)
+
+
+def read_blocks(
+    file: str | BinaryIO, sr: int, block_seconds: float = 30.0
+) -> Iterator[np.ndarray]:
+    """Decode an audio file incrementally to float32 mono at `sr`.
+
+    Args:
+        file (str | BinaryIO): Path or file object (any format supported by soundfile)
+        sr (int): Output sample rate
+        block_seconds (float): Length of the decoded blocks (at the file sample rate)
+
+    Yields:
+        np.ndarray: float32 mono blocks at `sr`
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(file) as f:
+        resampler = Resampler(f.samplerate, sr)
+        blocksize = int(block_seconds * f.samplerate)
+        for block in f.blocks(blocksize=blocksize, dtype="float32", always_2d=True):
+            y = resampler(block.mean(axis=1))
+            if len(y) > 0:
+                yield y
+        y = resampler.flush()
+        if len(y) > 0:
+            yield y
+
+
+def load_audio(file: str | BinaryIO, sr: int) -> np.ndarray:
+    """Decode a whole audio file to float32 mono at `sr`."""
+    blocks = list(read_blocks(file, sr))
+    return np.concatenate(blocks) if blocks else np.empty(0, dtype=np.float32)
@@ -0,0 +1,224 @@
+"""Note decoder.
+
+Turns frame/onset probabilities into note events with array operations over the whole
+(frames x 88) matrix, without Python loops over frames or pitches.
+
+- Peak picking: onsets are local maxima in time of the onset probability above `onset_threshold`.
+- Notes start at onsets and last while the frame probability stays above `frame_low_threshold`
+  (or until the next onset of the same pitch).
+- Hysteresis: a note is kept only if its frame probability reaches `frame_threshold`.
+- Notes shorter than `min_frames` are dropped.
+- Velocity is the model velocity at the onset frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.engine.model import MIN_PITCH, N_PITCHES
+
+NOTE_COLUMNS = ["start_time", "end_time", "instrument", "note", "velocity"]
+
+
+def notes_to_table(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    pitches: np.ndarray,
+    velocities: np.ndarray,
+    frame_rate: float,
+    instrument: int = 0,
+) -> pd.DataFrame:
+    """Build a note table from frame-level note arrays.
+
+    Args:
+        starts (np.ndarray): Onset frame indices
+        ends (np.ndarray): Offset frame indices (exclusive)
+        pitches (np.ndarray): Pitch indices (0 ~ 87)
+        velocities (np.ndarray): Velocities (0 ~ 1)
+        frame_rate (float): Frames per second
+        instrument (int): Instrument id
+
+    Returns:
+        pd.DataFrame: Note table with `NOTE_COLUMNS` (times in seconds), sorted by start time
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    pitches = np.asarray(pitches, dtype=np.int64)
+    order = np.lexsort((pitches, starts))
+    return pd.DataFrame(
+        dict(
+            start_time=starts[order] / frame_rate,
+            end_time=np.asarray(ends, dtype=np.float64)[order] / frame_rate,
+            instrument=np.full(len(order), instrument, dtype=np.int64),
+            note=pitches[order] + MIN_PITCH,
+            velocity=np.clip(
+                np.round(np.asarray(velocities)[order] * 127), 1, 127
+            ).astype(np.int64),
+        )
+    )
+
+
+def empty_notes() -> tuple[np.ndarray, ...]:
+    """(starts, ends, pitches, velocities) without notes."""
+    return (
+        np.empty(0, dtype=np.int64),
+        np.empty(0, dtype=np.int64),
+        np.empty(0, dtype=np.int64),
+        np.empty(0, dtype=np.float32),
+    )
+
+
+class NoteDecoder:
+    """Vectorized note decoder.
+
+    Notes still sounding at the end of a block are carried as per-pitch state
+    (plus one held-back frame for peak picking), so probabilities can be fed block by block
+    and the concatenated output of `step` and `flush` matches `decode` on the whole matrix.
+
+    Args:
+        frame_threshold (float): Frame probability a note must reach (hysteresis high)
+        onset_threshold (float): Onset probability threshold
+        min_frames (int): Minimum note duration in frames
+        frame_low_threshold (float, optional): Frame probability a note must keep (hysteresis low).
+            Defaults to `frame_threshold`.
+    """
+
+    def __init__(
+        self,
+        frame_threshold: float = 0.5,
+        onset_threshold: float = 0.5,
+        min_frames: int = 1,
+        frame_low_threshold: float | None = None,
+    ):
+        self.frame_threshold = frame_threshold
+        self.onset_threshold = onset_threshold
+        self.min_frames = min_frames
+        self.frame_low_threshold = (
+            frame_threshold if frame_low_threshold is None else frame_low_threshold
+        )
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the carried state."""
+        self.position = 0  # absolute index of the next frame to decode
+        # Last (frame, onset, velocity) rows, waiting for their successor
+        self._held = None
+        self._prev_onset = np.zeros(N_PITCHES, dtype=np.float32)
+        self.start = np.full(N_PITCHES, -1, dtype=np.int64)  # open notes
+        self.velocity = np.zeros(N_PITCHES, dtype=np.float32)
+        self.reached = np.zeros(N_PITCHES, dtype=bool)  # reached `frame_threshold`
+
+    def decode(
+        self, frame: np.ndarray, onset: np.ndarray, velocity: np.ndarray
+    ) -> tuple[np.ndarray, ...]:
+        """Decode a whole matrix.
+
+        Args:
+            frame (np.ndarray): Frame probabilities of shape (n_frames, 88)
+            onset (np.ndarray): Onset probabilities of shape (n_frames, 88)
+            velocity (np.ndarray): Velocities of shape (n_frames, 88)
+
+        Returns:
+            tuple[np.ndarray, ...]: (starts, ends, pitches, velocities) of the notes
+        """
+        self.reset()
+        notes = self.step(frame, onset, velocity)
+        rest = self.flush()
+        return tuple(np.concatenate(arrs) for arrs in zip(notes, rest))
+
+    def step(
+        self, frame: np.ndarray, onset: np.ndarray, velocity: np.ndarray
+    ) -> tuple[np.ndarray, ...]:
+        """Decode a block of frames.
+
+        Args:
+            frame (np.ndarray): Frame probabilities of shape (n_frames, 88)
+            onset (np.ndarray): Onset probabilities of shape (n_frames, 88)
+            velocity (np.ndarray): Velocities of shape (n_frames, 88)
+
+        Returns:
+            tuple[np.ndarray, ...]: (starts, ends, pitches, velocities) of the finalized notes
+        """
+        if self._held is not None:
+            frame, onset, velocity = (
+                np.concatenate([held[None], x])
+                for held, x in zip(self._held, (frame, onset, velocity))
+            )
+        if len(frame) == 0:
+            return empty_notes()
+        self._held = (frame[-1], onset[-1], velocity[-1])
+        return self._decode(frame[:-1], onset[:-1], velocity[:-1], next_onset=onset[-1])
+
+    def flush(self) -> tuple[np.ndarray, ...]:
+        """Decode the held-back frame and finalize all open notes."""
+        if self._held is None:
+            rows = (np.empty((0, N_PITCHES), dtype=np.float32),) * 3
+        else:
+            rows = tuple(x[None] for x in self._held)
+        notes = self._decode(*rows, next_onset=None, close=True)
+        self.reset()
+        return notes
+
+    def _decode(
+        self,
+        frame: np.ndarray,
+        onset: np.ndarray,
+        velocity: np.ndarray,
+        next_onset: np.ndarray | None,
+        close: bool = False,
+    ) -> tuple[np.ndarray, ...]:
+        n = len(frame)
+        if next_onset is None:
+            next_onset = np.zeros(N_PITCHES, dtype=np.float32)
+        prev = np.concatenate([self._prev_onset[None], onset[:-1]])[:n]
+        following = np.concatenate([onset[1:], next_onset[None]])[:n]
+        if n:
+            self._prev_onset = onset[-1]
+        peaks = (onset >= self.onset_threshold) & (onset >= prev) & (onset > following)
+
+        # Boolean (88, n + 2) masks per pitch:
+        # column 0 carries the open notes, the last column closes every run
+        L = n + 2
+        is_onset = np.zeros((N_PITCHES, L), dtype=bool)
+        is_onset[:, 1:-1] = peaks.T
+        is_onset[:, 0] = self.start >= 0
+        active = is_onset.copy()
+        active[:, 1:-1] |= (frame >= self.frame_low_threshold).T
+        high = np.zeros((N_PITCHES, L), dtype=bool)
+        high[:, 1:-1] = (frame >= self.frame_threshold).T
+        high[:, 0] = self.reached
+        active, is_onset, high = active.ravel(), is_onset.ravel(), high.ravel()
+
+        starts = np.flatnonzero(is_onset)
+        if len(starts) == 0:
+            self.position += n
+            return empty_notes()
+
+        # A note lasts until the end of its active run or the next onset of the same pitch
+        run_starts = np.flatnonzero(active & ~np.roll(active, 1))
+        run_ends = np.flatnonzero(active & ~np.roll(active, -1)) + 1
+        run_end = run_ends[np.searchsorted(run_starts, starts, side="right") - 1]
+        next_start = np.append(starts[1:], np.iinfo(np.int64).max)
+        ends = np.minimum(run_end, next_start)
+        bounds = np.stack([starts, ends], axis=1).ravel()
+        reached = np.logical_or.reduceat(high, bounds)[::2]
+
+        pitches, columns = np.divmod(starts, L)
+        end_columns = ends - pitches * L
+        carried = columns == 0
+        abs_starts = np.where(carried, self.start[pitches], self.position + columns - 1)
+        abs_ends = self.position + end_columns - 1
+        velocities = np.where(
+            carried,
+            self.velocity[pitches],
+            velocity[np.maximum(columns - 1, 0), pitches] if n else 0,
+        ).astype(np.float32)
+
+        # Notes sounding through the last decoded frame stay open
+        open_ = (end_columns == L - 1) & (not close)
+        self.start[:] = -1
+        self.start[pitches[open_]] = abs_starts[open_]
+        self.velocity[pitches[open_]] = velocities[open_]
+        self.reached[pitches[open_]] = reached[open_]
+        self.position += n
+
+        done = ~open_ & reached & (abs_ends - abs_starts >= self.min_frames)
+        return abs_starts[done], abs_ends[done], pitches[done], velocities[done]
@@ -0,0 +1,199 @@
+"""Transcription engine.
+
+Feature extraction, model and decoder wired together from `config/engine.yaml`.
+"""
+
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import BinaryIO
+
+import numpy as np
+import pandas as pd
+
+from config import CFG_ENGINE
+from src.engine.decoder import NoteDecoder, notes_to_table
+from src.engine.feature_cache import FeatureCache
+from src.engine.features import FeatureParams, get_feature_extractor
+from src.engine.model import MODEL_OUTPUTS, PitchTemplateModel
+from src.engine.worker_pool import InferencePool
+
+
+class TranscriptionEngine:
+    """CPU transcription engine.
+
+    Args:
+        cfg (dict): Engine configuration. Defaults to `CFG_ENGINE`.
+
+    Examples:
+        >>> engine = TranscriptionEngine()
+        >>> notes = engine.transcribe(y)  # y: float32 mono at `engine.sr`
+    """
+
+    def __init__(self, cfg: dict = CFG_ENGINE):
+        self.cfg = cfg
+        self.sr = cfg.audio.sample_rate
+        self.feature_params = FeatureParams.from_config(cfg)
+        self.extractor = get_feature_extractor(self.feature_params)
+        self.n_fft = self.extractor.n_fft
+        self.hop_length = self.extractor.hop_length
+        self.frame_rate = self.sr / self.hop_length
+        self.model = PitchTemplateModel.from_config(
+            cfg.model, self.extractor.bin_frequencies
+        )
+        self.feature_cache = None
+        if cfg.feature_cache.enabled:
+            self.feature_cache = FeatureCache(
+                cfg.feature_cache.root, int(cfg.feature_cache.max_gb * 2**30)
+            )
+        self.pool = None
+        if cfg.inference.workers > 0:
+            self.pool = InferencePool(
+                self.model, cfg.inference.workers, min_frames=cfg.inference.min_frames
+            )
+
+    def features(self, y: np.ndarray, center: bool = True) -> np.ndarray:
+        """Compute feature frames of a signal.
+
+        Centered features of whole signals go through the feature cache when it is enabled.
+        """
+        if center and self.feature_cache is not None:
+            return self.feature_cache.features(y, self.extractor)
+        return self.extractor(y, center=center)
+
+    def predict(self, features: np.ndarray) -> dict[str, np.ndarray]:
+        """Run the model, on the shared-memory worker pool when it is enabled."""
+        if self.pool is not None:
+            return self.pool.predict(features)
+        return self.model.predict(features)
+
+    def decoder(self) -> NoteDecoder:
+        """Create a note decoder with the configured thresholds."""
+        cfg = self.cfg.decoder
+        return NoteDecoder(
+            frame_threshold=cfg.frame_threshold,
+            onset_threshold=cfg.onset_threshold,
+            min_frames=max(1, round(cfg.min_duration * self.frame_rate)),
+            frame_low_threshold=cfg.frame_low_threshold,
+        )
+
+    def to_table(self, notes: tuple[np.ndarray, ...]) -> pd.DataFrame:
+        """Convert decoded frame-level notes to a note table."""
+        return notes_to_table(*notes, frame_rate=self.frame_rate)
+
+    def transcribe(self, y: np.ndarray) -> pd.DataFrame:
+        """Transcribe a whole signal.
+
+        Args:
+            y (np.ndarray): Mono signal at `self.sr`
+
+        Returns:
+            pd.DataFrame: Note table
+        """
+        outputs = self.predict(self.features(y))
+        return self.to_table(
+            self.decoder().decode(*(outputs[k] for k in MODEL_OUTPUTS))
+        )
+
+    def transcribe_batch(self, signals: list[np.ndarray]) -> list[pd.DataFrame]:
+        """Transcribe several signals in one vectorized pass.
+
+        The features of all signals are packed into one array, each preceded by
+        `onset_lag` silent frames so neither the model nor the decoder looks across signals.
+        Model and decoder run once over the whole batch without padding,
+        so the results match `transcribe`.
+
+        Args:
+            signals (list[np.ndarray]): Mono signals at `self.sr`
+
+        Returns:
+            list[pd.DataFrame]: Note table of each signal
+        """
+        if not signals:
+            return []
+        gap = max(1, self.model.receptive_field - 1)
+        if self.feature_cache is not None:
+            features = [self.features(y) for y in signals]
+        else:
+            features = self.extractor.batch(signals)
+        silence = np.zeros((gap, self.extractor.n_features), dtype=np.float32)
+        packed = np.concatenate([a for f in features for a in (silence, f)])
+        outputs = self.predict(packed)
+        starts, ends, pitches, velocities = self.decoder().decode(
+            *(outputs[k] for k in MODEL_OUTPUTS)
+        )
+
+        lengths = np.array([len(f) + gap for f in features])
+        offsets = np.cumsum(lengths) - lengths + gap  # first frame of each signal
+        segment = np.searchsorted(offsets, starts, side="right") - 1
+        order = np.argsort(segment, kind="stable")
+        bounds = np.searchsorted(segment[order], np.arange(len(features) + 1))
+        tables = []
+        for i, offset in enumerate(offsets):
+            idx = order[bounds[i] : bounds[i + 1]]
+            notes = (
+                starts[idx] - offset,
+                ends[idx] - offset,
+                pitches[idx],
+                velocities[idx],
+            )
+            tables.append(self.to_table(notes))
+        return tables
+
+    def transcribe_blocks(self, blocks: Iterable[np.ndarray]) -> pd.DataFrame:
+        """Transcribe a long signal given as consecutive blocks.
+
+        Blocks go through a streaming session: each block only carries the FFT window
+        and model context of the previous one, and notes spanning a block boundary are
+        carried by the decoder and emitted once, so the result matches `transcribe`
+        on the concatenated signal while memory stays bounded by the block size.
+
+        Args:
+            blocks (Iterable[np.ndarray]): Mono signal blocks at `self.sr`
+
+        Returns:
+            pd.DataFrame: Note table
+        """
+        session = self.stream()
+        tables = [session.feed(block) for block in blocks]
+        tables.append(session.flush())
+        notes = pd.concat(
+            [t for t in tables if len(t) > 0] or tables, ignore_index=True
+        )
+        return notes.sort_values(["start_time", "note"], ignore_index=True)
+
+    def transcribe_file(
+        self, file: str | BinaryIO, chunk_seconds: float | None = None
+    ) -> pd.DataFrame:
+        """Transcribe an audio file of any length with bounded memory.
+
+        The file is decoded in chunks of `chunk_seconds`, downmixed to mono and resampled to `self.sr`.
+
+        Args:
+            file (str | BinaryIO): Path or file object (WAV, FLAC, MP3, ...)
+            chunk_seconds (float, optional): Chunk length. Defaults to `streaming.file_chunk_seconds`.
+
+        Returns:
+            pd.DataFrame: Note table
+        """
+        from src.engine.audio_io import read_blocks
+
+        chunk_seconds = chunk_seconds or self.cfg.streaming.file_chunk_seconds
+        return self.transcribe_blocks(read_blocks(file, self.sr, chunk_seconds))
+
+    def stream(self) -> "StreamingTranscriber":
+        """Create a streaming session."""
+        from src.engine.streaming import StreamingTranscriber
+
+        return StreamingTranscriber(self)
+
+    def close(self) -> None:
+        """Stop the inference workers."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> TranscriptionEngine:
+    """Shared engine built from `CFG_ENGINE`."""
+    return TranscriptionEngine()
@@ -0,0 +1,231 @@
+"""Transcription evaluation on MusicNet.
+
+Note-level precision/recall/F1 (with and without offsets) together with wall time and
+real-time factor per recording, so engine changes are judged on quality and speed at once.
+
+Matching follows the usual note-level protocol (as in `mir_eval.transcription`):
+an estimated note matches a reference note of the same pitch if the onsets differ by at most
+`onset_tolerance`, and (with offsets) the offsets differ by at most
+`max(offset_min_tolerance, offset_ratio * reference duration)`.
+Candidate pairs are found with `searchsorted` over (pitch, onset) keys and
+the one-to-one matching is a maximum bipartite matching on the sparse candidate graph.
+
+Run:
+    python -m src.engine.evaluation --split test
+"""
+
+import argparse
+from glob import glob
+from os.path import basename, join
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from scipy.sparse.csgraph import maximum_bipartite_matching
+
+from src.core.logger import log_info
+from src.engine.audio_io import load_audio
+from src.engine.decoder import NOTE_COLUMNS
+from src.engine.engine import TranscriptionEngine, get_engine
+from src.utils import DATA_PATH
+
+MUSICNET_SR = 44100
+
+
+############################################################
+# Note matching
+############################################################
+def match_notes(
+    ref: pd.DataFrame,
+    est: pd.DataFrame,
+    onset_tolerance: float = 0.05,
+    offset_ratio: float | None = 0.2,
+    offset_min_tolerance: float = 0.05,
+) -> np.ndarray:
+    """One-to-one matching between reference and estimated notes.
+
+    Args:
+        ref (pd.DataFrame): Reference note table
+        est (pd.DataFrame): Estimated note table
+        onset_tolerance (float): Maximum onset difference (seconds)
+        offset_ratio (float, optional): Offset tolerance as a fraction of the reference duration.
+            None ignores offsets.
+        offset_min_tolerance (float): Minimum offset tolerance (seconds)
+
+    Returns:
+        np.ndarray: Matched (ref index, est index) pairs of shape (n_matches, 2)
+    """
+    if len(ref) == 0 or len(est) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    ref_on, ref_off = ref.start_time.to_numpy(), ref.end_time.to_numpy()
+    est_on, est_off = est.start_time.to_numpy(), est.end_time.to_numpy()
+    ref_pitch, est_pitch = ref.note.to_numpy(), est.note.to_numpy()
+
+    # Keys place every pitch in its own time range, so one searchsorted finds the candidates
+    span = 2 * max(ref_on.max(), est_on.max()) + 1 + onset_tolerance
+    ref_key = ref_pitch * span + ref_on
+    order = np.argsort(ref_key, kind="stable")
+    est_key = est_pitch * span + est_on
+    lo = np.searchsorted(ref_key[order], est_key - onset_tolerance - 1e-9, side="left")
+    hi = np.searchsorted(ref_key[order], est_key + onset_tolerance + 1e-9, side="right")
+
+    counts = hi - lo
+    est_idx = np.repeat(np.arange(len(est)), counts)
+    ref_idx = order[
+        np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    ]
+    keep = (ref_pitch[ref_idx] == est_pitch[est_idx]) & (
+        np.abs(ref_on[ref_idx] - est_on[est_idx]) <= onset_tolerance + 1e-9
+    )
+    if offset_ratio is not None:
+        tolerance = np.maximum(
+            offset_min_tolerance, offset_ratio * (ref_off[ref_idx] - ref_on[ref_idx])
+        )
+        keep &= np.abs(ref_off[ref_idx] - est_off[est_idx]) <= tolerance + 1e-9
+    ref_idx, est_idx = ref_idx[keep], est_idx[keep]
+
+    graph = scipy.sparse.csr_matrix(
+        (np.ones(len(ref_idx), dtype=np.int8), (ref_idx, est_idx)),
+        shape=(len(ref), len(est)),
+    )
+    matched = maximum_bipartite_matching(graph, perm_type="column")  # est index per ref
+    ref_matched = np.flatnonzero(matched >= 0)
+    return np.stack([ref_matched, matched[ref_matched]], axis=1)
+
+
+def prf(n_matches: int, n_ref: int, n_est: int) -> tuple[float, float, float]:
+    """Precision, recall and F1."""
+    precision = n_matches / n_est if n_est else 0.0
+    recall = n_matches / n_ref if n_ref else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def evaluate_notes(
+    ref: pd.DataFrame,
+    est: pd.DataFrame,
+    onset_tolerance: float = 0.05,
+    offset_ratio: float = 0.2,
+    offset_min_tolerance: float = 0.05,
+) -> dict:
+    """Note-level metrics with and without offsets (pitch only, instruments are ignored).
+
+    Args:
+        ref (pd.DataFrame): Reference note table
+        est (pd.DataFrame): Estimated note table
+        onset_tolerance (float): Maximum onset difference (seconds)
+        offset_ratio (float): Offset tolerance as a fraction of the reference duration
+        offset_min_tolerance (float): Minimum offset tolerance (seconds)
+
+    Returns:
+        dict: precision, recall, f1 (onsets only) and precision_offset, recall_offset, f1_offset
+    """
+    onset = match_notes(ref, est, onset_tolerance, offset_ratio=None)
+    offset = match_notes(ref, est, onset_tolerance, offset_ratio, offset_min_tolerance)
+    metrics = {}
+    for suffix, matches in (("", onset), ("_offset", offset)):
+        precision, recall, f1 = prf(len(matches), len(ref), len(est))
+        metrics |= {
+            f"precision{suffix}": precision,
+            f"recall{suffix}": recall,
+            f"f1{suffix}": f1,
+        }
+    return metrics
+
+
+############################################################
+# MusicNet
+############################################################
+def load_musicnet_labels(path: str) -> pd.DataFrame:
+    """Read a MusicNet label file as a note table.
+
+    MusicNet times are sample indices at 44.1kHz; labels have no velocity (set to 64).
+    """
+    labels = pd.read_csv(path)
+    return pd.DataFrame(
+        dict(
+            start_time=labels.start_time.to_numpy() / MUSICNET_SR,
+            end_time=labels.end_time.to_numpy() / MUSICNET_SR,
+            instrument=labels.instrument.to_numpy(),
+            note=labels.note.to_numpy(),
+            velocity=np.full(len(labels), 64),
+        )
+    )[NOTE_COLUMNS]
+
+
+def evaluate_musicnet(
+    engine: TranscriptionEngine | None = None,
+    root: str = join(DATA_PATH, "musicnet"),
+    split: str = "test",
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """Evaluate the engine on a MusicNet split.
+
+    Args:
+        engine (TranscriptionEngine, optional): Engine. Defaults to `get_engine()`.
+        root (str): MusicNet directory with `{split}_data/*.wav` and `{split}_labels/*.csv`
+        split (str): "train" | "test"
+        limit (int, optional): Maximum number of recordings
+
+    Returns:
+        pd.DataFrame: One row per recording (id, duration, n_ref, n_est, metrics,
+            wall_time and rtf = wall_time / duration), sorted by id
+    """
+    engine = engine or get_engine()
+    rows = []
+    for wav_path in sorted(glob(join(root, f"{split}_data", "*.wav")))[:limit]:
+        recording = basename(wav_path).removesuffix(".wav")
+        ref = load_musicnet_labels(join(root, f"{split}_labels", f"{recording}.csv"))
+        y = load_audio(wav_path, engine.sr)
+        duration = len(y) / engine.sr
+
+        tic = perf_counter()
+        est = engine.transcribe(y)
+        wall_time = perf_counter() - tic
+
+        rows.append(
+            dict(
+                id=recording,
+                duration=duration,
+                n_ref=len(ref),
+                n_est=len(est),
+                **evaluate_notes(ref, est),
+                wall_time=wall_time,
+                rtf=wall_time / duration,
+            )
+        )
+        log_info(f"{recording}: f1={rows[-1]['f1']:.3f}, rtf={rows[-1]['rtf']:.4f}")
+    return pd.DataFrame(rows)
+
+
+def summarize(results: pd.DataFrame) -> dict:
+    """Overall metrics: means over recordings and the total real-time factor."""
+    metrics = [
+        c for c in results.columns if c.startswith(("precision", "recall", "f1"))
+    ]
+    return dict(
+        n_recordings=len(results),
+        **results[metrics].mean().to_dict(),
+        wall_time=float(results.wall_time.sum()),
+        rtf=float(results.wall_time.sum() / results.duration.sum()),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate the transcription engine on MusicNet"
+    )
+    parser.add_argument("--root", default=join(DATA_PATH, "musicnet"))
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument(
+        "--output", default=None, help="CSV path for per-recording results"
+    )
+    args = parser.parse_args()
+
+    results = evaluate_musicnet(root=args.root, split=args.split, limit=args.limit)
+    print(results.to_string(index=False))
+    log_info(dict(evaluation=summarize(results)))
+    if args.output:
+        results.to_csv(args.output, index=False)
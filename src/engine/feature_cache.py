@@ -0,0 +1,186 @@
+"""Content-addressed on-disk feature cache.
+
+Features are stored as `.npy` files keyed by hash(audio bytes + feature parameters)
+and loaded memory-mapped, so re-running an experiment skips feature extraction entirely.
+
+- Writes are atomic (temporary file + rename), so concurrent processes never see partial files.
+- The total size is capped at `max_bytes`: least recently used entries (by mtime, refreshed on hit)
+  are evicted under an exclusive file lock.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from uuid import uuid4
+
+import numpy as np
+
+from src.core.logger import log_info
+from src.engine.features import FeatureExtractor, FeatureParams
+
+
+class FeatureCache:
+    """Size-bounded on-disk feature cache.
+
+    Args:
+        root (str): Cache directory
+        max_bytes (int): Size cap of the cache
+        low_watermark (float): Eviction target as a fraction of `max_bytes`
+
+    Attributes:
+        hits (int): Number of cache hits
+        misses (int): Number of cache misses
+        evictions (int): Number of evicted entries
+
+    Examples:
+        >>> cache = FeatureCache("data/cache/features", max_bytes=20 * 2**30)
+        >>> features = cache.features(y, extractor)  # computed once, memory-mapped afterwards
+    """
+
+    def __init__(self, root: str, max_bytes: int, low_watermark: float = 0.9):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self.hits = self.misses = self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        self._size = None  # approximate total size, refreshed on eviction
+
+    @staticmethod
+    def key(audio: np.ndarray, params: FeatureParams) -> str:
+        """Content hash of the audio and the feature parameters."""
+        audio = np.ascontiguousarray(audio)
+        h = hashlib.blake2b(digest_size=20)
+        h.update(json.dumps(params.to_dict(), sort_keys=True).encode())
+        h.update(f"{audio.dtype.str}{audio.shape}".encode())
+        h.update(memoryview(audio).cast("B"))
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        """File path of an entry."""
+        return os.path.join(self.root, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Memory-mapped features of an entry, or None on a miss."""
+        path = self.path(key)
+        try:
+            features = np.load(path, mmap_mode="r")
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return features
+
+    def put(self, key: str, features: np.ndarray) -> np.ndarray:
+        """Store features and return them as a read-only array.
+
+        The stored array itself is returned (not a memory map of the file),
+        so a concurrent eviction of the entry cannot break the caller.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(path), f".{uuid4().hex}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, features)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp, path)
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += os.path.getsize(path) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+        features = np.asarray(features).view()
+        features.flags.writeable = False
+        return features
+
+    def features(self, audio: np.ndarray, extractor: FeatureExtractor) -> np.ndarray:
+        """Cached features of a signal.
+
+        Args:
+            audio (np.ndarray): Signal of shape (..., n_samples)
+            extractor (FeatureExtractor): Extractor used on a miss
+
+        Returns:
+            np.ndarray: Features (read-only, memory-mapped on a hit)
+        """
+        key = self.key(audio, extractor.params)
+        features = self.get(key)
+        if features is None:
+            features = self.put(key, extractor(audio))
+        return features
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [
+            entry
+            for shard in os.scandir(self.root)
+            if shard.is_dir()
+            for entry in os.scandir(shard.path)
+            if entry.name.endswith(".npy")
+        ]
+
+    def size(self) -> int:
+        """Total size of the cached entries in bytes."""
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    @contextmanager
+    def _lock(self):
+        with open(os.path.join(self.root, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def evict(self) -> None:
+        """Evict least recently used entries down to `low_watermark * max_bytes`."""
+        with self._lock():
+            entries = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort()
+
+            size = sum(e[1] for e in entries)
+            target = self.low_watermark * self.max_bytes
+            for _, nbytes, path in entries:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)  # open memory maps stay valid
+                except FileNotFoundError:
+                    continue
+                size -= nbytes
+                self.evictions += 1
+            self._size = size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock():
+            for entry in self._entries():
+                os.remove(entry.path)
+            self._size = 0
+
+    @property
+    def stats(self) -> dict:
+        """Hit/miss counters."""
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_rate=self.hits / total if total else 0.0,
+        )
+
+    def log_stats(self) -> None:
+        """Log hit/miss counters."""
+        log_info(dict(feature_cache=self.stats))
@@ -0,0 +1,335 @@
+"""Audio feature frontend.
+
+STFT, mel and CQT log-magnitude features shared by the dataset pipelines and the service,
+so features match everywhere.
+Frames of equal length are transformed in one vectorized call (float32 end to end),
+and windows, mel filterbanks and CQT kernels are built once per parameter set and cached.
+"""
+
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+
+import numpy as np
+import scipy.fft
+import scipy.sparse
+from numpy.lib.stride_tricks import sliding_window_view
+
+FEATURE_KINDS = ("stft", "mel", "cqt")
+
+
+@dataclass(frozen=True)
+class FeatureParams:
+    """Feature parameters.
+
+    Attributes:
+        sr (int): Sample rate
+        n_fft (int): Frame length (also the longest CQT kernel)
+        hop_length (int): Hop length
+        kind (str): "stft" | "mel" | "cqt"
+        n_bins (int): Number of mel/CQT bins (ignored for "stft")
+        fmin (float): Lowest mel/CQT frequency (Hz)
+        fmax (float | None): Highest mel frequency (Hz). Defaults to Nyquist.
+        bins_per_octave (int): CQT resolution
+    """
+
+    sr: int = 16000
+    n_fft: int = 2048
+    hop_length: int = 256
+    kind: str = "stft"
+    n_bins: int = 88
+    fmin: float = 27.5
+    fmax: float | None = None
+    bins_per_octave: int = 12
+
+    def __post_init__(self):
+        assert self.kind in FEATURE_KINDS, f"Invalid feature kind: {self.kind}"
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "FeatureParams":
+        """Build from the engine config (`audio` and `features` sections)."""
+        return cls(sr=cfg.audio.sample_rate, **cfg.features)
+
+    def to_dict(self) -> dict:
+        """Parameters as a plain dictionary."""
+        return asdict(self)
+
+
+############################################################
+# Cached filterbanks
+############################################################
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    """Protect a cached array from in-place modification."""
+    arr.flags.writeable = False
+    return arr
+
+
+@lru_cache(maxsize=None)
+def get_window(n_fft: int) -> np.ndarray:
+    """Periodic Hann window."""
+    n = np.arange(n_fft)
+    return _readonly((0.5 - 0.5 * np.cos(2 * np.pi * n / n_fft)).astype(np.float32))
+
+
+def hz_to_mel(f: np.ndarray) -> np.ndarray:
+    """Hz to mel (HTK)."""
+    return 2595.0 * np.log10(1.0 + np.asarray(f) / 700.0)
+
+
+def mel_to_hz(m: np.ndarray) -> np.ndarray:
+    """Mel (HTK) to Hz."""
+    return 700.0 * (10.0 ** (np.asarray(m) / 2595.0) - 1.0)
+
+
+@lru_cache(maxsize=None)
+def mel_frequencies(n_mels: int, fmin: float, fmax: float) -> np.ndarray:
+    """Center frequencies (Hz) of the mel bands."""
+    mels = np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2)
+    return _readonly(mel_to_hz(mels)[1:-1])
+
+
+@lru_cache(maxsize=None)
+def mel_filterbank(
+    sr: int, n_fft: int, n_mels: int, fmin: float, fmax: float
+) -> np.ndarray:
+    """Triangular mel filterbank (area-normalized).
+
+    Returns:
+        np.ndarray: Filterbank of shape (n_fft // 2 + 1, n_mels)
+    """
+    freqs = np.fft.rfftfreq(n_fft, d=1 / sr)
+    edges = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+    lower, center, upper = edges[:-2], edges[1:-1], edges[2:]
+    rising = (freqs[:, None] - lower) / (center - lower)
+    falling = (upper - freqs[:, None]) / (upper - center)
+    fb = np.maximum(0, np.minimum(rising, falling))
+    fb *= 2.0 / (upper - lower)
+    return _readonly(fb.astype(np.float32))
+
+
+@lru_cache(maxsize=None)
+def cqt_frequencies(n_bins: int, fmin: float, bins_per_octave: int) -> np.ndarray:
+    """Center frequencies (Hz) of the CQT bins."""
+    return _readonly(fmin * 2.0 ** (np.arange(n_bins) / bins_per_octave))
+
+
+@lru_cache(maxsize=None)
+def cqt_kernel(
+    sr: int, n_fft: int, n_bins: int, fmin: float, bins_per_octave: int
+) -> scipy.sparse.csr_matrix:
+    """Sparse spectral CQT kernel.
+
+    Each bin is a Hann-windowed complex exponential of length `Q * sr / f`
+    (capped at `n_fft`, i.e. variable-Q at the lowest bins), centered in the frame
+    and transformed to the frequency domain. Applying it to the rFFT of a frame yields the CQT.
+
+    Returns:
+        scipy.sparse.csr_matrix: complex64 kernel of shape (n_bins, n_fft // 2 + 1)
+    """
+    freqs = cqt_frequencies(n_bins, fmin, bins_per_octave)
+    assert freqs[-1] < sr / 2, f"Highest CQT bin {freqs[-1]:.1f}Hz exceeds Nyquist"
+    Q = 1 / (2 ** (1 / bins_per_octave) - 1)
+    lengths = np.minimum(np.ceil(Q * sr / freqs), n_fft).astype(int)
+
+    kernels = np.zeros((n_bins, n_fft), dtype=np.complex128)
+    for k, (f, length) in enumerate(zip(freqs, lengths)):
+        n = np.arange(length) - (length - 1) / 2
+        window = np.hanning(length)
+        start = (n_fft - length) // 2
+        kernels[k, start : start + length] = (
+            window / window.sum() * np.exp(2j * np.pi * f / sr * n)
+        )
+    spectral = np.conj(np.fft.fft(kernels, axis=-1)[:, : n_fft // 2 + 1])
+    spectral[np.abs(spectral) < 1e-3 * np.abs(spectral).max(axis=1, keepdims=True)] = 0
+    return scipy.sparse.csr_matrix(spectral.astype(np.complex64))
+
+
+############################################################
+# Feature extraction
+############################################################
+def frame_signal(y: np.ndarray, n_fft: int, hop_length: int) -> np.ndarray:
+    """Split a signal into overlapping frames (view, no copy).
+
+    Args:
+        y (np.ndarray): Signal of shape (..., n_samples)
+        n_fft (int): Frame length
+        hop_length (int): Hop length
+
+    Returns:
+        np.ndarray: Frames of shape (..., n_frames, n_fft)
+    """
+    if y.shape[-1] < n_fft:
+        return np.empty((*y.shape[:-1], 0, n_fft), dtype=y.dtype)
+    return sliding_window_view(y, n_fft, axis=-1)[..., ::hop_length, :]
+
+
+class FeatureExtractor:
+    """Log-magnitude feature extractor.
+
+    Args:
+        params (FeatureParams): Feature parameters
+
+    Examples:
+        >>> extractor = get_feature_extractor(FeatureParams(kind="cqt", n_bins=264, bins_per_octave=36))
+        >>> features = extractor(y)  # (n_frames, n_bins)
+        >>> features = extractor(batch)  # (batch, n_frames, n_bins)
+    """
+
+    block_size = 256  # frames transformed at once (keeps large batches cache-friendly)
+
+    def __init__(self, params: FeatureParams):
+        self.params = params
+        self.n_fft = params.n_fft
+        self.hop_length = params.hop_length
+        self.window = get_window(params.n_fft)
+        self.fmax = params.fmax or params.sr / 2
+        match params.kind:
+            case "stft":
+                self.projection = None
+            case "mel":
+                self.projection = mel_filterbank(
+                    params.sr, params.n_fft, params.n_bins, params.fmin, self.fmax
+                )
+            case "cqt":
+                self.projection = cqt_kernel(
+                    params.sr,
+                    params.n_fft,
+                    params.n_bins,
+                    params.fmin,
+                    params.bins_per_octave,
+                )
+
+    @property
+    def n_features(self) -> int:
+        """Number of feature bins."""
+        if self.params.kind == "stft":
+            return self.n_fft // 2 + 1
+        return self.params.n_bins
+
+    @property
+    def bin_frequencies(self) -> np.ndarray:
+        """Center frequency (Hz) of each feature bin."""
+        match self.params.kind:
+            case "stft":
+                return np.fft.rfftfreq(self.n_fft, d=1 / self.params.sr)
+            case "mel":
+                return mel_frequencies(self.params.n_bins, self.params.fmin, self.fmax)
+            case "cqt":
+                return cqt_frequencies(
+                    self.params.n_bins, self.params.fmin, self.params.bins_per_octave
+                )
+
+    def n_frames(self, n_samples: int, center: bool = True) -> int:
+        """Number of frames of a signal with `n_samples` samples."""
+        if center:
+            return 1 + n_samples // self.hop_length
+        return max(0, (n_samples - self.n_fft) // self.hop_length + 1)
+
+    def frames(self, y: np.ndarray, center: bool = True) -> np.ndarray:
+        """Frames of a signal (or a batch of equal-length signals).
+
+        Args:
+            y (np.ndarray): Signal of shape (..., n_samples)
+            center (bool): Zero-pad `n_fft // 2` on both sides so that frame `k` is centered at `k * hop_length`
+
+        Returns:
+            np.ndarray: float32 frames of shape (..., n_frames, n_fft)
+        """
+        y = np.asarray(y, dtype=np.float32)
+        if center:
+            pad = self.n_fft // 2
+            y = np.pad(y, [(0, 0)] * (y.ndim - 1) + [(pad, pad)])
+        return frame_signal(y, self.n_fft, self.hop_length)
+
+    def transform(self, frames: np.ndarray) -> np.ndarray:
+        """Features of equal-length frames.
+
+        Args:
+            frames (np.ndarray): Frames of shape (..., n_fft)
+
+        Returns:
+            np.ndarray: float32 features of shape (..., n_features)
+        """
+        if frames.ndim == 1:
+            groups = frames.reshape(1, 1, -1)
+        else:
+            groups = frames.reshape(int(np.prod(frames.shape[:-2])), *frames.shape[-2:])
+        out = self._transform(list(groups))
+        return out.reshape(*frames.shape[:-1], self.n_features)
+
+    def _transform(self, groups: list[np.ndarray]) -> np.ndarray:
+        """Features of consecutive groups of frames (each of shape (n_frames, n_fft)).
+
+        Windowed frames are copied straight from the (strided) frame views into
+        `block_size` buffers shared across groups, so small groups fill whole blocks.
+        """
+        out = np.empty((sum(len(g) for g in groups), self.n_features), dtype=np.float32)
+        block = np.empty((self.block_size, self.n_fft), dtype=np.float32)
+        done = filled = 0
+        for frames in groups:
+            start = 0
+            while start < len(frames):
+                n = min(len(frames) - start, self.block_size - filled)
+                np.multiply(
+                    frames[start : start + n],
+                    self.window,
+                    out=block[filled : filled + n],
+                )
+                filled += n
+                start += n
+                if filled == self.block_size:
+                    self._project(block, out[done : done + filled])
+                    done += filled
+                    filled = 0
+        if filled:
+            self._project(block[:filled], out[done : done + filled])
+        return out
+
+    def _project(self, block: np.ndarray, out: np.ndarray) -> None:
+        """Write the features of windowed frames into `out`."""
+        spec = scipy.fft.rfft(block, axis=-1, workers=-1)
+        # sparse @ contiguous dense is much faster than @ spec.T
+        if self.params.kind == "cqt":
+            spec = np.abs(self.projection @ np.ascontiguousarray(spec.T))
+            np.log1p(spec.T, out=out)
+            return
+        spec = np.abs(spec)
+        if self.params.kind == "mel":
+            spec = spec @ self.projection
+        np.log1p(spec, out=out)
+
+    def __call__(self, y: np.ndarray, center: bool = True) -> np.ndarray:
+        """Features of a signal (or a batch of equal-length signals).
+
+        Args:
+            y (np.ndarray): Signal of shape (..., n_samples)
+            center (bool): Center frames (see `frames`)
+
+        Returns:
+            np.ndarray: float32 features of shape (..., n_frames, n_features)
+        """
+        return self.transform(self.frames(y, center))
+
+    def batch(self, signals: list[np.ndarray], center: bool = True) -> list[np.ndarray]:
+        """Features of signals of different lengths.
+
+        The frames of all signals are transformed together, so short signals share
+        full blocks instead of paying the transform overhead one by one.
+
+        Args:
+            signals (list[np.ndarray]): Signals of shape (n_samples,)
+            center (bool): Center frames (see `frames`)
+
+        Returns:
+            list[np.ndarray]: float32 features of shape (n_frames, n_features) of each signal
+        """
+        frames = [self.frames(y, center) for y in signals]
+        if not frames:
+            return []
+        features = self._transform(frames)
+        return np.split(features, np.cumsum([len(f) for f in frames])[:-1])
+
+
+@lru_cache(maxsize=None)
+def get_feature_extractor(params: FeatureParams) -> FeatureExtractor:
+    """Shared extractor per parameter set."""
+    return FeatureExtractor(params)
@@ -0,0 +1,221 @@
+"""Standard MIDI File writer for note tables.
+
+Serializes a note table (`NOTE_COLUMNS`) directly to SMF bytes without building one Python
+object per note: events are sorted with `lexsort`, delta times are encoded as
+variable-length quantities with array operations, and every track is assembled in one buffer.
+"""
+
+import struct
+
+import numpy as np
+import pandas as pd
+
+from src.core.logger import log_warning
+
+DRUM_CHANNEL = 9
+MAX_TICKS = 2**28  # delta times are at most 4-byte variable-length quantities
+END_OF_TRACK = b"\x00\xff\x2f\x00"
+
+
+def encode_varints(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Variable-length quantities of non-negative integers (< 2 ** 28).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: uint8 bytes of shape (n, 4), right-aligned,
+            and the number of bytes of each value
+
+    Raises:
+        ValueError: If a value is negative or does not fit in 4 bytes
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if values.min(initial=0) < 0 or values.max(initial=0) >= MAX_TICKS:
+        raise ValueError(
+            f"Variable-length quantities must be within 0 to {MAX_TICKS - 1}"
+        )
+    shifts = np.array([21, 14, 7, 0])
+    groups = (values[:, None] >> shifts) & 0x7F
+    n_bytes = 1 + (values >= 2**7) + (values >= 2**14) + (values >= 2**21)
+    groups[:, :3] |= 0x80  # continuation bits (the last byte has none)
+    return groups.astype(np.uint8), n_bytes
+
+
+def varint(value: int) -> bytes:
+    """Variable-length quantity of one integer."""
+    groups, n_bytes = encode_varints([value])
+    return groups[0, 4 - n_bytes[0] :].tobytes()
+
+
+def _track_chunk(body: bytes) -> bytes:
+    return (
+        b"MTrk" + struct.pack(">I", len(body) + len(END_OF_TRACK)) + body + END_OF_TRACK
+    )
+
+
+def _note_events(
+    track: np.ndarray,
+    ticks_on: np.ndarray,
+    ticks_off: np.ndarray,
+    pitches: np.ndarray,
+    velocities: np.ndarray,
+    channels: np.ndarray,
+    n_tracks: int,
+) -> list[bytes]:
+    """Note on/off events of all tracks, encoded as delta time + 3-byte messages.
+
+    Events are ordered by (track, tick, note-off before note-on, pitch) with one argsort
+    of a packed key, then encoded in one pass and split per track.
+    """
+    n = len(pitches)
+    # Packed key: track | tick | note-on flag | pitch
+    key_off = ((track << 29) + ticks_off) << 8
+    key_on = (((track << 29) + ticks_on) << 8) + 128
+    key = np.concatenate([key_off, key_on]) + np.concatenate([pitches, pitches])
+    order = np.argsort(key)
+    key = key[order]
+    pitch = key & 0x7F
+    is_on = (key >> 7) & 1
+    ticks = (key >> 8) & (2**29 - 1)
+    track = key >> 37
+
+    bounds = np.searchsorted(track, np.arange(n_tracks + 1))
+    deltas = np.diff(ticks, prepend=0)
+    first = bounds[:-1]  # every track starts from tick 0
+    deltas[first] = ticks[first]
+
+    varints, n_bytes = encode_varints(deltas)
+    events = np.empty((2 * n, 7), dtype=np.uint8)
+    events[:, :4] = varints
+    events[:, 4] = np.where(is_on, 0x90, 0x80) | channels[track]
+    events[:, 5] = pitch
+    events[:, 6] = np.where(is_on, velocities[order % max(n, 1)], 0)
+    data = events[np.arange(7) >= 4 - n_bytes[:, None]].tobytes()
+
+    offsets = np.concatenate([[0], np.cumsum(n_bytes + 3)])[bounds]
+    return [data[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def notes_to_midi(
+    notes: pd.DataFrame,
+    programs: dict[int, int | None] | None = None,
+    names: dict[int, str] | None = None,
+    ticks_per_beat: int = 480,
+    bpm: float = 120.0,
+) -> bytes:
+    """Serialize a note table to a Standard MIDI File (format 1).
+
+    Track 0 holds the tempo; each instrument gets its own track, starting with a program change
+    (channel 10 and no program change for drums).
+    MIDI has 15 melodic channels, so channels are allocated per program: instruments with
+    the same program share a channel. With more than 15 distinct programs, programs
+    share channels as well (a warning is logged) and players use the last program change
+    of the channel for all of them.
+
+    Args:
+        notes (pd.DataFrame): Note table with `NOTE_COLUMNS` (times in seconds)
+        programs (dict[int, int | None], optional): General MIDI program of each instrument id,
+            None for drums. Defaults to the instrument id itself.
+        names (dict[int, str], optional): Track name of each instrument id
+        ticks_per_beat (int): Time resolution
+        bpm (float): Tempo
+
+    Returns:
+        bytes: MIDI file content
+
+    Raises:
+        ValueError: If a program, pitch or velocity is outside 0-127, a time is negative
+            or a note ends too late for the MIDI time resolution
+
+    Examples:
+        >>> with open("transcription.mid", "wb") as f:
+        ...     f.write(notes_to_midi(notes, programs={0: 0}))
+    """
+    programs = programs or {}
+    names = names or {}
+    tempo = round(60e6 / bpm)
+    ticks_per_second = ticks_per_beat * 1e6 / tempo
+
+    ids, track = np.unique(notes.instrument.to_numpy(), return_inverse=True)
+    pitches = notes.note.to_numpy().astype(np.int64)
+    velocities = notes.velocity.to_numpy().astype(np.int64)
+    for column, values in (("note", pitches), ("velocity", velocities)):
+        if values.min(initial=0) < 0 or values.max(initial=0) > 127:
+            raise ValueError(f"MIDI {column} values must be within 0-127")
+    ticks_on = np.round(notes.start_time.to_numpy() * ticks_per_second).astype(np.int64)
+    ticks_off = np.round(notes.end_time.to_numpy() * ticks_per_second).astype(np.int64)
+    # zero-length notes would end before they start
+    ticks_off = np.maximum(ticks_off, ticks_on + 1)
+    if ticks_on.min(initial=0) < 0:
+        raise ValueError("Note times must not be negative")
+    if ticks_off.max(initial=0) >= MAX_TICKS:
+        raise ValueError(f"Notes must end before tick {MAX_TICKS}")
+
+    free_channels = [c for c in range(16) if c != DRUM_CHANNEL]
+    program_channels = {}
+    channels, headers = [], []
+    for instrument in ids.tolist():
+        program = programs.get(instrument, instrument)
+        if program is None:
+            channel, header = DRUM_CHANNEL, b""
+        elif 0 <= program <= 127:
+            channel = program_channels.setdefault(
+                program, free_channels[len(program_channels) % len(free_channels)]
+            )
+            header = bytes([0x00, 0xC0 | channel, int(program)])
+        else:
+            raise ValueError(
+                f"Invalid MIDI program {program} of instrument {instrument}"
+            )
+        if instrument in names:
+            name = names[instrument].encode("latin-1", "replace")
+            header = b"\x00\xff\x03" + varint(len(name)) + name + header
+        channels.append(channel)
+        headers.append(header)
+    if len(program_channels) > len(free_channels):
+        log_warning(
+            f"{len(program_channels)} MIDI programs share {len(free_channels)} channels"
+        )
+
+    events = _note_events(
+        track.astype(np.int64),
+        ticks_on,
+        ticks_off,
+        pitches,
+        velocities.clip(1, 127),  # velocity 0 would be a note off
+        np.array(channels, dtype=np.int64),
+        len(ids),
+    )
+    chunks = [_track_chunk(b"\x00\xff\x51\x03" + tempo.to_bytes(3, "big"))]
+    chunks += [_track_chunk(h + e) for h, e in zip(headers, events)]
+
+    header = b"MThd" + struct.pack(">IHHH", 6, 1, len(chunks), ticks_per_beat)
+    return header + b"".join(chunks)
+
+
+def write_midi(notes: pd.DataFrame, path: str, **kwargs) -> None:
+    """Write a note table to a MIDI file (see `notes_to_midi`)."""
+    with open(path, "wb") as f:
+        f.write(notes_to_midi(notes, **kwargs))
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    # Large orchestral file: 16 instruments, 50k notes
+    rng = np.random.default_rng(0)
+    n = 50_000
+    start = np.sort(rng.uniform(0, 1800, n))
+    notes = pd.DataFrame(
+        dict(
+            start_time=start,
+            end_time=start + rng.uniform(0.05, 2, n),
+            instrument=rng.integers(0, 16, n),
+            note=rng.integers(21, 109, n),
+            velocity=rng.integers(1, 128, n),
+        )
+    )
+    notes_to_midi(notes)
+    tic = perf_counter()
+    data = notes_to_midi(notes)
+    print(
+        f"{n} notes -> {len(data) / 2**20:.1f}MB in {(perf_counter() - tic) * 1e3:.1f}ms"
+    )
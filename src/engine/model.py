@@ -0,0 +1,132 @@
+"""Transcription model.
+
+Maps feature frames to per-pitch frame/onset probabilities and velocities.
+"""
+
+import numpy as np
+
+N_PITCHES = 88
+MIN_PITCH = 21  # A0
+MODEL_OUTPUTS = ("frame", "onset", "velocity")
+
+
+def pitch_frequencies() -> np.ndarray:
+    """Fundamental frequency (Hz) of each piano key (A0 ~ C8)."""
+    pitches = np.arange(MIN_PITCH, MIN_PITCH + N_PITCHES)
+    return 440.0 * 2.0 ** ((pitches - 69) / 12)
+
+
+def build_pitch_templates(
+    freqs: np.ndarray,
+    n_harmonics: int = 4,
+    width_cents: float = 50.0,
+    decay: float = 2.0,
+) -> np.ndarray:
+    """Harmonic templates projecting feature bins onto piano keys.
+
+    Args:
+        freqs (np.ndarray): Center frequency (Hz) of each feature bin
+        n_harmonics (int): Number of harmonics per pitch
+        width_cents (float): Gaussian width of each harmonic peak
+        decay (float): Harmonic `h` is weighted by `1 / h ** decay`
+
+    Returns:
+        np.ndarray: Templates of shape (n_bins, 88), columns sum to 1
+    """
+    freqs = np.asarray(freqs, dtype=np.float64)
+    spacing = np.abs(np.gradient(freqs))
+    freqs = np.maximum(freqs, spacing / 2)  # DC bin
+    bin_cents = 1200 * np.log2(1 + spacing / freqs)
+    sigma = np.maximum(width_cents, bin_cents / 2)[:, None, None]
+    harmonics = np.arange(1, n_harmonics + 1)
+    f_h = pitch_frequencies()[:, None] * harmonics[None, :]  # (88, H)
+    dist = 1200 * np.log2(freqs[:, None, None] / f_h[None])  # (bins, 88, H) in cents
+    peaks = np.exp(-0.5 * (dist / sigma) ** 2)
+    peaks /= peaks.sum(axis=0, keepdims=True).clip(min=1e-12)
+    # Harmonics covered by the bins
+    in_range = (f_h >= freqs.min()) & (f_h <= freqs.max())
+    weights = in_range / harmonics**decay
+    weights /= weights.sum(axis=-1, keepdims=True).clip(min=1e-12)
+    W = (peaks * weights).sum(axis=-1)
+    W[W < 1e-6] = 0  # drop the tails (float32 denormals slow down matmul)
+    return W.astype(np.float32)
+
+
+def sigmoid(x: np.ndarray) -> np.ndarray:
+    """Logistic function."""
+    return 1 / (1 + np.exp(-x))
+
+
+class PitchTemplateModel:
+    """Pitch template model.
+
+    Salience of each pitch is a linear projection of the feature frame,
+    frame/onset probabilities are logistic functions of the salience
+    and its positive flux over `onset_lag` frames.
+    Frame probabilities are kept only at local maxima of the salience across pitches,
+    so energy leaking into neighboring keys does not produce notes.
+
+    Attributes:
+        W (np.ndarray): Projection of shape (n_bins, 88)
+        b (np.ndarray): Per-pitch bias of shape (88,)
+        slope (float): Slope of the logistic functions
+        onset_lag (int): Flux distance in frames
+    """
+
+    def __init__(
+        self, W: np.ndarray, b: np.ndarray, slope: float = 8.0, onset_lag: int = 4
+    ):
+        self.W = np.asarray(W, dtype=np.float32)
+        self.b = np.asarray(b, dtype=np.float32)
+        self.slope = slope
+        self.onset_lag = onset_lag
+
+    @property
+    def receptive_field(self) -> int:
+        """Number of frames needed to produce one output frame."""
+        return self.onset_lag + 1
+
+    @classmethod
+    def from_config(cls, cfg: dict, freqs: np.ndarray) -> "PitchTemplateModel":
+        """Load weights from `cfg.weights_path` or build them from pitch templates.
+
+        Args:
+            cfg (dict): `model` section of the engine config
+            freqs (np.ndarray): Center frequency (Hz) of each feature bin
+
+        Returns:
+            PitchTemplateModel: Model
+        """
+        kwargs = dict(slope=cfg.get("slope", 8.0), onset_lag=cfg.get("onset_lag", 4))
+        if cfg.get("weights_path"):
+            weights = np.load(cfg["weights_path"])
+            return cls(weights["W"], weights["b"], **kwargs)
+        W = build_pitch_templates(freqs, cfg.get("n_harmonics", 4))
+        b = np.full(N_PITCHES, cfg.get("bias", 1.5), dtype=np.float32)
+        return cls(W, b, **kwargs)
+
+    def save(self, path: str) -> None:
+        """Save weights to a `.npz` file."""
+        np.savez(path, W=self.W, b=self.b)
+
+    def predict(self, features: np.ndarray) -> dict[str, np.ndarray]:
+        """Predict frame/onset probabilities and velocities.
+
+        Args:
+            features (np.ndarray): Features of shape (..., n_frames, n_bins)
+
+        Returns:
+            dict[str, np.ndarray]: `frame`, `onset` and `velocity` of shape (..., n_frames, 88)
+        """
+        salience = features @ self.W
+        lag = np.zeros_like(salience)
+        lag[..., self.onset_lag :, :] = salience[..., : -self.onset_lag, :]
+        flux = (salience - lag).clip(min=0)
+        peak = np.ones(salience.shape, dtype=bool)
+        peak[..., 1:] &= salience[..., 1:] >= salience[..., :-1]
+        peak[..., :-1] &= salience[..., :-1] >= salience[..., 1:]
+        return dict(
+            frame=sigmoid(self.slope * (salience - self.b)) * peak,
+            onset=sigmoid(self.slope * (flux - self.b)),
+            velocity=np.tanh(0.5 * salience),
+        )
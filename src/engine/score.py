@@ -0,0 +1,297 @@
+"""Score export.
+
+Note tables are exported as MusicXML scores with music21 on request only:
+
+- Quantization to the beat grid is vectorized; music21 objects are only built per chord.
+- Rendering runs in a separate process pool, so it never blocks transcription.
+- Results are cached on disk per (note table hash, export options),
+  and concurrent requests for the same score share one rendering.
+- The cache is bounded: scores unused for `max_age` seconds expire, and least recently used
+  ones are evicted once the cache exceeds `max_bytes`.
+"""
+
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from time import time
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from config import CFG_ENGINE
+
+
+@dataclass(frozen=True)
+class ScoreOptions:
+    """Score export options.
+
+    Attributes:
+        bpm (float): Tempo used to convert seconds to beats
+        divisions (int): Grid divisions per quarter note (4: sixteenth notes)
+        time_signature (str): Time signature
+        title (str): Score title
+    """
+
+    bpm: float = 120.0
+    divisions: int = 4
+    time_signature: str = "4/4"
+    title: str = "Transcription"
+
+    def to_dict(self) -> dict:
+        """Options as a plain dictionary."""
+        return asdict(self)
+
+
+def quantize_notes(
+    notes: pd.DataFrame, bpm: float = 120.0, divisions: int = 4
+) -> pd.DataFrame:
+    """Snap notes to the beat grid.
+
+    Args:
+        notes (pd.DataFrame): Note table (times in seconds)
+        bpm (float): Tempo
+        divisions (int): Grid divisions per quarter note
+
+    Returns:
+        pd.DataFrame: instrument, note, velocity, offset and duration (in quarter notes),
+            sorted by (instrument, offset, duration, note); durations are at least one grid step
+    """
+    scale = bpm / 60 * divisions
+    offset = np.round(notes.start_time.to_numpy() * scale)
+    end = np.round(notes.end_time.to_numpy() * scale)
+    duration = np.maximum(end - offset, 1)
+    instrument, pitch = notes.instrument.to_numpy(), notes.note.to_numpy()
+    order = np.lexsort((pitch, duration, offset, instrument))
+    return pd.DataFrame(
+        dict(
+            instrument=instrument[order],
+            note=pitch[order],
+            velocity=notes.velocity.to_numpy()[order],
+            offset=offset[order] / divisions,
+            duration=duration[order] / divisions,
+        )
+    )
+
+
+def notes_to_musicxml(
+    notes: pd.DataFrame, options: ScoreOptions = ScoreOptions()
+) -> bytes:
+    """Render a note table as MusicXML.
+
+    Notes of one instrument with the same quantized offset and duration become a chord;
+    each instrument is a part, split into voices where its chords overlap.
+
+    Args:
+        notes (pd.DataFrame): Note table
+        options (ScoreOptions): Export options
+
+    Returns:
+        bytes: MusicXML document
+    """
+    from music21 import chord, metadata, meter, note, stream, tempo
+    from music21.musicxml.m21ToXml import GeneralObjectExporter
+
+    q = quantize_notes(notes, options.bpm, options.divisions)
+    keys = q[["instrument", "offset", "duration"]].to_numpy()
+    starts = np.flatnonzero(np.r_[True, np.any(keys[1:] != keys[:-1], axis=1)])
+    stops = np.r_[starts[1:], len(q)]
+    pitches = q.note.to_numpy().tolist()
+    velocities = q.velocity.to_numpy().tolist()
+
+    # Chords of each instrument in voices: a chord joins the first voice free at its offset
+    voices = {}  # instrument -> [[(offset, element), ...] per voice]
+    ends = {}  # instrument -> end offset of each voice
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        instrument, offset, duration = keys[start].tolist()
+        if stop - start == 1:
+            element = note.Note(pitches[start], quarterLength=duration)
+        else:
+            element = chord.Chord(pitches[start:stop], quarterLength=duration)
+        element.volume.velocity = max(velocities[start:stop])
+        layers, layer_ends = voices.setdefault(instrument, []), ends.setdefault(
+            instrument, []
+        )
+        i = next((i for i, end in enumerate(layer_ends) if end <= offset), len(layers))
+        if i == len(layers):
+            layers.append([])
+            layer_ends.append(0.0)
+        layers[i].append((offset, element))
+        layer_ends[i] = offset + duration
+
+    score = stream.Score()
+    score.metadata = metadata.Metadata(title=options.title)
+    for instrument, layers in voices.items():
+        part = stream.Part()
+        part.partName = f"Instrument {int(instrument)}"
+        part.insert(0, meter.TimeSignature(options.time_signature))
+        part.insert(0, tempo.MetronomeMark(number=options.bpm))
+        containers = [part]
+        if len(layers) > 1:
+            containers = [stream.Voice(id=str(i + 1)) for i in range(len(layers))]
+            for voice in containers:
+                part.insert(0, voice)
+        for container, elements in zip(containers, layers):
+            for offset, element in elements:
+                container.coreInsert(offset, element)
+            container.coreElementsChanged()
+        score.insert(0, part)
+    return GeneralObjectExporter(score).parse()
+
+
+def score_key(notes: pd.DataFrame, options: ScoreOptions) -> str:
+    """Hash of a note table and export options."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(json.dumps(options.to_dict(), sort_keys=True).encode())
+    for column in ("start_time", "end_time", "instrument", "note", "velocity"):
+        h.update(np.ascontiguousarray(notes[column].to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+class ScoreExporter:
+    """Cached score export on a process pool.
+
+    Args:
+        root (str): Cache directory
+        max_workers (int): Number of rendering processes
+        max_bytes (int): Size cap of the cache
+        max_age (float): Lifetime of an unused score in seconds
+        low_watermark (float): Eviction target as a fraction of `max_bytes`
+
+    Attributes:
+        evictions (int): Number of evicted scores
+
+    Examples:
+        >>> exporter = ScoreExporter("data/cache/scores")
+        >>> xml = exporter.submit(notes, ScoreOptions(bpm=90)).result()
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_workers: int = 2,
+        max_bytes: int = 2**30,
+        max_age: float = 30 * 86400,
+        low_watermark: float = 0.9,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.low_watermark = low_watermark
+        self.evictions = 0
+        os.makedirs(root, exist_ok=True)
+        # spawn: the pool starts lazily in a process that already runs threads (service, logging)
+        self.pool = ProcessPoolExecutor(max_workers, mp_context=mp.get_context("spawn"))
+        self._pending = {}  # key -> Future of renderings in progress
+        self._lock = threading.Lock()
+        self.evict()
+
+    def path(self, key: str) -> str:
+        """File path of a cached score."""
+        return os.path.join(self.root, f"{key}.musicxml")
+
+    def submit(
+        self, notes: pd.DataFrame, options: ScoreOptions = ScoreOptions()
+    ) -> Future:
+        """Render a score in the pool, or return the cached one.
+
+        Returns:
+            Future: MusicXML bytes
+        """
+        key = score_key(notes, options)
+        path = self.path(key)
+        try:
+            if time() - os.path.getmtime(path) <= self.max_age:
+                with open(path, "rb") as f:
+                    future = Future()
+                    future.set_result(f.read())
+                os.utime(path)  # mark as recently used
+                return future
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            future = self.pool.submit(notes_to_musicxml, notes, options)
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._store(key, f))
+        return future
+
+    def export(
+        self, notes: pd.DataFrame, options: ScoreOptions = ScoreOptions()
+    ) -> bytes:
+        """Render a score and wait for it."""
+        return self.submit(notes, options).result()
+
+    def _store(self, key: str, future: Future) -> None:
+        # The rendering stays pending until the file is in place, so that requests
+        # arriving meanwhile share it instead of rendering again
+        try:
+            if future.cancelled() or future.exception() is not None:
+                return
+            tmp = os.path.join(self.root, f".{uuid4().hex}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(future.result())
+            os.replace(tmp, self.path(key))
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        with self._lock:
+            self._size += len(future.result())
+            due = self._size > self.max_bytes or time() >= self._next_sweep
+        if due:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of the cached scores, least recently used first."""
+        entries = []
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(".musicxml"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self) -> None:
+        """Remove expired scores, then least recently used ones down to `low_watermark * max_bytes`."""
+        with self._lock:
+            now = time()
+            entries = self._entries()
+            size = sum(e[1] for e in entries)
+            target = self.low_watermark * self.max_bytes
+            for mtime, nbytes, path in entries:
+                if now - mtime <= self.max_age and size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                size -= nbytes
+                self.evictions += 1
+            self._size = size
+            self._next_sweep = now + min(self.max_age, 3600)
+
+    def shutdown(self) -> None:
+        """Stop the rendering processes."""
+        self.pool.shutdown(cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_score_exporter() -> ScoreExporter:
+    """Shared exporter configured in `score` of the engine config."""
+    cfg = CFG_ENGINE.score
+    return ScoreExporter(
+        cfg.root,
+        cfg.workers,
+        max_bytes=int(cfg.max_mb * 2**20),
+        max_age=cfg.max_days * 86400,
+    )
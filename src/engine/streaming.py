@@ -0,0 +1,92 @@
+"""Streaming transcription.
+
+Incremental feature extraction and note decoding over a sliding context.
+Memory stays bounded by one FFT window, the incoming chunk and the model context,
+regardless of the stream length.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.engine.engine import TranscriptionEngine
+from src.engine.model import MODEL_OUTPUTS
+
+
+class StreamingTranscriber:
+    """Streaming transcription session.
+
+    Feed PCM chunks of any length as they arrive; finalized notes are returned as soon as they end.
+    Frames are computed exactly as in `TranscriptionEngine.transcribe`,
+    so the concatenated output of `feed` and `flush` matches the offline result.
+
+    Args:
+        engine (TranscriptionEngine): Engine
+
+    Examples:
+        >>> session = engine.stream()
+        >>> for chunk in chunks:
+        ...     notes = session.feed(chunk)
+        >>> notes = session.flush()
+    """
+
+    def __init__(self, engine: TranscriptionEngine):
+        self.engine = engine
+        self.n_fft = engine.n_fft
+        self.hop_length = engine.hop_length
+        self.context_frames = max(
+            engine.cfg.streaming.context_frames, engine.model.receptive_field - 1
+        )
+        self.decoder = engine.decoder()
+        self._buffer = np.zeros(self.n_fft // 2, dtype=np.float32)  # center padding
+        self._context = None
+        self.n_samples = 0
+
+    @property
+    def latency(self) -> float:
+        """Delay (seconds) between a sample arriving and its frame being decoded."""
+        return (self.n_fft // 2) / self.engine.sr
+
+    def feed(self, chunk: np.ndarray) -> pd.DataFrame:
+        """Process a chunk of samples.
+
+        Args:
+            chunk (np.ndarray): Mono float32 samples at `engine.sr`
+
+        Returns:
+            pd.DataFrame: Notes finalized by this chunk
+        """
+        chunk = np.asarray(chunk, dtype=np.float32).ravel()
+        self.n_samples += len(chunk)
+        self._buffer = np.concatenate([self._buffer, chunk])
+        return self._process()
+
+    def flush(self) -> pd.DataFrame:
+        """Process the remaining samples and finalize all active notes."""
+        self._buffer = np.concatenate(
+            [self._buffer, np.zeros(self.n_fft // 2, dtype=np.float32)]
+        )
+        notes = self._process(decode=False)
+        rest = self.decoder.flush()
+        self._buffer = self._buffer[:0]
+        return self.engine.to_table([np.concatenate(a) for a in zip(notes, rest)])
+
+    def _process(self, decode: bool = True) -> pd.DataFrame | tuple:
+        n_frames = (len(self._buffer) - self.n_fft) // self.hop_length + 1
+        if n_frames <= 0:
+            notes = tuple(np.empty(0, dtype=np.int64) for _ in range(4))
+            return self.engine.to_table(notes) if decode else notes
+
+        end = (n_frames - 1) * self.hop_length + self.n_fft
+        features = self.engine.features(self._buffer[:end], center=False)
+        self._buffer = self._buffer[n_frames * self.hop_length :].copy()
+
+        if self._context is not None:
+            features = np.concatenate([self._context, features])
+            n_context = len(self._context)
+        else:
+            n_context = 0
+        self._context = features[-self.context_frames :]
+
+        outputs = self.engine.predict(features)
+        notes = self.decoder.step(*(outputs[k][n_context:] for k in MODEL_OUTPUTS))
+        return self.engine.to_table(notes) if decode else notes
@@ -0,0 +1,297 @@
+"""Shared-memory CPU inference worker pool.
+
+Model weights are copied once into `multiprocessing.shared_memory` and every worker
+builds its model on views of that block, so adding a worker costs almost no extra RSS.
+Inputs and outputs go through shared buffers as well: the parent writes the features,
+each worker predicts a slice of frames (plus `receptive_field - 1` frames of context)
+and writes its outputs in place, and only small task tuples are pickled.
+"""
+
+import multiprocessing as mp
+import threading
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from src.engine.model import MODEL_OUTPUTS, N_PITCHES, PitchTemplateModel
+
+
+############################################################
+# Shared arrays
+############################################################
+@dataclass(frozen=True)
+class SharedArraysSpec:
+    """Picklable layout of named arrays in one shared memory block.
+
+    Attributes:
+        name (str): Shared memory block name
+        layout (tuple): (key, dtype, shape, offset) of each array
+    """
+
+    name: str
+    layout: tuple
+
+    def attach(self, shm: SharedMemory) -> dict[str, np.ndarray]:
+        """Views of the arrays in an attached block."""
+        return {
+            key: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for key, dtype, shape, offset in self.layout
+        }
+
+
+class SharedArrays:
+    """Named arrays allocated in one shared memory block.
+
+    Args:
+        shapes (dict[str, tuple]): Shape of each array
+        dtype (str): Dtype of all arrays
+
+    Examples:
+        >>> arrays = SharedArrays(dict(W=(264, 88), b=(88,)))
+        >>> arrays["W"][:] = W
+        >>> arrays.spec  # send to other processes, which call `spec.attach`
+    """
+
+    align = 64
+
+    def __init__(self, shapes: dict[str, tuple], dtype: str = "float32"):
+        layout, offset = [], 0
+        for key, shape in shapes.items():
+            layout.append((key, dtype, tuple(shape), offset))
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            offset += -(-nbytes // self.align) * self.align
+        self.shm = SharedMemory(create=True, size=max(offset, 1))
+        self.spec = SharedArraysSpec(self.shm.name, tuple(layout))
+        self.arrays = self.spec.attach(self.shm)
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def close(self) -> None:
+        """Release and unlink the block."""
+        self.arrays = {}
+        self.shm.close()
+        self.shm.unlink()
+
+
+############################################################
+# Worker
+############################################################
+def _worker(conn: Connection, weights: SharedArraysSpec, model_kwargs: dict) -> None:
+    """Worker loop: predict slices of the shared input into the shared outputs."""
+    weights_shm = SharedMemory(name=weights.name)
+    model = PitchTemplateModel(**weights.attach(weights_shm), **model_kwargs)
+    attached = {}  # shared I/O buffers by name (replaced when the parent grows them)
+
+    while (task := conn.recv()) is not None:
+        specs, start, stop, context = task
+        try:
+            for name in set(attached) - {spec.name for spec in specs}:
+                attached.pop(name).close()
+            arrays = {}
+            for spec in specs:
+                if spec.name not in attached:
+                    attached[spec.name] = SharedMemory(name=spec.name)
+                arrays.update(spec.attach(attached[spec.name]))
+            predictions = model.predict(arrays["features"][start - context : stop])
+            for key in MODEL_OUTPUTS:
+                arrays[key][start:stop] = predictions[key][context:]
+            del arrays, predictions  # release the views before buffers are closed
+            conn.send(None)
+        except Exception as e:
+            conn.send(repr(e))
+
+    for shm in attached.values():
+        shm.close()
+    del model
+    weights_shm.close()
+
+
+############################################################
+# Pool
+############################################################
+class InferencePool:
+    """Process pool running a model on shared weights and shared I/O buffers.
+
+    Each `predict` call splits the frames into one slice per worker,
+    so a single long input as well as a packed micro-batch uses all workers.
+    Calls are serialized; inputs shorter than `min_frames` run in the calling process.
+    A call fails if any worker fails, after all workers have replied; dead workers are restarted.
+
+    Args:
+        model (PitchTemplateModel): Model whose weights are shared
+        n_workers (int): Number of worker processes
+        min_frames (int): Minimum number of frames to dispatch to the workers
+        start_method (str): Multiprocessing start method ("spawn" is safe with threads)
+
+    Examples:
+        >>> with InferencePool(engine.model, n_workers=4) as pool:
+        ...     outputs = pool.predict(features)  # same as engine.model.predict(features)
+    """
+
+    def __init__(
+        self,
+        model: PitchTemplateModel,
+        n_workers: int,
+        min_frames: int = 256,
+        start_method: str = "spawn",
+    ):
+        self.model = model
+        self.n_workers = n_workers
+        self.min_frames = min_frames
+        self.context = model.receptive_field - 1
+        self._lock = threading.Lock()
+        self._io = {}  # "features" / "outputs" -> SharedArrays
+        self.capacity = 0
+
+        self.weights = SharedArrays(dict(W=model.W.shape, b=model.b.shape))
+        self.weights["W"][:] = model.W
+        self.weights["b"][:] = model.b
+        self._model_kwargs = dict(slope=model.slope, onset_lag=model.onset_lag)
+
+        self._ctx = mp.get_context(start_method)
+        self.conns, self.processes = [], []
+        for _ in range(n_workers):
+            conn, p = self._start_worker()
+            self.conns.append(conn)
+            self.processes.append(p)
+
+    def _start_worker(self) -> tuple[Connection, mp.Process]:
+        """Start a worker process and return its pipe and process."""
+        conn, child = self._ctx.Pipe()
+        p = self._ctx.Process(
+            target=_worker,
+            args=(child, self.weights.spec, self._model_kwargs),
+            daemon=True,
+        )
+        p.start()
+        child.close()
+        return conn, p
+
+    def _restart_worker(self, i: int) -> None:
+        """Replace a dead worker by a new one."""
+        self.conns[i].close()
+        self.processes[i].join(timeout=1)
+        if self.processes[i].is_alive():
+            self.processes[i].terminate()
+        self.conns[i], self.processes[i] = self._start_worker()
+
+    @property
+    def pids(self) -> list[int]:
+        """Process ids of the workers."""
+        return [p.pid for p in self.processes]
+
+    def _reserve(self, n_frames: int) -> None:
+        """Grow the shared I/O buffers to hold `n_frames` frames."""
+        if n_frames <= self.capacity:
+            return
+        capacity = max(n_frames, 2 * self.capacity, 1024)
+        n_bins = self.model.W.shape[0]
+        for io in self._io.values():
+            io.close()
+        self._io = dict(
+            features=SharedArrays(dict(features=(capacity, n_bins))),
+            outputs=SharedArrays({key: (capacity, N_PITCHES) for key in MODEL_OUTPUTS}),
+        )
+        self.capacity = capacity
+
+    def predict(self, features: np.ndarray) -> dict[str, np.ndarray]:
+        """Predict frame/onset probabilities and velocities (see `PitchTemplateModel.predict`).
+
+        Args:
+            features (np.ndarray): Features of shape (n_frames, n_bins)
+
+        Returns:
+            dict[str, np.ndarray]: `frame`, `onset` and `velocity` of shape (n_frames, 88)
+        """
+        n = len(features)
+        if n < self.min_frames or not self.processes:
+            return self.model.predict(features)
+
+        with self._lock:
+            self._reserve(n)
+            self._io["features"]["features"][:n] = features
+            specs = (self._io["features"].spec, self._io["outputs"].spec)
+            bounds = np.linspace(0, n, min(self.n_workers, n) + 1).astype(int)
+            busy, errors, dead = [], [], []
+            for i, start, stop in zip(range(self.n_workers), bounds[:-1], bounds[1:]):
+                try:
+                    self.conns[i].send((specs, start, stop, min(start, self.context)))
+                    busy.append(i)
+                except (BrokenPipeError, OSError) as e:
+                    errors.append(f"died: {e!r}")
+                    dead.append(i)
+            # Drain every busy worker, so no reply is left over for the next call
+            for i in busy:
+                try:
+                    error = self.conns[i].recv()
+                except (EOFError, OSError) as e:
+                    error = f"died: {e!r}"
+                    dead.append(i)
+                if error is not None:
+                    errors.append(error)
+            for i in dead:
+                self._restart_worker(i)
+            if errors:
+                raise RuntimeError(f"Inference worker failed: {errors[0]}")
+            return {key: self._io["outputs"][key][:n].copy() for key in MODEL_OUTPUTS}
+
+    def close(self) -> None:
+        """Stop the workers and release the shared memory."""
+        with self._lock:
+            for conn in self.conns:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for p in self.processes:
+                p.join(timeout=5)
+                if p.is_alive():
+                    p.terminate()
+            self.conns, self.processes = [], []
+            for io in (*self._io.values(), self.weights):
+                io.close()
+            self._io, self.capacity = {}, 0
+
+    def __enter__(self) -> "InferencePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import os
+    from time import perf_counter
+
+    import psutil
+
+    from src.engine import get_engine
+
+    engine = get_engine()
+    rng = np.random.default_rng(0)
+    features = engine.features(
+        rng.standard_normal(engine.sr * 120).astype(np.float32) * 0.1
+    )
+
+    tic = perf_counter()
+    expected = engine.model.predict(features)
+    print(f"in-process: {perf_counter() - tic:.3f}s")
+
+    for n_workers in (1, 2, 4):
+        with InferencePool(engine.model, n_workers) as pool:
+            pool.predict(features)  # warm up (attach buffers)
+            tic = perf_counter()
+            outputs = pool.predict(features)
+            elapsed = perf_counter() - tic
+            same = all(np.allclose(outputs[k], expected[k]) for k in MODEL_OUTPUTS)
+            uss = [
+                psutil.Process(pid).memory_full_info().uss / 2**20 for pid in pool.pids
+            ]
+            rss = psutil.Process(os.getpid()).memory_info().rss / 2**20
+            print(
+                f"{n_workers} workers: {elapsed:.3f}s, same={same}, "
+                f"worker USS {np.mean(uss):.1f}MB, parent RSS {rss:.1f}MB"
+            )
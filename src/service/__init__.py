@@ -0,0 +1 @@
+"""Transcription service."""
@@ -0,0 +1,245 @@
+"""Transcription service.
+
+Run:
+    uvicorn src.service.app:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from tempfile import SpooledTemporaryFile
+
+import numpy as np
+import pandas as pd
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from starlette.concurrency import run_in_threadpool
+
+from config import CFG_ENGINE, CFG_SERVICE
+from src.core.logger import log_info, log_warning
+from src.engine import get_engine
+from src.engine.midi import notes_to_midi
+from src.engine.score import ScoreOptions, get_score_exporter
+from src.service.batching import get_batcher
+from src.service.result_cache import audio_key, get_result_cache
+
+PCM_DTYPES = {"float32": np.float32, "int16": np.int16}
+RESULT_FORMATS = ("json", "midi", "musicxml")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the micro-batcher (and open the result cache) while the service is up."""
+    app.state.batcher = get_batcher().start()
+    app.state.result_cache = get_result_cache()
+    yield
+    app.state.batcher.stop()
+    get_engine().close()
+    if get_score_exporter.cache_info().currsize:
+        get_score_exporter().shutdown()
+    if app.state.result_cache is not None:
+        log_info(dict(result_cache=app.state.result_cache.stats))
+        app.state.result_cache.close()
+
+
+app = FastAPI(title="Automatic Music Transcription", lifespan=lifespan)
+
+
+def decode_pcm(data: bytes, dtype: str) -> np.ndarray:
+    """Decode raw little-endian mono PCM to float32.
+
+    Args:
+        data (bytes): PCM bytes
+        dtype (str): Sample format ("float32" | "int16")
+
+    Returns:
+        np.ndarray: float32 samples in [-1, 1]
+
+    Raises:
+        ValueError: The length of `data` is not a multiple of the sample size.
+    """
+    itemsize = np.dtype(PCM_DTYPES[dtype]).itemsize
+    if len(data) % itemsize:
+        raise ValueError(f"{len(data)} bytes is not a whole number of {dtype} samples")
+    samples = np.frombuffer(data, dtype=np.dtype(PCM_DTYPES[dtype]).newbyteorder("<"))
+    if dtype == "int16":
+        return samples.astype(np.float32) / 32768
+    return samples.astype(np.float32, copy=False)
+
+
+async def spool_body(request: Request, cfg: dict = CFG_SERVICE.upload) -> tuple:
+    """Spool a request body (in memory up to `spool_max_mb`, on disk beyond) and hash it.
+
+    Returns:
+        tuple: (SpooledTemporaryFile rewound to the start, content hash)
+    """
+    spool = SpooledTemporaryFile(max_size=int(cfg.spool_max_mb * 2**20))
+    h = hashlib.blake2b(digest_size=20)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > cfg.max_mb * 2**20:
+            spool.close()
+            raise HTTPException(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"Upload exceeds {cfg.max_mb}MB",
+            )
+        h.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, f"file-{h.hexdigest()}"
+
+
+def notes_message(notes: pd.DataFrame, type: str = "notes") -> dict:
+    """JSON message carrying a note table."""
+    return dict(type=type, notes=notes.to_dict("records"))
+
+
+async def notes_response(notes: pd.DataFrame, format: str) -> dict | Response:
+    """Response carrying a note table as JSON, a MIDI file or a MusicXML score.
+
+    Scores are rendered in the exporter process pool (and cached), off the event loop.
+    """
+    if format == "midi":
+        return Response(notes_to_midi(notes), media_type="audio/midi")
+    if format == "musicxml":
+        cfg = CFG_ENGINE.score
+        options = ScoreOptions(bpm=cfg.bpm, divisions=cfg.divisions)
+        # Hashing, cache reads and the first pool start block: keep them off the event loop
+        exporter = await run_in_threadpool(get_score_exporter)
+        future = await run_in_threadpool(exporter.submit, notes, options)
+        data = await asyncio.wrap_future(future)
+        return Response(data, media_type="application/vnd.recordare.musicxml+xml")
+    return notes_message(notes)
+
+
+def check_format(format: str) -> None:
+    """Reject unknown result formats."""
+    if format not in RESULT_FORMATS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Invalid format: {format}")
+
+
+@app.post("/transcribe", response_model=None)
+async def transcribe(
+    request: Request, dtype: str = CFG_SERVICE.pcm_dtype, format: str = "json"
+) -> dict | Response:
+    """Transcribe a clip sent as a raw mono PCM body (micro-batched with concurrent requests).
+
+    Results are cached by audio content, so resubmitted clips skip inference.
+    `format=midi` returns a MIDI file and `format=musicxml` a score instead of JSON notes.
+    """
+    check_format(format)
+    if dtype not in PCM_DTYPES:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Invalid dtype: {dtype}")
+    try:
+        audio = decode_pcm(await request.body(), dtype)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    cache = request.app.state.result_cache
+    if cache is not None:
+        key = audio_key(audio)
+        notes = await run_in_threadpool(cache.get, key)
+        if notes is not None:
+            return await notes_response(notes, format)
+    try:
+        notes = await run_in_threadpool(request.app.state.batcher.transcribe, audio)
+    except TimeoutError as e:
+        raise HTTPException(status.HTTP_504_GATEWAY_TIMEOUT, str(e))
+    if cache is not None:
+        await run_in_threadpool(cache.put, key, notes)
+    return await notes_response(notes, format)
+
+
+@app.post("/transcribe/file", response_model=None)
+async def transcribe_file(request: Request, format: str = "json") -> dict | Response:
+    """Transcribe an encoded audio file (WAV, FLAC, MP3, ... at any sample rate) sent as the body.
+
+    The body is spooled, then decoded, resampled and transcribed block by block,
+    so memory stays bounded for long recordings.
+    `format=midi` returns a MIDI file and `format=musicxml` a score instead of JSON notes.
+    """
+    check_format(format)
+    spool, key = await spool_body(request)
+    cache = request.app.state.result_cache
+    with spool:
+        if cache is not None:
+            notes = await run_in_threadpool(cache.get, key)
+            if notes is not None:
+                return await notes_response(notes, format)
+        try:
+            notes = await run_in_threadpool(get_engine().transcribe_file, spool)
+        except RuntimeError as e:  # soundfile.LibsndfileError
+            raise HTTPException(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"Cannot decode audio: {e}"
+            )
+    if cache is not None:
+        await run_in_threadpool(cache.put, key, notes)
+    return await notes_response(notes, format)
+
+
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(websocket: WebSocket, dtype: str = CFG_SERVICE.pcm_dtype):
+    """Streaming transcription over a WebSocket.
+
+    Protocol:
+        - server -> client: `{"type": "ready", "sample_rate": ..., "dtype": ...}`
+        - client -> server: binary mono PCM chunks at `sample_rate`, then the text message `"end"`
+        - server -> client: `{"type": "notes", "notes": [...]}` whenever notes are finalized,
+          `{"type": "done", "notes": [...]}` with the remaining notes after `"end"`
+    """
+    engine = get_engine()
+    await websocket.accept()
+    if dtype not in PCM_DTYPES:
+        await websocket.close(
+            code=status.WS_1003_UNSUPPORTED_DATA, reason=f"Invalid dtype: {dtype}"
+        )
+        return
+
+    session = engine.stream()
+    max_samples = int(engine.cfg.streaming.max_chunk_seconds * engine.sr)
+    await websocket.send_json(dict(type="ready", sample_rate=engine.sr, dtype=dtype))
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                try:
+                    chunk = decode_pcm(message["bytes"], dtype)
+                except ValueError as e:
+                    await websocket.close(
+                        code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e)
+                    )
+                    return
+                if len(chunk) > max_samples:
+                    await websocket.close(
+                        code=status.WS_1009_MESSAGE_TOO_BIG,
+                        reason=f"Chunk exceeds {max_samples} samples",
+                    )
+                    return
+                notes = await run_in_threadpool(session.feed, chunk)
+                if len(notes) > 0:
+                    await websocket.send_json(notes_message(notes))
+            elif message.get("text") == "end":
+                notes = await run_in_threadpool(session.flush)
+                await websocket.send_json(notes_message(notes, type="done"))
+                await websocket.close()
+                log_info(f"Stream transcribed: {session.n_samples / engine.sr:.2f}s")
+                return
+    except WebSocketDisconnect:
+        log_warning(f"Stream disconnected after {session.n_samples / engine.sr:.2f}s")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=CFG_SERVICE.host, port=CFG_SERVICE.port)
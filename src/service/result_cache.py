@@ -0,0 +1,210 @@
+"""Persistent transcription result cache.
+
+Note tables are stored in SQLite keyed by (audio content hash, engine version),
+so resubmitted audio (retries, re-exports) skips inference entirely.
+
+- The engine version is a hash of the output-relevant engine settings (and the model weights file),
+  so editing them in `config/engine.yaml` invalidates every entry; stale versions are purged on open.
+  Operational settings (workers, cache locations, score rendering) keep the cache valid.
+- Entries expire after `ttl` seconds, and least recently used entries are evicted
+  once the stored results exceed `max_bytes`.
+- The database runs in WAL mode, so several service processes can share it.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from config import CFG_SERVICE
+from src.core.logger import log_info
+from src.engine import TranscriptionEngine, get_engine
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+# Engine configuration sections that change the transcribed notes
+VERSION_SECTIONS = ("audio", "features", "model", "decoder", "streaming")
+
+
+def engine_version(engine: TranscriptionEngine) -> str:
+    """Hash of everything that changes the engine output (`VERSION_SECTIONS` and weights)."""
+    h = hashlib.blake2b(digest_size=16)
+    settings = {name: engine.cfg.get(name) for name in VERSION_SECTIONS}
+    h.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    weights_path = engine.cfg.model.get("weights_path")
+    if weights_path:
+        with open(weights_path, "rb") as f:
+            h.update(hashlib.file_digest(f, "blake2b").digest())
+    return h.hexdigest()
+
+
+def audio_key(audio: np.ndarray) -> str:
+    """Content hash of a signal."""
+    audio = np.ascontiguousarray(audio)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{audio.dtype.str}{audio.shape}".encode())
+    h.update(memoryview(audio).cast("B"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """SQLite cache of note tables.
+
+    Args:
+        path (str): Database file
+        version (str): Engine version (see `engine_version`)
+        ttl (float): Lifetime of an entry in seconds
+        max_bytes (int): Size cap of the stored results
+        low_watermark (float): Eviction target as a fraction of `max_bytes`
+
+    Examples:
+        >>> cache = ResultCache("data/cache/results.sqlite", engine_version(engine))
+        >>> notes = cache.get(audio_key(y))
+        >>> if notes is None:
+        ...     cache.put(audio_key(y), notes := engine.transcribe(y))
+    """
+
+    def __init__(
+        self,
+        path: str,
+        version: str,
+        ttl: float = 86400,
+        max_bytes: int = 2**29,
+        low_watermark: float = 0.9,
+    ):
+        self.path = path
+        self.version = version
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        purged = self.conn.execute(
+            "DELETE FROM results WHERE version != ?", (version,)
+        ).rowcount
+        if purged:
+            log_info(
+                f"Result cache: purged {purged} entries of previous engine versions"
+            )
+        self._size = self.size()
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """Cached note table, or None on a miss or an expired entry."""
+        now = time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, created FROM results WHERE key = ? AND version = ?",
+                (key, self.version),
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key: str, notes: pd.DataFrame) -> None:
+        """Store a note table."""
+        value = pickle.dumps(notes, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time()
+        with self._lock:
+            replaced = self.conn.execute(
+                "SELECT nbytes FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.version, value, len(value), now, now),
+            )
+            self._size += len(value) - (replaced[0] if replaced else 0)
+            if self._size > self.max_bytes:
+                self._evict(now)
+
+    def size(self) -> int:
+        """Total size of the stored results in bytes."""
+        return self.conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM results"
+        ).fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones down to the low watermark."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "DELETE FROM results WHERE created < ?", (now - self.ttl,)
+            )
+            excess = self.size() - self.low_watermark * self.max_bytes
+            if excess > 0:
+                self.conn.execute(
+                    """
+                    DELETE FROM results WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, nbytes,
+                                SUM(nbytes) OVER (ORDER BY accessed, key) AS cumulative
+                            FROM results
+                        ) WHERE cumulative - nbytes < ?
+                    )
+                    """,
+                    (excess,),
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self._size = self.size()
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self.conn.execute("DELETE FROM results")
+            self._size = 0
+
+    def close(self) -> None:
+        """Close the database."""
+        self.conn.close()
+
+    @property
+    def stats(self) -> dict:
+        """Hit/miss counters."""
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / total if total else 0.0,
+            size=self._size,
+        )
+
+
+def get_result_cache(cfg: dict = CFG_SERVICE.result_cache) -> ResultCache | None:
+    """Create the result cache configured in `CFG_SERVICE.result_cache` (None if disabled)."""
+    if not cfg.enabled:
+        return None
+    return ResultCache(
+        cfg.path,
+        engine_version(get_engine()),
+        ttl=cfg.ttl,
+        max_bytes=int(cfg.max_mb * 2**20),
+    )
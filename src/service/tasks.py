@@ -0,0 +1,77 @@
+"""Celery tasks (optional batch executor).
+
+Enabled with `batching.celery: true` in `config/service.yaml`.
+The micro-batcher still groups requests locally; each batch runs on a celery worker.
+Signals and note tables travel as JSON (base64 samples, note columns), never as pickles,
+so broker access doesn't allow running code on workers or on the service.
+
+Run a worker:
+    celery -A src.service.tasks worker --concurrency 4
+"""
+
+import base64
+
+import numpy as np
+import pandas as pd
+from celery import Celery
+
+from config import CFG_SERVICE
+from src.engine import get_engine
+
+celery_app = Celery(
+    "transcription",
+    broker=CFG_SERVICE.celery.broker_url,
+    backend=CFG_SERVICE.celery.backend_url,
+)
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+)
+
+
+def encode_signal(audio: np.ndarray) -> str:
+    """float32 samples as base64."""
+    return base64.b64encode(np.ascontiguousarray(audio, dtype=np.float32)).decode()
+
+
+def decode_signal(data: str) -> np.ndarray:
+    """Samples encoded by `encode_signal`."""
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+def encode_table(notes: pd.DataFrame) -> dict:
+    """Note table as JSON-serializable columns and dtypes."""
+    return dict(
+        columns=notes.to_dict("list"),
+        dtypes={name: str(dtype) for name, dtype in notes.dtypes.items()},
+    )
+
+
+def decode_table(data: dict) -> pd.DataFrame:
+    """Note table encoded by `encode_table`."""
+    return pd.DataFrame(data["columns"]).astype(data["dtypes"])
+
+
+@celery_app.task(name="transcribe_batch")
+def transcribe_batch(signals: list[str]) -> list[dict]:
+    """Transcribe a micro-batch on a worker.
+
+    Args:
+        signals (list[str]): Signals encoded by `encode_signal`
+
+    Returns:
+        list[dict]: Note tables encoded by `encode_table`
+    """
+    notes = get_engine().transcribe_batch([decode_signal(y) for y in signals])
+    return [encode_table(table) for table in notes]
+
+
+def run_batch_celery(
+    signals: list[np.ndarray], timeout: float | None = None
+) -> list[pd.DataFrame]:
+    """Run a micro-batch on a celery worker and wait for the results."""
+    results = transcribe_batch.delay([encode_signal(y) for y in signals]).get(
+        timeout=timeout
+    )
+    return [decode_table(table) for table in results]
@@ -0,0 +1,26 @@
+"""Shared fixtures.
+
+Run from the project root (configuration paths are relative to it):
+    ENV=local pytest tests
+"""
+
+import os
+
+os.environ.setdefault("ENV", "local")
+
+import numpy as np
+import pytest
+
+from tests.helpers import synth
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from src.engine import TranscriptionEngine
+
+    return TranscriptionEngine()
+
+
+@pytest.fixture(scope="session")
+def audio() -> np.ndarray:
+    return synth([(60, 0.2, 0.9), (64, 0.5, 1.4), (67, 1.1, 1.8)], 2.0)
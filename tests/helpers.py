@@ -0,0 +1,34 @@
+"""Test helpers."""
+
+import threading
+
+import numpy as np
+
+SR = 16000
+
+
+def synth(notes: list[tuple], duration: float, sr: int = SR) -> np.ndarray:
+    """Mono float32 signal of harmonic tones.
+
+    Args:
+        notes (list[tuple]): (MIDI pitch, start seconds, end seconds)
+        duration (float): Signal length in seconds
+        sr (int): Sample rate
+    """
+    t = np.arange(int(duration * sr)) / sr
+    y = np.zeros_like(t)
+    for pitch, start, end in notes:
+        f0 = 440.0 * 2 ** ((pitch - 69) / 12)
+        on = (t >= start) & (t < end)
+        for h in range(1, 4):
+            y[on] += np.sin(2 * np.pi * f0 * h * t[on]) / h
+    return (0.3 * y).astype(np.float32)
+
+
+def run_threads(target, n: int = 8) -> None:
+    """Run `target` on `n` threads named `worker-<i>` and wait for all of them."""
+    threads = [threading.Thread(target=target, name=f"worker-{i}") for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,49 @@
+from math import gcd
+
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from src.engine.audio_io import Resampler, read_blocks
+
+RATES = [(44100, 16000), (22050, 16000), (8000, 16000), (48000, 16000)]
+
+
+def reference(x: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    g = gcd(orig_sr, target_sr)
+    return resample_poly(x.astype(np.float64), target_sr // g, orig_sr // g)
+
+
+@pytest.mark.parametrize("orig_sr, target_sr", RATES)
+@pytest.mark.parametrize("chunk", [1, 37, 1000, None])
+def test_resampler_matches_resample_poly(orig_sr, target_sr, chunk):
+    x = np.random.default_rng(0).uniform(-1, 1, orig_sr // 5).astype(np.float32)
+    chunk = chunk or len(x)
+    resampler = Resampler(orig_sr, target_sr)
+    y = np.concatenate(
+        [resampler(x[i : i + chunk]) for i in range(0, len(x), chunk)]
+        + [resampler.flush()]
+    )
+    np.testing.assert_allclose(y, reference(x, orig_sr, target_sr), atol=6e-7)
+
+
+def test_resampler_passthrough():
+    x = np.arange(100, dtype=np.float32)
+    resampler = Resampler(16000, 16000)
+    y = np.concatenate([resampler(x[:30]), resampler(x[30:]), resampler.flush()])
+    np.testing.assert_array_equal(y, x)
+
+
+@pytest.mark.parametrize("orig_sr", [44100, 16000])
+def test_read_blocks_matches_resample_poly(tmp_path, orig_sr):
+    sf = pytest.importorskip("soundfile")
+    stereo = np.random.default_rng(1).uniform(-0.5, 0.5, (orig_sr // 2, 2))
+    path = str(tmp_path / "clip.wav")
+    sf.write(path, stereo, orig_sr, subtype="FLOAT")
+    # Blocks of 0.013s do not line up with the filter length or the resampling ratio
+    blocks = list(read_blocks(path, 16000, block_seconds=0.013))
+    assert len(blocks) > 10
+    mono = stereo.astype(np.float32).mean(axis=1)
+    np.testing.assert_allclose(
+        np.concatenate(blocks), reference(mono, orig_sr, 16000), atol=6e-7
+    )
@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.service.batching import FileBroker, MemoryBroker, MicroBatcher
+from tests.helpers import synth
+
+
+@pytest.fixture(scope="module")
+def clips():
+    rng = np.random.default_rng(0)
+    return [
+        synth(
+            [(int(rng.integers(40, 80)), 0.05, rng.uniform(0.2, 0.6))],
+            rng.uniform(0.3, 0.8),
+        )
+        for _ in range(6)
+    ] + [np.zeros(100, dtype=np.float32)]
+
+
+def test_feature_batch_matches_single(engine, clips):
+    extractor = engine.extractor
+    for features, y in zip(extractor.batch(clips), clips):
+        np.testing.assert_array_equal(features, extractor(y))
+    batch = np.stack([clips[0][:4000], clips[1][:4000]])
+    np.testing.assert_array_equal(extractor(batch)[1], extractor(batch[1]))
+
+
+def test_transcribe_batch_matches_single(engine, clips):
+    for batched, y in zip(engine.transcribe_batch(clips), clips):
+        pd.testing.assert_frame_equal(batched, engine.transcribe(y))
+    assert engine.transcribe_batch([]) == []
+
+
+@pytest.mark.parametrize("broker", ["memory", "file"])
+def test_micro_batcher(engine, clips, broker, tmp_path):
+    broker = MemoryBroker() if broker == "memory" else FileBroker(str(tmp_path))
+    sizes = []
+
+    def run_batch(signals):
+        sizes.append(len(signals))
+        return engine.transcribe_batch(signals)
+
+    batcher = MicroBatcher(
+        engine, broker, max_batch_size=4, max_wait=0.05, run_batch=run_batch
+    )
+    batcher.start()
+    try:
+        with ThreadPoolExecutor(len(clips)) as pool:
+            results = list(pool.map(batcher.transcribe, clips))
+    finally:
+        batcher.stop()
+    for notes, y in zip(results, clips):
+        pd.testing.assert_frame_equal(notes, engine.transcribe(y))
+    assert max(sizes) <= 4 and sum(sizes) == len(clips)
+
+
+def test_batch_error_reaches_every_job(engine):
+    def run_batch(signals):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(engine, max_wait=0.05, run_batch=run_batch).start()
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            batcher.transcribe(np.zeros(100, dtype=np.float32))
+    finally:
+        batcher.stop()
+
+
+def test_memory_broker_drops_timed_out_jobs():
+    broker = MemoryBroker()
+    job_id = broker.submit(np.zeros(10, dtype=np.float32))
+    with pytest.raises(TimeoutError):
+        broker.wait(job_id, timeout=0.01)
+    assert job_id not in broker._futures
+    broker.set_result(job_id, pd.DataFrame())  # late result is ignored
+
+
+def test_file_broker_keeps_job_until_result(tmp_path):
+    broker = FileBroker(str(tmp_path))
+    job_id = broker.submit(np.zeros(10, dtype=np.float32))
+    job = broker.get(timeout=0)
+    assert os.listdir(tmp_path / "running") == [f"{job_id}.npy"]
+    notes = pd.DataFrame(dict(start_time=[0.5], note=[60]))
+    broker.set_result(job.id, notes)
+    assert not os.listdir(tmp_path / "running")
+    pd.testing.assert_frame_equal(broker.wait(job_id, timeout=1), notes)
+    assert not os.listdir(tmp_path / "done")
+
+
+def test_file_broker_errors(tmp_path):
+    broker = FileBroker(str(tmp_path))
+    job_id = broker.submit(np.zeros(10, dtype=np.float32))
+    broker.set_result(broker.get(timeout=0).id, ValueError("bad audio"))
+    with pytest.raises(RuntimeError, match="bad audio"):
+        broker.wait(job_id, timeout=1)
+
+
+def test_file_broker_rejects_corrupt_jobs(tmp_path):
+    broker = FileBroker(str(tmp_path))
+    job_id = broker.submit(np.zeros(10, dtype=np.float32))
+    with open(tmp_path / "pending" / f"{job_id}.npy", "wb") as f:
+        f.write(b"not an array")
+    assert broker.get(timeout=0) is None
+    with pytest.raises(RuntimeError, match="Unreadable job"):
+        broker.wait(job_id, timeout=1)
+    assert not os.listdir(tmp_path / "running")
+
+
+def test_file_broker_discards_late_results(tmp_path):
+    broker = FileBroker(str(tmp_path))
+    job_id = broker.submit(np.zeros(10, dtype=np.float32))
+    job = broker.get(timeout=0)
+    with pytest.raises(TimeoutError):
+        broker.wait(job_id, timeout=0.01)
+    broker.set_result(job.id, pd.DataFrame(dict(note=[60])))
+    assert not os.listdir(tmp_path / "done")
+
+
+def test_transcribe_timeout(engine):
+    batcher = MicroBatcher(engine, timeout=0.05)  # not started: the job is never run
+    with pytest.raises(TimeoutError):
+        batcher.transcribe(np.zeros(100, dtype=np.float32))
+
+
+def test_scheduler_survives_broker_errors(engine):
+    broker = MemoryBroker()
+    get, calls = broker.get, []
+
+    def flaky_get(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise OSError("disk error")
+        return get(timeout)
+
+    broker.get = flaky_get
+    batcher = MicroBatcher(engine, broker, max_wait=0.01, timeout=10).start()
+    batcher.poll_interval = 0.01
+    try:
+        notes = batcher.transcribe(np.zeros(100, dtype=np.float32))
+    finally:
+        batcher.stop()
+    assert len(notes) == 0 and len(calls) > 1
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from src.engine.decoder import NoteDecoder, notes_to_table
+from src.engine.model import N_PITCHES
+
+
+def posteriorgram(notes: list[tuple], n_frames: int = 40) -> tuple[np.ndarray, ...]:
+    """(frame, onset, velocity) matrices with notes of (pitch index, start, end, velocity)."""
+    frame, onset, velocity = (
+        np.zeros((n_frames, N_PITCHES), dtype=np.float32) for _ in range(3)
+    )
+    for pitch, start, end, vel in notes:
+        onset[start, pitch] = 0.9
+        frame[start:end, pitch] = 0.9
+        velocity[start, pitch] = vel
+    return frame, onset, velocity
+
+
+def as_set(notes: tuple[np.ndarray, ...]) -> set[tuple]:
+    starts, ends, pitches, _ = notes
+    return set(zip(starts.tolist(), ends.tolist(), pitches.tolist()))
+
+
+def test_decodes_notes():
+    frame, onset, velocity = posteriorgram([(10, 2, 8, 0.5), (40, 5, 20, 0.5)])
+    assert as_set(NoteDecoder().decode(frame, onset, velocity)) == {
+        (2, 8, 10),
+        (5, 20, 40),
+    }
+
+
+def test_onset_below_threshold():
+    frame, onset, velocity = posteriorgram([(10, 2, 8, 0.5)])
+    onset[2, 10] = 0.4
+    assert as_set(NoteDecoder().decode(frame, onset, velocity)) == set()
+    decoder = NoteDecoder(onset_threshold=0.3)
+    assert as_set(decoder.decode(frame, onset, velocity)) == {(2, 8, 10)}
+
+
+def test_frame_gap_ends_the_note():
+    frame, onset, velocity = posteriorgram([(10, 2, 12, 0.5)])
+    frame[6, 10] = 0.1  # one-frame dip without a new onset
+    assert as_set(NoteDecoder().decode(frame, onset, velocity)) == {(2, 6, 10)}
+    # The frames after the gap have no onset and never become a note
+    decoder = NoteDecoder(min_frames=5)
+    assert as_set(decoder.decode(frame, onset, velocity)) == set()
+
+
+def test_short_notes_are_dropped():
+    frame, onset, velocity = posteriorgram([(10, 2, 4, 0.5), (20, 2, 10, 0.5)])
+    decoder = NoteDecoder(min_frames=3)
+    assert as_set(decoder.decode(frame, onset, velocity)) == {(2, 10, 20)}
+
+
+def test_repeated_onsets_split_the_note():
+    frame, onset, velocity = posteriorgram([(10, 2, 20, 0.5)])
+    onset[8, 10] = 0.9
+    assert as_set(NoteDecoder().decode(frame, onset, velocity)) == {
+        (2, 8, 10),
+        (8, 20, 10),
+    }
+
+
+def test_hysteresis():
+    frame, onset, velocity = posteriorgram([(10, 2, 8, 0.5)])
+    frame[2:8, 10] = 0.4
+    decoder = NoteDecoder(frame_threshold=0.5, frame_low_threshold=0.3)
+    assert as_set(decoder.decode(frame, onset, velocity)) == set()
+    frame[5, 10] = 0.6
+    assert as_set(decoder.decode(frame, onset, velocity)) == {(2, 8, 10)}
+
+
+def test_velocity():
+    frame, onset, velocity = posteriorgram([(10, 2, 8, 0.25), (20, 4, 9, 1.0)])
+    table = notes_to_table(*NoteDecoder().decode(frame, onset, velocity), 100.0)
+    assert table.velocity.tolist() == [32, 127]
+    assert table.note.tolist() == [31, 41]
+    assert table.start_time.tolist() == [0.02, 0.04]
+
+
+@pytest.mark.parametrize("block", [1, 3, 7, 64])
+def test_streaming_matches_decode(block):
+    rng = np.random.default_rng(block)
+    frame, onset, velocity = (
+        rng.random((200, N_PITCHES), dtype=np.float32) for _ in range(3)
+    )
+    decoder = NoteDecoder(frame_threshold=0.6, frame_low_threshold=0.4, min_frames=2)
+    expected = decoder.decode(frame, onset, velocity)
+    assert len(expected[0]) > 100
+
+    parts = [
+        decoder.step(
+            frame[i : i + block], onset[i : i + block], velocity[i : i + block]
+        )
+        for i in range(0, len(frame), block)
+    ]
+    parts.append(decoder.flush())
+    streamed = tuple(np.concatenate(arrs) for arrs in zip(*parts))
+    key = lambda notes: np.lexsort((notes[2], notes[0]))
+    for a, b in zip(streamed, expected):
+        np.testing.assert_array_equal(a[key(streamed)], b[key(expected)])
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+from src.core import depth_logging, timer
+from src.core.depth_logging import D, DepthManager, StackSampler
+from src.core.timer import STATS
+from tests.helpers import run_threads
+
+
+def test_concurrent_call_counts():
+    sampler = StackSampler()
+
+    def count():
+        for _ in range(10_000):
+            sampler.count(("a", "b"))
+
+    run_threads(count)
+    assert sampler.calls[("a", "b")] == 80_000
+
+
+def test_stats_mode_aggregates_per_function(monkeypatch):
+    logs = []
+    monkeypatch.setattr(timer, "TIMER_MODE", "stats")
+    monkeypatch.setattr(
+        depth_logging, "log_info", lambda *args, **kwargs: logs.append(args)
+    )
+    STATS.reset()
+
+    @D(mode="on")
+    def step(x: int) -> int:
+        return x + 1
+
+    assert [step(i) for i in range(500)] == list(range(1, 501))
+    rows = STATS.summary()
+    STATS.reset()
+    assert [(row["name"], row["count"]) for row in rows] == [
+        (f"{step.__qualname__}()", 500)
+    ]
+    assert not logs
+
+
+def capture_logs(monkeypatch) -> list[str]:
+    logs = []
+    monkeypatch.setattr(
+        depth_logging, "log_info", lambda msg, *args, **kwargs: logs.append(str(msg))
+    )
+    return logs
+
+
+def test_tasks_number_their_own_calls(monkeypatch):
+    logs = capture_logs(monkeypatch)
+
+    @D(mode="on")
+    async def inner() -> tuple[int, str]:
+        await asyncio.sleep(0)
+        return DepthManager.depth(), DepthManager.next_name()
+
+    @D(mode="on")
+    async def outer() -> list[tuple[int, str]]:
+        first = await inner()
+        await asyncio.sleep(0)
+        return [first, await inner()]
+
+    async def main():
+        tasks = [asyncio.create_task(outer(), name=f"task-{i}") for i in range(4)]
+        return await asyncio.gather(*tasks)
+
+    # Every task continues from a copy of the caller's context
+    n = DepthManager.next_name()
+    assert asyncio.run(main()) == [[(3, f"{n}.1.1"), (3, f"{n}.2.1")]] * 4
+    assert DepthManager.next_name() == n
+    for i in range(4):
+        names = [log.split("|")[0].strip() for log in logs if f"[task-{i}]" in log]
+        assert names == [f"{name} [task-{i}]" for name in (n, f"{n}.1", f"{n}.2")]
+
+
+def test_threads_number_their_own_calls(monkeypatch):
+    logs = capture_logs(monkeypatch)
+    barrier = threading.Barrier(4)
+    results = {}
+
+    @D(mode="on")
+    def inner() -> tuple[int, str]:
+        barrier.wait()
+        return DepthManager.depth(), DepthManager.next_name()
+
+    @D(mode="on")
+    def outer() -> None:
+        results[threading.current_thread().name] = [inner(), inner()]
+
+    before = DepthManager.next_name()
+    run_threads(outer, n=4)
+    assert results == {f"worker-{i}": [(3, "1.1.1"), (3, "1.2.1")] for i in range(4)}
+    assert DepthManager.next_name() == before
+    for i in range(4):
+        names = [log.split("|")[0].strip() for log in logs if f"[worker-{i}]" in log]
+        assert names == [f"{n} [worker-{i}]" for n in ("1", "1.1", "1.2")]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.engine.evaluation import evaluate_notes, match_notes
+
+
+def notes(rows: list[tuple]) -> pd.DataFrame:
+    """Note table from (start, end, pitch) rows."""
+    start, end, pitch = np.array(rows, dtype=np.float64).reshape(-1, 3).T
+    return pd.DataFrame(
+        dict(
+            start_time=start,
+            end_time=end,
+            instrument=0,
+            note=pitch.astype(np.int64),
+            velocity=64,
+        )
+    )
+
+
+def random_notes(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    start = np.round(rng.uniform(0, 10, n), 3)
+    end = start + np.round(rng.uniform(0.05, 1, n), 3)
+    return notes(list(zip(start, end, rng.integers(60, 64, n))))
+
+
+REF = notes([(1.0, 2.0, 60), (1.0, 1.5, 64), (3.0, 4.0, 60)])
+
+
+def test_onset_only_matching():
+    est = notes([(1.04, 1.2, 60), (1.0, 3.0, 64), (3.1, 4.0, 60), (1.0, 2.0, 61)])
+    matches = match_notes(REF, est, offset_ratio=None)
+    assert sorted(map(tuple, matches.tolist())) == [(0, 0), (1, 1)]
+
+
+def test_onset_offset_matching():
+    # Offset tolerance is max(0.05, 0.2 * duration): 0.2s for ref 0, 0.1s for ref 1
+    est = notes([(1.0, 2.15, 60), (1.0, 1.65, 64), (3.0, 4.0, 60)])
+    matches = match_notes(REF, est)
+    assert sorted(map(tuple, matches.tolist())) == [(0, 0), (2, 2)]
+    metrics = evaluate_notes(REF, est)
+    assert metrics["f1"] == 1.0
+    assert metrics["precision_offset"] == metrics["recall_offset"] == 2 / 3
+
+
+def test_matching_is_one_to_one():
+    est = notes([(1.0, 2.0, 60), (1.01, 2.0, 60)])
+    ref = notes([(0.98, 2.0, 60), (1.04, 2.0, 60)])
+    assert len(match_notes(ref, est)) == 2
+    assert len(match_notes(ref[:1], est)) == 1
+
+
+@pytest.mark.parametrize("n_ref, n_est", [(0, 3), (3, 0), (0, 0)])
+def test_empty(n_ref, n_est):
+    ref, est = REF[:n_ref], REF[:n_est]
+    assert match_notes(ref, est).shape == (0, 2)
+    assert evaluate_notes(ref, est) == dict.fromkeys(
+        [
+            "precision",
+            "recall",
+            "f1",
+            "precision_offset",
+            "recall_offset",
+            "f1_offset",
+        ],
+        0.0,
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_mir_eval(seed):
+    transcription = pytest.importorskip("mir_eval.transcription")
+    rng = np.random.default_rng(seed)
+    ref, est = random_notes(rng, 200), random_notes(rng, 200)
+    metrics = evaluate_notes(ref, est)
+
+    def intervals_pitches(table: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        hz = 440.0 * 2 ** ((table.note.to_numpy() - 69) / 12)
+        return table[["start_time", "end_time"]].to_numpy(), hz
+
+    for suffix, offset_ratio in (("", None), ("_offset", 0.2)):
+        precision, recall, f1, _ = transcription.precision_recall_f1_overlap(
+            *intervals_pitches(ref), *intervals_pitches(est), offset_ratio=offset_ratio
+        )
+        assert metrics[f"precision{suffix}"] == pytest.approx(precision)
+        assert metrics[f"recall{suffix}"] == pytest.approx(recall)
+        assert metrics[f"f1{suffix}"] == pytest.approx(f1)
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+
+from src.engine.feature_cache import FeatureCache
+from src.engine.features import FeatureParams, get_feature_extractor
+
+
+def test_hit_after_miss(tmp_path, audio):
+    cache = FeatureCache(str(tmp_path), max_bytes=2**30)
+    extractor = get_feature_extractor(FeatureParams())
+    first = cache.features(audio, extractor)
+    second = cache.features(audio, extractor)
+    np.testing.assert_array_equal(first, extractor(audio))
+    np.testing.assert_array_equal(second, first)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_audio_and_params(audio):
+    params = FeatureParams()
+    key = FeatureCache.key(audio, params)
+    assert FeatureCache.key(audio.copy(), params) == key
+    assert FeatureCache.key(audio[:-1], params) != key
+    assert FeatureCache.key(audio, FeatureParams(hop_length=128)) != key
+    assert FeatureCache.key(audio.astype(np.float64), params) != key
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_bytes=3 * 8128, low_watermark=0.7)
+    keys = [f"{i:02d}" * 20 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, np.zeros(1000))
+        os.utime(cache.path(key), (i, i))
+    assert cache.get(keys[0]) is not None  # now the most recently used
+    cache.put("ff" * 20, np.zeros(1000))
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.evictions >= 1
+    assert cache.size() <= cache.max_bytes
+
+
+def test_overwrite_keeps_size(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_bytes=2**30)
+    cache.put("aa" * 20, np.zeros(10))
+    for _ in range(5):
+        cache.put("bb" * 20, np.zeros(1000))
+    assert cache._size == cache.size()
+
+
+def test_put_returns_stored_array(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_bytes=2**30)
+    features = np.arange(1000.0)
+    stored = cache.put("aa" * 20, features)
+    cache.clear()  # e.g. evicted by another process
+    np.testing.assert_array_equal(stored, features)
+    assert not stored.flags.writeable and features.flags.writeable
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+import scipy.signal
+
+from src.engine.features import (
+    FeatureExtractor,
+    FeatureParams,
+    cqt_frequencies,
+    mel_filterbank,
+)
+
+SR = 16000
+
+
+@pytest.fixture(scope="module")
+def signal() -> np.ndarray:
+    return np.random.default_rng(0).standard_normal(SR // 2).astype(np.float32)
+
+
+def extractor(kind: str, **kwargs) -> FeatureExtractor:
+    return FeatureExtractor(FeatureParams(sr=SR, n_fft=2048, kind=kind, **kwargs))
+
+
+def reference_stft(y: np.ndarray, n_fft: int = 2048, hop: int = 256) -> np.ndarray:
+    """|STFT| of centered frames, shape (n_frames, n_fft // 2 + 1)."""
+    window = scipy.signal.get_window("hann", n_fft)
+    _, _, spec = scipy.signal.stft(
+        y.astype(np.float64),
+        window=window,
+        nperseg=n_fft,
+        noverlap=n_fft - hop,
+        boundary="zeros",
+        padded=False,
+    )
+    return np.abs(spec.T) * window.sum()  # undo the "spectrum" scaling
+
+
+@pytest.mark.parametrize("kind, n_features", [("stft", 1025), ("mel", 88), ("cqt", 88)])
+def test_shapes(kind, n_features, signal):
+    ex = extractor(kind)
+    n_frames = ex.n_frames(len(signal))
+    assert ex(signal).shape == (n_frames, n_features)
+    assert ex(np.stack([signal] * 3)).shape == (3, n_frames, n_features)
+    assert ex(signal, center=False).shape == (
+        ex.n_frames(len(signal), center=False),
+        n_features,
+    )
+    assert ex(signal[:100], center=False).shape == (0, n_features)
+    assert [f.shape for f in ex.batch([signal, signal[:1000]])] == [
+        (n_frames, n_features),
+        (ex.n_frames(1000), n_features),
+    ]
+
+
+@pytest.mark.parametrize("kind", ["stft", "mel", "cqt"])
+def test_single_frame(kind, signal):
+    ex = extractor(kind)
+    frames = ex.frames(signal)
+    single = ex.transform(frames[5])
+    assert single.shape == (ex.n_features,)
+    np.testing.assert_allclose(single, ex.transform(frames)[5], rtol=1e-6)
+
+
+def test_stft_matches_scipy(signal):
+    expected = np.log1p(reference_stft(signal))
+    np.testing.assert_allclose(extractor("stft")(signal), expected, atol=1e-4)
+
+
+def test_mel_matches_reference(signal):
+    ex = extractor("mel", fmin=30.0)
+    fb = mel_filterbank(SR, 2048, 88, 30.0, SR / 2)
+    expected = np.log1p(reference_stft(signal) @ fb)
+    np.testing.assert_allclose(ex(signal), expected, atol=1e-4)
+    # Area-normalized triangles integrate to 1 over Hz
+    np.testing.assert_allclose(fb.sum(axis=0)[40:] * SR / 2048, 1, atol=0.05)
+
+
+def test_cqt_matches_time_domain_kernels(signal):
+    ex = extractor("cqt")
+    n_fft, freqs = 2048, cqt_frequencies(88, 27.5, 12)
+    q = 1 / (2 ** (1 / 12) - 1)
+    kernels = np.zeros((88, n_fft), dtype=np.complex128)
+    for k, f in enumerate(freqs):
+        length = min(int(np.ceil(q * SR / f)), n_fft)
+        window = np.hanning(length)
+        n = np.arange(length) - (length - 1) / 2
+        start = (n_fft - length) // 2
+        kernels[k, start : start + length] = (
+            window / window.sum() * np.exp(2j * np.pi * f / SR * n)
+        )
+    frames = ex.frames(signal).astype(np.float64) * scipy.signal.get_window(
+        "hann", n_fft
+    )
+    expected = np.log1p(n_fft * np.abs(frames @ kernels.conj().T))
+    np.testing.assert_allclose(ex(signal), expected, atol=0.05)
+
+
+def test_cqt_peaks_at_the_played_bin():
+    ex = extractor("cqt")
+    freqs = cqt_frequencies(88, 27.5, 12)
+    t = np.arange(SR) / SR
+    for k in (20, 48, 70):
+        features = ex(np.sin(2 * np.pi * freqs[k] * t))
+        assert np.argmax(features[len(features) // 2]) == k
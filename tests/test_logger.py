@@ -0,0 +1,62 @@
+import importlib
+import json
+import logging
+import pickle
+import queue
+
+import pytest
+
+from src.core.logger import JSONLinesFormatter, LazyMessage, ProcessQueueHandler
+
+
+def record(msg) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, msg, None, None)
+
+
+def through_process_queue(msg) -> logging.LogRecord:
+    log_queue = queue.SimpleQueue()
+    ProcessQueueHandler(log_queue).emit(record(msg))
+    return pickle.loads(pickle.dumps(log_queue.get()))
+
+
+def test_process_queue_keeps_structured_data():
+    entry = json.loads(
+        JSONLinesFormatter().format(through_process_queue(LazyMessage(dict(a=1))))
+    )
+    assert entry["data"] == dict(a=1)
+    assert "msg" not in entry
+
+
+def test_process_queue_text_message():
+    entry = json.loads(
+        JSONLinesFormatter().format(
+            through_process_queue(LazyMessage("done", style="GREEN"))
+        )
+    )
+    assert entry["msg"] == "done"
+
+
+def test_json_lines_in_process():
+    entry = json.loads(JSONLinesFormatter().format(record(LazyMessage([1, 2]))))
+    assert entry["data"] == [1, 2]
+
+
+def test_lazy_message_renders_once(monkeypatch):
+    # `src.core.logger` is also the logger
+    logger = importlib.import_module("src.core.logger")
+    calls = []
+    pretty_dict = logger.pretty_dict
+    monkeypatch.setattr(
+        logger, "pretty_dict", lambda s: calls.append(s) or pretty_dict(s)
+    )
+    message = LazyMessage(dict(a=1))
+    assert str(message) == str(message) == '{\n  "a": 1\n}'
+    assert len(calls) == 1
+
+
+def test_disabled_level_is_not_rendered(monkeypatch):
+    logger = importlib.import_module("src.core.logger")
+    monkeypatch.setattr(LazyMessage, "__str__", lambda self: pytest.fail("rendered"))
+    monkeypatch.setattr(logger, "pretty_dict", lambda s: pytest.fail("serialized"))
+    assert not logger.logger.isEnabledFor(logging.DEBUG)
+    logger.slog(dict(a=1), level="debug")
@@ -0,0 +1,139 @@
+import io
+
+import mido
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.engine.midi import encode_varints, notes_to_midi, varint
+
+
+def note_table(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(
+        rows, columns=["start_time", "end_time", "instrument", "note", "velocity"]
+    )
+
+
+def read(data: bytes) -> mido.MidiFile:
+    return mido.MidiFile(file=io.BytesIO(data))
+
+
+def note_spans(track: mido.MidiTrack) -> list[tuple[int, int, int]]:
+    """(pitch, tick on, tick off) of each note, pairing on/off events."""
+    tick, open_notes, spans = 0, {}, []
+    for msg in track:
+        tick += msg.time
+        if msg.type == "note_on" and msg.velocity > 0:
+            assert msg.note not in open_notes, "note on while sounding"
+            open_notes[msg.note] = tick
+        elif msg.type in ("note_on", "note_off"):
+            spans.append((msg.note, open_notes.pop(msg.note), tick))
+    assert not open_notes, "stuck notes"
+    return sorted(spans)
+
+
+@pytest.mark.parametrize(
+    "value", [0, 1, 127, 128, 16383, 16384, 2**21 - 1, 2**21, 2**28 - 1]
+)
+def test_varint_matches_mido(value):
+    groups, n_bytes = encode_varints([value])
+    assert varint(value) == bytes(mido.midifiles.midifiles.encode_variable_int(value))
+    assert n_bytes[0] == len(varint(value))
+
+
+def test_roundtrip():
+    notes = note_table(
+        [
+            (0.0, 0.5, 0, 60, 100),
+            (0.25, 1.0, 0, 64, 80),
+            (0.5, 1.0, 0, 60, 90),  # re-struck right after the first note ends
+            (0.0, 2.0, 1, 36, 127),
+        ]
+    )
+    midi = read(notes_to_midi(notes, programs={0: 0, 1: 33}, names={1: "Bass"}))
+    assert midi.type == 1 and len(midi.tracks) == 3
+    assert midi.tracks[0][0].type == "set_tempo" and midi.tracks[0][0].tempo == 500000
+    programs = [
+        [m.program for m in t if m.type == "program_change"] for t in midi.tracks[1:]
+    ]
+    assert programs == [[0], [33]]
+    assert midi.tracks[2].name == "Bass"
+    assert note_spans(midi.tracks[1]) == [(60, 0, 480), (60, 480, 960), (64, 240, 960)]
+    assert note_spans(midi.tracks[2]) == [(36, 0, 1920)]
+    assert midi.length == pytest.approx(2.0)
+
+
+def test_drums_use_channel_10():
+    midi = read(notes_to_midi(note_table([(0.0, 0.1, 5, 38, 100)]), programs={5: None}))
+    messages = [m for m in midi.tracks[1] if not m.is_meta]
+    assert all(m.channel == 9 for m in messages)
+    assert not any(m.type == "program_change" for m in messages)
+
+
+def test_zero_length_note_is_not_stuck():
+    midi = read(
+        notes_to_midi(note_table([(1.0, 1.0, 0, 60, 100), (1.0, 1.0001, 0, 62, 100)]))
+    )
+    assert note_spans(midi.tracks[1]) == [(60, 960, 961), (62, 960, 961)]
+
+
+@pytest.mark.parametrize("program", [-1, 128])
+def test_invalid_program(program):
+    with pytest.raises(ValueError, match="program"):
+        notes_to_midi(note_table([(0.0, 1.0, 0, 60, 100)]), programs={0: program})
+
+
+def test_empty_table():
+    midi = read(notes_to_midi(note_table([])))
+    assert len(midi.tracks) == 1
+
+
+def test_large_table_note_count():
+    rng = np.random.default_rng(0)
+    start = rng.uniform(0, 60, 2000)
+    notes = pd.DataFrame(
+        dict(
+            start_time=start,
+            end_time=start + rng.uniform(0.05, 2, len(start)),
+            instrument=rng.integers(0, 4, len(start)),
+            note=rng.integers(21, 109, len(start)),
+            velocity=rng.integers(1, 128, len(start)),
+        )
+    )
+    midi = read(notes_to_midi(notes))
+    n_on = sum(m.type == "note_on" and m.velocity > 0 for t in midi.tracks for m in t)
+    assert n_on == len(notes)
+
+
+@pytest.mark.parametrize(
+    "row, match",
+    [
+        ((0.0, 1.0, 0, 128, 100), "note"),
+        ((0.0, 1.0, 0, -1, 100), "note"),
+        ((0.0, 1.0, 0, 60, 128), "velocity"),
+        ((-1.0, 1.0, 0, 60, 100), "negative"),
+        ((0.0, 1e6, 0, 60, 100), "end before"),
+    ],
+)
+def test_invalid_notes(row, match):
+    with pytest.raises(ValueError, match=match):
+        notes_to_midi(note_table([row]))
+
+
+def test_invalid_varint():
+    with pytest.raises(ValueError):
+        varint(2**28)
+
+
+def test_channels_are_shared_by_program():
+    notes = note_table([(0.0, 1.0, i, 60, 100) for i in range(20)])
+    programs = {i: i % 3 for i in range(20)} | {19: None}
+    midi = read(notes_to_midi(notes, programs=programs))
+    channel_programs = {}
+    for track in midi.tracks[1:]:
+        for msg in track:
+            if msg.type == "program_change":
+                channel_programs.setdefault(msg.channel, set()).add(msg.program)
+    assert channel_programs == {0: {0}, 1: {1}, 2: {2}}
+    drums = [m for m in midi.tracks[-1] if not m.is_meta]
+    assert all(m.channel == 9 for m in drums)
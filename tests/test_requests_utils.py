@@ -0,0 +1,293 @@
+import asyncio
+import gzip
+import io
+import json
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from src.core import requests_utils
+from src.core.requests_utils import (
+    APIError,
+    ApiLogLimiter,
+    AsyncHttpClient,
+    ApiLogPolicy,
+    CircuitOpenError,
+    HttpClient,
+    RequestBody,
+    decode_body,
+    redact,
+    safe_post,
+    truncate,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """`/ok`: echo, `/flaky/<n>`: 503 for the first n requests, `/bad`: 400 with a JSON error,
+    `/undecodable`: 200 with a body that cannot be decoded, `/picky`: echo, 400 or undecodable
+    by `i % 3` of the payload, `/slow`: echo after 20ms."""
+
+    calls = Counter()
+    lock = threading.Lock()
+    in_flight = max_in_flight = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.calls[self.path] += 1
+        picky = self.path == "/picky" and json.loads(body)["i"] % 3
+        if self.path.startswith("/flaky/") and self.calls[self.path] <= int(
+            self.path[7:]
+        ):
+            self.reply(503, dict(error="busy"))
+        elif self.path == "/bad" or picky == 1:
+            self.reply(400, dict(error="invalid input"))
+        elif self.path == "/undecodable" or picky == 2:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("X-Array-Dtype", "not-a-dtype")
+            self.send_header("Content-Length", "4")
+            self.end_headers()
+            self.wfile.write(b"\x00" * 4)
+        elif self.path == "/slow":
+            with Handler.lock:
+                Handler.in_flight += 1
+                Handler.max_in_flight = max(Handler.max_in_flight, Handler.in_flight)
+            time.sleep(0.02)
+            with Handler.lock:
+                Handler.in_flight -= 1
+            self.reply(200, dict(echo=json.loads(body)))
+        else:
+            self.reply(200, dict(echo=json.loads(body or "null")))
+
+    def reply(self, status: int, data: dict) -> None:
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    Handler.calls.clear()
+    Handler.in_flight = Handler.max_in_flight = 0
+
+
+@pytest.fixture
+def closed_port() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def client(**kwargs) -> HttpClient:
+    return HttpClient(**{"backoff": 0.0, **kwargs})
+
+
+def test_default_policy_logs_everything():
+    limiter = ApiLogLimiter()
+    assert all(limiter.allow("site")[0] for _ in range(1000))
+    assert limiter.counts == dict(logged=1000, sampled_out=0, rate_limited=0)
+
+
+def test_opt_in_rate_limit():
+    limiter = ApiLogLimiter(ApiLogPolicy(rate_limit=1e-6, burst=5))
+    allowed = [limiter.allow("site")[0] for _ in range(10)]
+    assert allowed == [True] * 5 + [False] * 5
+    assert limiter.allow("other")[0]
+    assert limiter.allow("site", error=False) == (False, 0)
+
+
+def test_opt_in_sampling_keeps_errors():
+    limiter = ApiLogLimiter(ApiLogPolicy(sample_rate=0.0))
+    assert not limiter.allow("site")[0]
+    assert limiter.allow("site", error=True) == (True, 1)
+
+
+def test_redact_recurses_into_lists():
+    payload = dict(items=[dict(token="t", id=1)], auth=dict(Password="p"))
+    assert redact(payload, ("token", "password")) == dict(
+        items=[dict(token="***", id=1)], auth=dict(Password="***")
+    )
+
+
+def test_truncate_summarizes_large_payloads(monkeypatch):
+    dumps, dump = [], json.dumps
+    monkeypatch.setattr(
+        requests_utils.jsonlib,
+        "dumps",
+        lambda obj, **kwargs: dumps.append(obj) or dump(obj, **kwargs),
+    )
+    payload = dict(
+        signal=np.zeros(10**6, dtype=np.float32),
+        frames=list(range(10**6)),
+        nested=dict(a=dict(b=dict(c=dict(d=dict(e=1))))),
+        text="x" * 10**6,
+    )
+    text = truncate(payload, 1000)
+    assert len(text) < 1100 and len(dump(dumps[0])) < 3000
+    assert dumps[0]["signal"] == "<ndarray float32 (1000000,)>"
+    assert dumps[0]["frames"][-1] == f"... +{10**6 - 20} items"
+    assert dumps[0]["nested"]["a"]["b"]["c"] == "{... 1 keys}"
+
+
+def test_truncate_keeps_small_payloads():
+    assert truncate(dict(a=[1, 2], b="c"), 100) == '{"a":[1,2],"b":"c"}'
+
+
+def test_post_decodes_json(server):
+    assert safe_post(f"{server}/ok", dict(a=1), client=client()) == dict(echo=dict(a=1))
+
+
+def test_idempotent_retry(server):
+    response = client().post(f"{server}/flaky/2", dict(a=1), idempotent=True)
+    assert response.json() == dict(echo=dict(a=1))
+    assert Handler.calls["/flaky/2"] == 3
+
+
+def test_non_idempotent_status_is_not_retried(server):
+    with pytest.raises(APIError) as info:
+        client().post(f"{server}/flaky/1", dict(a=1))
+    assert info.value.response.status_code == 503
+    assert Handler.calls["/flaky/1"] == 1
+
+
+def test_retries_exhausted(server):
+    with pytest.raises(APIError) as info:
+        client(retries=2).post(f"{server}/flaky/5", dict(a=1), idempotent=True)
+    assert info.value.response.status_code == 503
+    assert Handler.calls["/flaky/5"] == 3
+
+
+def test_client_error(server):
+    with pytest.raises(APIError) as info:
+        client().post(f"{server}/bad", dict(a=1), idempotent=True)
+    assert Handler.calls["/bad"] == 1
+    assert "<Response [400]>" in str(info.value)
+    assert "invalid input" in str(info.value)
+
+
+def test_connection_error(closed_port):
+    with pytest.raises(APIError) as info:
+        client(retries=1).post(f"{closed_port}/ok", dict(a=1))
+    assert info.value.response is None
+    assert "no response" in str(info.value)
+
+
+def test_circuit_opens(closed_port):
+    http = client(retries=0, breaker_threshold=2)
+    for _ in range(2):
+        with pytest.raises(APIError):
+            http.post(f"{closed_port}/ok", dict(a=1))
+    with pytest.raises(CircuitOpenError):
+        http.post(f"{closed_port}/ok", dict(a=1))
+
+
+def async_post(url: str, **kwargs):
+    async def post():
+        async with AsyncHttpClient(
+            backoff=0.0, retries=kwargs.pop("retries", 3)
+        ) as http:
+            return await http.post(url, dict(a=1), **kwargs)
+
+    return asyncio.run(post())
+
+
+def test_async_idempotent_retry(server):
+    assert async_post(f"{server}/flaky/2", idempotent=True) == dict(echo=dict(a=1))
+    assert Handler.calls["/flaky/2"] == 3
+
+
+def test_async_error_keeps_response(server):
+    with pytest.raises(APIError) as info:
+        async_post(f"{server}/bad", idempotent=True)
+    assert Handler.calls["/bad"] == 1
+    assert info.value.response.status_code == 400
+    assert info.value.response.json() == dict(error="invalid input")
+    assert "<Response [400]>" in str(info.value)
+
+
+def test_async_connection_error(closed_port):
+    with pytest.raises(APIError) as info:
+        async_post(f"{closed_port}/ok", retries=1)
+    assert info.value.response is None
+
+
+def async_map(url: str, batch: list, **kwargs) -> tuple[list, dict]:
+    async def post():
+        async with AsyncHttpClient(backoff=0.0, retries=0, **kwargs) as http:
+            return await http.map(url, batch)
+
+    return asyncio.run(post())
+
+
+def test_async_undecodable_response(server):
+    with pytest.raises(APIError) as info:
+        async_post(f"{server}/undecodable")
+    assert info.value.response.status_code == 200
+    assert isinstance(info.value.__cause__, TypeError)
+
+
+def test_map_returns_partial_results(server):
+    batch = [dict(i=i) for i in range(9)]
+    results, errors = async_map(f"{server}/picky", batch, concurrency=3)
+    assert results == [
+        dict(echo=data) if i % 3 == 0 else None for i, data in enumerate(batch)
+    ]
+    assert sorted(errors) == [1, 2, 4, 5, 7, 8]
+    assert [errors[i].response.status_code for i in (1, 2)] == [400, 200]
+    assert isinstance(errors[2].__cause__, TypeError)
+
+
+def test_imap_bounds_concurrency(server):
+    batch = (dict(i=i) for i in range(40))  # generated lazily
+    results, errors = async_map(f"{server}/slow", batch, concurrency=4)
+    assert results == [dict(echo=dict(i=i)) for i in range(40)] and not errors
+    assert 1 < Handler.max_in_flight <= 4
+
+
+def test_msgpack_body_roundtrip():
+    data = dict(notes=np.arange(6, dtype=np.float32).reshape(2, 3), name="x")
+    body = RequestBody.msgpack(data, compression="gzip")
+    assert body.headers["Content-Encoding"] == "gzip"
+    decoded = decode_body(gzip.decompress(body.content), body.headers)
+    np.testing.assert_array_equal(decoded["notes"], data["notes"])
+    assert decoded["name"] == "x"
+
+
+def test_binary_array_body():
+    array = np.arange(12, dtype=np.int16).reshape(3, 4)
+    body = RequestBody.binary(array)
+    np.testing.assert_array_equal(decode_body(bytes(body.content), body.headers), array)
+
+
+def test_streamed_body_is_replayable():
+    body = RequestBody.binary(io.BytesIO(b"abc" * 100_000), compression="gzip")
+    assert body.replayable
+    first = b"".join(body.payload())
+    assert first == b"".join(body.payload())
+    assert gzip.decompress(first) == b"abc" * 100_000
+
+
+def test_missing_zstandard(monkeypatch):
+    monkeypatch.setattr(requests_utils, "zstandard", None)
+    with pytest.raises(ImportError, match="pip install zstandard"):
+        RequestBody.json(dict(a=1), compression="zstd")
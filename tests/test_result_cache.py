@@ -0,0 +1,74 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from easydict import EasyDict
+
+from src.service.result_cache import ResultCache, audio_key, engine_version
+
+
+def notes(n: int) -> pd.DataFrame:
+    return pd.DataFrame({"pitch": np.arange(n), "onset": np.linspace(0, 1, n)})
+
+
+def test_hit_after_put(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), "v1")
+    key = audio_key(np.zeros(100, dtype=np.float32))
+    assert cache.get(key) is None
+    cache.put(key, notes(5))
+    pd.testing.assert_frame_equal(cache.get(key), notes(5))
+    assert cache.stats["hits"] == cache.stats["misses"] == 1
+
+
+def test_new_version_purges(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    cache = ResultCache(path, "v1")
+    cache.put("a", notes(5))
+    cache.close()
+    assert ResultCache(path, "v1").get("a") is not None
+    cache = ResultCache(path, "v2")
+    assert cache.get("a") is None
+    assert cache.size() == 0
+
+
+def test_expired_entry_misses(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), "v1", ttl=-1)
+    cache.put("a", notes(5))
+    assert cache.get("a") is None
+
+
+def test_replace_keeps_size(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), "v1")
+    cache.put("a", notes(1000))
+    cache.put("a", notes(10))
+    cache.put("a", notes(10))
+    assert cache.stats["size"] == cache.size()
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), "v1")
+    cache.put("probe", notes(100))
+    entry = cache.size()
+    cache.clear()
+    cache.max_bytes = int(entry * 3.5)
+    for key in "abc":
+        cache.put(key, notes(100))
+    cache.get("a")
+    cache.put("d", notes(100))
+    assert cache.size() <= cache.low_watermark * cache.max_bytes
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+
+def test_engine_version_tracks_output_settings(engine):
+    base = engine_version(engine)
+
+    def version(section: str, name: str, value) -> str:
+        cfg = EasyDict(copy.deepcopy(engine.cfg))
+        cfg[section][name] = value
+        return engine_version(EasyDict(cfg=cfg))
+
+    assert version("inference", "workers", 4) == base
+    assert version("score", "bpm", 90.0) == base
+    assert version("decoder", "onset_threshold", 0.4) != base
+    assert version("features", "hop_length", 512) != base
@@ -0,0 +1,123 @@
+import os
+from concurrent.futures import Future
+from time import time
+
+import pandas as pd
+import pytest
+
+from src.engine import score
+from src.engine.score import ScoreExporter, ScoreOptions, quantize_notes, score_key
+
+
+def note_table(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(
+        rows, columns=["start_time", "end_time", "instrument", "note", "velocity"]
+    )
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    exporter = ScoreExporter(str(tmp_path), max_workers=1)
+    yield exporter
+    exporter.shutdown()
+
+
+def done(value: bytes) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_quantize_notes():
+    q = quantize_notes(
+        note_table([(0.26, 0.27, 0, 64, 90), (0.0, 0.49, 0, 60, 100)]), bpm=120
+    )
+    assert q.note.tolist() == [60, 64]
+    assert q.offset.tolist() == [0.0, 0.5]
+    assert q.duration.tolist() == [1.0, 0.25]  # at least one grid step
+
+
+def test_pending_until_written(exporter, monkeypatch):
+    replace = os.replace
+
+    def check_pending(src, dst):
+        assert "k" in exporter._pending
+        replace(src, dst)
+
+    monkeypatch.setattr(score.os, "replace", check_pending)
+    exporter._pending["k"] = future = done(b"<score/>")
+    exporter._store("k", future)
+    assert "k" not in exporter._pending
+    with open(exporter.path("k"), "rb") as f:
+        assert f.read() == b"<score/>"
+
+
+def test_failed_rendering_is_not_cached(exporter):
+    future = Future()
+    future.set_exception(RuntimeError("render failed"))
+    exporter._pending["k"] = future
+    exporter._store("k", future)
+    assert not exporter._pending and not os.path.exists(exporter.path("k"))
+
+
+def test_cached_score_skips_rendering(exporter, monkeypatch):
+    notes = note_table([(0.0, 0.5, 0, 60, 100)])
+    exporter._store(score_key(notes, ScoreOptions()), done(b"<score/>"))
+    monkeypatch.setattr(exporter.pool, "submit", None)
+    assert exporter.export(notes) == b"<score/>"
+
+
+def test_lru_eviction(exporter):
+    exporter.max_bytes = 350
+    for i, key in enumerate("abcd"):
+        exporter._store(key, done(b"x" * 100))
+        os.utime(exporter.path(key), (time() - 100 + i, time() - 100 + i))
+        if key == "c":
+            os.utime(exporter.path("a"))  # recently used
+    assert sorted(os.listdir(exporter.root)) == [
+        "a.musicxml",
+        "c.musicxml",
+        "d.musicxml",
+    ]
+    assert exporter.evictions == 1
+
+
+def test_expired_scores(exporter):
+    exporter._store("old", done(b"<score/>"))
+    exporter._store("new", done(b"<score/>"))
+    old = time() - exporter.max_age - 1
+    os.utime(exporter.path("old"), (old, old))
+    exporter.evict()
+    assert os.listdir(exporter.root) == ["new.musicxml"]
+
+
+def test_pool_uses_spawn(exporter):
+    assert exporter.pool._mp_context.get_start_method() == "spawn"
+
+
+def test_render_overlapping_notes():
+    music21 = pytest.importorskip("music21")
+    notes = note_table(
+        [
+            (0.0, 2.0, 0, 48, 80),  # whole note under
+            (0.0, 0.5, 0, 60, 100),  # a chord of quarter notes
+            (0.0, 0.5, 0, 64, 100),
+            (0.5, 1.0, 0, 67, 90),
+            (0.0, 1.0, 1, 72, 70),
+        ]
+    )
+    xml = score.notes_to_musicxml(notes, ScoreOptions(bpm=120))
+    parsed = music21.converter.parseData(xml, format="musicxml")
+    parts = list(parsed.parts)
+    assert len(parts) == 2
+    found = sorted(
+        (
+            p.pitch.midi,
+            float(element.getOffsetInHierarchy(parts[0])),
+            float(element.quarterLength),
+        )
+        for element in parts[0].recurse().notes
+        for p in element.pitches
+    )
+    assert found == [(48, 0.0, 4.0), (60, 0.0, 1.0), (64, 0.0, 1.0), (67, 1.0, 1.0)]
+    assert len(parts[0].recurse().getElementsByClass("Voice")) >= 2
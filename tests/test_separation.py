@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.engine.separation import Separator, fit_bases, stft
+from tests.helpers import synth
+
+
+@pytest.fixture(scope="module")
+def separator() -> Separator:
+    stems = dict(low=synth([(48, 0, 1)], 1.0), high=synth([(76, 0, 1)], 1.0))
+    bases = {
+        name: fit_bases([np.abs(stft(y, 2048, 512))], n_components=4)
+        for name, y in stems.items()
+    }
+    return Separator(bases)
+
+
+@pytest.fixture(scope="module")
+def mixture() -> np.ndarray:
+    y = synth([(48, 0.1, 1.2), (76, 0.5, 1.5)], 1.7)
+    noise = np.random.default_rng(0).normal(0, 0.01, len(y))
+    return (y + noise).astype(np.float32)
+
+
+@pytest.mark.parametrize("chunk_samples", [1, 777, 4096, 16000])
+def test_independent_of_chunk_size(separator, mixture, chunk_samples):
+    y = mixture[:8000] if chunk_samples == 1 else mixture
+    np.testing.assert_allclose(
+        separator.separate(y, chunk_samples), separator.separate(y), atol=1e-6
+    )
+
+
+def test_stems_sum_to_mixture(separator, mixture):
+    stems = separator.separate(mixture, 1000)
+    assert stems.shape == (2, len(mixture))
+    np.testing.assert_allclose(stems.sum(axis=0), mixture, atol=1e-5)
+
+
+def test_masks_sum_to_one(separator):
+    # White noise has energy in bins that no basis explains
+    noise = np.random.default_rng(1).normal(0, 0.3, 16000).astype(np.float32)
+    masks = separator.masks(np.abs(stft(noise, 2048, 512)))
+    np.testing.assert_allclose(masks.sum(axis=0), 1, atol=1e-6)
+    np.testing.assert_allclose(separator.separate(noise).sum(axis=0), noise, atol=1e-5)
+
+
+def test_stems_follow_their_bases(separator):
+    low, high = separator.separate(synth([(48, 0, 1)], 1.0))
+    assert np.sum(low**2) > 100 * np.sum(high**2)
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+
+def test_stream_matches_offline(engine, audio):
+    offline = engine.transcribe(audio)
+    assert len(offline) > 0
+
+    for chunk_size in (160, 1000, 4096, 16000):
+        session = engine.stream()
+        tables = [
+            session.feed(audio[i : i + chunk_size])
+            for i in range(0, len(audio), chunk_size)
+        ]
+        tables.append(session.flush())
+        streamed = pd.concat(tables, ignore_index=True)
+        streamed = streamed.sort_values(["start_time", "note"], ignore_index=True)
+        pd.testing.assert_frame_equal(streamed, offline)
+
+
+def test_transcribe_blocks_matches_offline(engine, audio):
+    blocks = np.array_split(audio, 7)
+    pd.testing.assert_frame_equal(
+        engine.transcribe_blocks(blocks), engine.transcribe(audio)
+    )
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_transcribe_file_matches_offline(tmp_path, engine, audio, channels):
+    sf = pytest.importorskip("soundfile")
+    path = str(tmp_path / "clip.wav")
+    sf.write(path, np.stack([audio] * channels, axis=1), engine.sr, subtype="FLOAT")
+    for chunk_seconds in (0.3, None):
+        pd.testing.assert_frame_equal(
+            engine.transcribe_file(path, chunk_seconds), engine.transcribe(audio)
+        )
+    with open(path, "rb") as f:
+        pd.testing.assert_frame_equal(
+            engine.transcribe_file(f, 0.3), engine.transcribe(audio)
+        )
+
+
+def test_transcribe_file_resamples(tmp_path, engine, audio):
+    sf = pytest.importorskip("soundfile")
+    from scipy.signal import resample_poly
+
+    path = str(tmp_path / "clip.wav")
+    sf.write(path, resample_poly(audio, 441, 160), 44100, subtype="FLOAT")
+    expected = engine.transcribe(
+        resample_poly(sf.read(path)[0], 160, 441).astype(np.float32)
+    )
+    notes = engine.transcribe_file(path, 0.3)
+    assert notes.note.tolist() == expected.note.tolist()
+    np.testing.assert_allclose(notes.start_time, expected.start_time, atol=0.02)
+
+
+def test_decode_pcm():
+    from src.service.app import decode_pcm
+
+    y = np.array([0.5, -0.25], dtype="<f4")
+    np.testing.assert_array_equal(decode_pcm(y.tobytes(), "float32"), y)
+    pcm = np.array([16384, -32768], dtype="<i2")
+    np.testing.assert_array_equal(decode_pcm(pcm.tobytes(), "int16"), [0.5, -1.0])
+    with pytest.raises(ValueError):
+        decode_pcm(b"\x00" * 6, "float32")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    from src.service.app import app
+
+    monkeypatch.chdir(tmp_path)  # result cache and queues under tmp_path
+    with TestClient(app) as client:
+        yield client
+
+
+def test_websocket_stream(client, engine, audio):
+    with client.websocket_connect("/ws/transcribe") as ws:
+        ready = ws.receive_json()
+        assert ready["sample_rate"] == engine.sr
+        notes = []
+        for i in range(0, len(audio), 8000):
+            ws.send_bytes(audio[i : i + 8000].tobytes())
+        ws.send_text("end")
+        while (message := ws.receive_json())["type"] != "done":
+            notes += message["notes"]
+        notes += message["notes"]
+    assert sorted(n["note"] for n in notes) == sorted(engine.transcribe(audio).note)
+
+
+def test_websocket_rejects_partial_samples(client):
+    with client.websocket_connect("/ws/transcribe") as ws:
+        ws.receive_json()
+        ws.send_bytes(b"\x00" * 6)
+        message = ws.receive()
+    assert message["type"] == "websocket.close"
+    assert message["code"] == 1003
+
+
+def test_transcribe_rejects_partial_samples(client):
+    response = client.post("/transcribe", content=b"\x00" * 6)
+    assert response.status_code == 400
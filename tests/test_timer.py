@@ -0,0 +1,111 @@
+import tracemalloc
+
+import pytest
+
+from src.core import trace
+from src.core.memory import MemoryProbe
+from src.core.timer import STATS, QuantileSketch, Timer
+from src.core.trace import TraceWriter, load_trace
+from tests.helpers import run_threads
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    writer = TraceWriter(str(tmp_path))
+    monkeypatch.setattr(trace, "TRACER", writer)
+    return writer
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    STATS.reset()
+    yield STATS
+    STATS.reset()
+
+
+def row(name: str) -> dict:
+    return next(r for r in STATS.summary() if r["name"] == name)
+
+
+def test_recursive_decorator(tracer):
+    @Timer("rec", mode="stats")
+    def rec(n: int) -> int:
+        return n if n == 0 else rec(n - 1) + 1
+
+    assert rec(3) == 3
+    assert row("rec")["count"] == 4
+    tracer.flush()
+    spans = [e for e in load_trace(tracer.path) if e["ph"] == "X"]
+    assert sorted(e["args"]["depth"] for e in spans) == [1, 2, 3, 4]
+    assert all(e["args"]["parent"] == "rec" for e in spans if e["args"]["depth"] > 1)
+
+
+def test_concurrent_decorator(tracer):
+    timed = Timer("job", mode="stats")(lambda: sum(range(1000)))
+    errors = []
+
+    def run():
+        try:
+            for _ in range(500):
+                timed()
+        except Exception as e:
+            errors.append(e)
+
+    run_threads(run)
+    assert not errors
+    assert row("job")["count"] == 4000
+    tracer.flush()
+    assert sum(e["ph"] == "X" for e in load_trace(tracer.path)) == 4000
+
+
+def test_recursive_memory_trace():
+    @Timer("alloc", mode="stats", memory="trace")
+    def alloc(n: int) -> None:
+        if n:
+            alloc(n - 1)
+        else:
+            block = bytearray(2**23)
+            del block
+
+    alloc(2)
+    stat = row("alloc")
+    assert stat["count"] == 3
+    assert stat["peak_max"] >= 2**23
+
+
+def test_nested_probes_fold_inner_peaks():
+    outer, inner = MemoryProbe("trace"), MemoryProbe("trace")
+    outer.start()
+    inner.start()
+    block = bytearray(2**23)
+    del block
+    inner_result = inner.stop()
+    outer_result = outer.stop()
+    assert inner_result["peak"] >= 2**23
+    assert outer_result["peak"] >= inner_result["peak"]
+    assert "top" in outer_result and "top" not in inner_result
+
+
+def test_only_outermost_probe_snapshots(monkeypatch):
+    snapshots = []
+    take_snapshot = tracemalloc.take_snapshot
+    monkeypatch.setattr(
+        tracemalloc, "take_snapshot", lambda: snapshots.append(1) or take_snapshot()
+    )
+
+    @Timer("nest", mode="stats", memory="trace")
+    def nest(n: int) -> None:
+        if n:
+            nest(n - 1)
+
+    nest(20)
+    assert row("nest")["count"] == 21
+    assert len(snapshots) == 2
+
+
+def test_quantile_sketch():
+    sketch = QuantileSketch(alpha=0.01)
+    for value in range(1, 1001):
+        sketch.add(value / 1000)
+    assert sketch.quantile(0.5) == pytest.approx(0.5, rel=0.02)
+    assert sketch.quantile(0.99) == pytest.approx(0.99, rel=0.02)
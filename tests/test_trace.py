@@ -0,0 +1,18 @@
+from src.core.trace import TraceWriter, load_trace
+from tests.helpers import run_threads
+
+
+def test_concurrent_spans_are_all_written(tmp_path):
+    writer = TraceWriter(str(tmp_path), buffer_size=50)
+
+    def record():
+        for i in range(1000):
+            writer.add("span", float(i), 1e-6, 1, None, dict(i=i))
+
+    run_threads(record)
+    writer.flush()
+    events = load_trace(writer.path)
+    spans = [e for e in events if e["ph"] == "X"]
+    names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert len(spans) == 8000
+    assert names == {f"worker-{i}" for i in range(8)}
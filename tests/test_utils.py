@@ -0,0 +1,107 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import numpy as np
+import pytest
+
+from src.core import utils
+from src.core.utils import SHARED_MIN_BYTES, get_executor, imap, lmap
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def row_sum(i: int, table: np.ndarray) -> float:
+    return float(table[i].sum())
+
+
+def crash(x: int) -> int:
+    os._exit(1)
+
+
+def nested(x: int) -> list:
+    return lmap(square, range(x), "threads", max_workers=2)
+
+
+def run_with_timeout(fn, timeout: float = 30.0):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "deadlock"
+    return result[0]
+
+
+@pytest.mark.parametrize("scheduler", [None, "sync", "threads", "processes"])
+def test_schedulers(scheduler):
+    assert lmap(square, range(1000), scheduler, max_workers=2) == [
+        x * x for x in range(1000)
+    ]
+
+
+def test_executor_scheduler():
+    with ThreadPoolExecutor(2) as executor:
+        assert lmap(square, range(100), executor, chunksize=7) == [
+            x * x for x in range(100)
+        ]
+
+
+def test_unordered_and_progress():
+    calls = []
+    progress = lambda done, total, elapsed: calls.append((done, total))
+    results = imap(square, range(100), "threads", 10, ordered=False, progress=progress)
+    assert sorted(results) == [x * x for x in range(100)]
+    assert len(calls) == 10 and calls[-1] == (100, 100)
+
+
+def test_nested_threads_run_inline():
+    expected = [[x * x for x in range(n)] for n in range(8)]
+    assert (
+        run_with_timeout(lambda: lmap(nested, range(8), "threads", max_workers=2))
+        == expected
+    )
+
+
+def test_nested_in_processes():
+    assert lmap(nested, range(4), "processes", max_workers=2) == [
+        [x * x for x in range(n)] for n in range(4)
+    ]
+
+
+def test_lambda_and_closure_in_processes():
+    if utils.cloudpickle is None:
+        pytest.skip("cloudpickle is not installed")
+    offset = 3
+    assert lmap(lambda x: x + offset, range(10), "processes", max_workers=2) == list(
+        range(3, 13)
+    )
+
+
+def test_unpicklable_without_cloudpickle(monkeypatch):
+    monkeypatch.setattr(utils, "cloudpickle", None)
+    with pytest.raises(TypeError, match="cloudpickle"):
+        lmap(lambda x: x, range(10), "processes", max_workers=2)
+
+
+def test_shared_arrays():
+    table = np.random.default_rng(0).random((64, SHARED_MIN_BYTES // 8 // 32))
+    results = lmap(partial(row_sum, table=table), range(64), "processes", max_workers=2)
+    np.testing.assert_allclose(results, table.sum(axis=1))
+
+
+def test_broken_pool_is_replaced():
+    with pytest.raises(BrokenProcessPool):
+        lmap(crash, range(4), "processes", max_workers=1)
+    assert lmap(square, range(10), "processes", max_workers=1) == [
+        x * x for x in range(10)
+    ]
+    assert not getattr(get_executor("processes", 1), "_broken", False)
+
+
+def test_process_pool_spawns_workers():
+    pool = get_executor("processes", 1)
+    assert pool._mp_context.get_start_method() == "spawn"
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.engine.worker_pool import InferencePool
+
+
+def test_pool_matches_model(engine):
+    features = np.random.default_rng(0).random(
+        (2000, engine.extractor.n_features), dtype=np.float32
+    )
+    expected = engine.model.predict(features)
+    with InferencePool(engine.model, 2, min_frames=1) as pool:
+        out = pool.predict(features)
+    assert out.keys() == expected.keys()
+    for key in expected:
+        np.testing.assert_allclose(out[key], expected[key], rtol=1e-5)
+
+
+def test_worker_imports_are_light():
+    code = "import sys, src.engine.worker_pool; print(sorted({'pandas', 'scipy', 'config'} & set(sys.modules)))"
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[1])}
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_dead_worker_is_restarted(engine):
+    features = np.random.default_rng(0).random(
+        (2000, engine.extractor.n_features), dtype=np.float32
+    )
+    expected = engine.model.predict(features)
+    with InferencePool(engine.model, 3, min_frames=1) as pool:
+        pool.predict(features)
+        dead = pool.processes[1]
+        dead.kill()
+        dead.join()
+        with pytest.raises(RuntimeError, match="died"):
+            pool.predict(features)
+        assert pool.processes[1] is not dead and pool.processes[1].is_alive()
+        # The other workers' replies were drained, so the next call lines up again
+        for _ in range(2):
+            out = pool.predict(features)
+            for key in expected:
+                np.testing.assert_allclose(out[key], expected[key], rtol=1e-5)